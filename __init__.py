@@ -8,6 +8,6 @@ from .sources.xml_parser import XMLDumpSource
 from .sources.api_client import MediaWikiAPISource
 from .compression.compressor import compress_article
 from .storage.compressed_store import CompressedArticle
-from .retrieval.retrieval import retrieve_range
+from .retrieval.retrieval import retrieve_range, retrieve_many
 
 __version__ = "0.1.1"
\ No newline at end of file
@@ -5,7 +5,9 @@ from dataclasses import dataclass, asdict
 from typing import List, Dict, Any, Optional, Tuple
 import statistics as stats
 
-from ..storage.serializer import load
+from ..storage.serializer import open_article
+from ..storage.blob_store import BlobStore
+from ..storage.store import FileStore, open_store
 
 @dataclass
 class ArtifactMetrics:
@@ -25,6 +27,8 @@ class ArtifactMetrics:
     solver: Optional[str]
     strategy: Optional[str]
     time_budget: Optional[Any]
+    anchor_refs: int = 0                     # anchors stored as blob-store hashes
+    anchor_chunks: int = 0                   # chunk references of chunk-encoded anchors
 
 def _count_revisions(meta: Dict[str, Any]) -> int:
     if not meta:
@@ -53,8 +57,13 @@ def _get_title_pid(meta: Dict[str, Any]) -> Tuple[Optional[str], Optional[int]]:
     return t, pid
 
 
-def summarize_artifact(path: str) -> ArtifactMetrics:
-    article, base_texts = load(path)
+def summarize_artifact(path: str, zdict: Optional[bytes] = None) -> ArtifactMetrics:
+    # Only the index (meta + anchors) is decoded; chains stay on disk.
+    article, _ = open_article(path, zdict=zdict)
+    return _summarize(os.path.abspath(path), article)
+
+
+def _summarize(location: str, article) -> ArtifactMetrics:
     meta = getattr(article, "meta", {}) or {}
     parts = meta.get("partitions", []) or []
     anchors = getattr(article, "anchors", []) or []
@@ -98,7 +107,7 @@ def summarize_artifact(path: str) -> ArtifactMetrics:
         ratio = float(space_cost) / float(orig_size)
 
     return ArtifactMetrics(
-        artifact=os.path.abspath(path),
+        artifact=location,
         title=title,
         page_id=page_id,
         n_revisions=int(n_revs or 0),
@@ -114,6 +123,8 @@ def summarize_artifact(path: str) -> ArtifactMetrics:
         solver=meta.get("solver"),
         strategy=meta.get("strategy"),
         time_budget=meta.get("time_budget"),
+        anchor_refs=len(getattr(article, "anchor_refs", {}) or {}),
+        anchor_chunks=sum(len(h) for h in (getattr(article, "anchor_chunks", {}) or {}).values()),
     )
 
 
@@ -192,9 +203,21 @@ def plot_tradeoffs(rows: List[ArtifactMetrics], out_dir: str, show: bool = False
 
     return saved
 
-def analyze_dir(in_dir: str, out_csv: str, plots_dir: Optional[str] = None, show: bool = False) -> Dict[str, Any]:
-    paths = scan_artifacts(in_dir)
-    rows = [summarize_artifact(p) for p in paths]
+def analyze_dir(in_dir: str, out_csv: str, plots_dir: Optional[str] = None, show: bool = False,
+                zdict: Optional[bytes] = None, blob_store: Optional[BlobStore] = None) -> Dict[str, Any]:
+    """`in_dir` is a directory of artifacts or any store URI (see storage/store.py)."""
+    store = open_store(in_dir, zdict=zdict)
+    rows: List[ArtifactMetrics] = []
+    refs: List[str] = []
+    chunks: List[str] = []
+    for key in store.iter_articles():
+        article, _ = store.open_article(key)
+        location = store.location(key)
+        rows.append(_summarize(os.path.abspath(location) if isinstance(store, FileStore) else location, article))
+        refs.extend((getattr(article, "anchor_refs", None) or {}).values())
+        for hashes in (getattr(article, "anchor_chunks", None) or {}).values():
+            chunks.extend(hashes)
+    store.close()
     write_csv(rows, out_csv)
 
     plots = []
@@ -219,4 +242,20 @@ def analyze_dir(in_dir: str, out_csv: str, plots_dir: Optional[str] = None, show
         agg["avg_time_cost"] = float(stats.mean(tcs)) if tcs else None
         agg["avg_space_cost"] = float(stats.mean(scs)) if scs else None
 
+        # anchor dedup across artifacts (content-addressed anchors only)
+        if refs:
+            agg["anchor_refs"] = len(refs)
+            agg["distinct_anchors"] = len(set(refs))
+            agg["anchor_dedup_ratio"] = len(refs) / len(set(refs))
+        if chunks:
+            agg["chunk_refs"] = len(chunks)
+            agg["distinct_chunks"] = len(set(chunks))
+            agg["chunk_dedup_ratio"] = len(chunks) / len(set(chunks))
+        if blob_store is not None:
+            # byte-weighted ratio over the whole store, which may span more than in_dir
+            bs = blob_store.stats()
+            agg["anchor_dedup_ratio"] = bs["dedup_ratio"]
+            agg["anchor_logical_bytes"] = bs["logical_bytes"]
+            agg["anchor_physical_bytes"] = bs["physical_bytes"]
+
     return {"rows": rows, "plots": plots, "aggregate": agg}
@@ -0,0 +1,125 @@
+# WikECD/analytics/bench.py
+from __future__ import annotations
+import io
+import random
+import time
+from typing import Dict, Iterable, List, Optional
+
+from ..sources.base import Revision
+from ..compression.compressor import compress_article
+from ..compression.diff_utils import approx_diffs_from_sizes, time_cost_weights
+from ..compression.profiles import PROFILES, get_profile
+from ..retrieval.retrieval import retrieve_range
+from ..storage.serializer import ArtifactWriter, loads_lazy
+
+_WORDS = ("wiki", "edit", "history", "article", "revision", "citation", "needed", "the", "of", "and",
+          "in", "was", "born", "city", "river", "population", "[[link]]", "{{cite web}}", "''italic''")
+
+
+def synthetic_history(n_revisions: int = 200, n_paragraphs: int = 120, seed: int = 0) -> List[Revision]:
+    """
+    Deterministic edit history shaped like a wiki page: most edits touch one
+    paragraph, some insert or delete one, and a few revert the previous edit.
+    """
+    rnd = random.Random(seed)
+
+    def paragraph() -> str:
+        return " ".join(rnd.choice(_WORDS) for _ in range(rnd.randrange(20, 120))) + "\n"
+
+    paras = [paragraph() for _ in range(n_paragraphs)]
+    revs: List[Revision] = []
+    prev = list(paras)
+    for i in range(n_revisions):
+        cur = list(prev)
+        roll = rnd.random()
+        if roll < 0.1 and len(revs) > 1:
+            cur = list(revs[-2].text.splitlines(keepends=True))  # revert
+        elif roll < 0.25:
+            cur.insert(rnd.randrange(len(cur) + 1), paragraph())
+        elif roll < 0.3 and len(cur) > 1:
+            del cur[rnd.randrange(len(cur))]
+        else:
+            k = rnd.randrange(len(cur))
+            words = cur[k].split()
+            words[rnd.randrange(len(words))] = rnd.choice(_WORDS)
+            cur[k] = " ".join(words) + "\n"
+        revs.append(Revision(revid=i + 1, timestamp=f"2020-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z",
+                             text="".join(cur)))
+        prev = cur
+    return revs
+
+
+def edit_war_history(n_revisions: int = 200, n_paragraphs: int = 40, disputed_paragraphs: int = 60,
+                     seed: int = 0) -> List[Revision]:
+    """
+    Deterministic history of a page in an edit war: every revision edits one
+    paragraph, and nine in ten also insert or revert a long disputed section
+    (longer than the rest of the page). The partitioner's size model
+    (||dr_i|| ~ 2|s_i - s_{i-1}|) only chains revisions across such size
+    swings; synthetic_history() is stored as anchors only under any budget.
+    """
+    rnd = random.Random(seed)
+
+    def paragraph() -> str:
+        return " ".join(rnd.choice(_WORDS) for _ in range(rnd.randrange(20, 120))) + "\n"
+
+    body = [paragraph() for _ in range(n_paragraphs)]
+    disputed = [paragraph() for _ in range(disputed_paragraphs)]
+    shown = False
+    revs: List[Revision] = []
+    for i in range(n_revisions):
+        k = rnd.randrange(len(body))
+        words = body[k].split()
+        words[rnd.randrange(len(words))] = rnd.choice(_WORDS)
+        body[k] = " ".join(words) + "\n"
+        if rnd.random() < 0.9:
+            shown = not shown
+        mid = len(body) // 2
+        cur = body[:mid] + (disputed if shown else []) + body[mid:]
+        revs.append(Revision(revid=i + 1, timestamp=f"2020-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z",
+                             text="".join(cur)))
+    return revs
+
+
+def full_chain_time_cost(revisions: Iterable[Revision]) -> int:
+    """Time cost (partitioner units) of storing every revision as a delta of the previous one."""
+    sizes = [len(r.text) for r in revisions]
+    return sum(time_cost_weights(approx_diffs_from_sizes(sizes), sizes))
+
+
+def benchmark_profiles(revisions: Iterable[Revision], profiles: Optional[Iterable[str]] = None,
+                       title: str = "bench", time_budget: Optional[int] = None) -> List[Dict]:
+    """
+    Compress `revisions` once per profile (single thread, `time_budget` as in
+    compress_article()) and retrieve every revision back. Throughput is over
+    the uncompressed revision text; `partitions` and `patches` show whether
+    the profile's partitioning and diff settings had anything to work on.
+    """
+    revs = list(revisions)
+    input_bytes = sum(len(r.text.encode("utf-8")) for r in revs)
+    rows = []
+    for name in (profiles or PROFILES):
+        profile = get_profile(name)
+        buf = io.BytesIO()
+        t0 = time.perf_counter()
+        with ArtifactWriter(buf, workers=1, **profile.writer_kwargs()) as w:
+            article = compress_article(title, revs, time_budget=time_budget, profile=profile, writer=w)
+        t1 = time.perf_counter()
+        blob = buf.getvalue()
+        lazy, base_texts = loads_lazy(blob)
+        texts = retrieve_range(lazy, base_texts, 0, len(revs) - 1)
+        t2 = time.perf_counter()
+        if texts != [r.text for r in revs]:
+            raise RuntimeError(f"profile {name}: retrieved revisions differ from the input")
+        rows.append({
+            "profile": name,
+            "revisions": len(revs),
+            "input_bytes": input_bytes,
+            "artifact_bytes": len(blob),
+            "ratio": len(blob) / input_bytes if input_bytes else None,
+            "partitions": len(article.partitions()),
+            "patches": sum(len(p) - 1 for p in article.partitions()),
+            "compress_mb_s": input_bytes / 1e6 / (t1 - t0),
+            "retrieve_mb_s": input_bytes / 1e6 / (t2 - t1),
+        })
+    return rows
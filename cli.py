@@ -1,16 +1,23 @@
 from __future__ import annotations
 import argparse
+import json
 import sys
 import os
-from typing import Dict, List, Optional
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 # core modules
 from .sources.api_client import MediaWikiAPISource, resolve_page_ids
 from .sources.xml_parser import XMLDumpSource
-from .compression.compressor import compress_article
-from .storage.serializer import save, load
-from .retrieval.retrieval import retrieve_range
-from .retrieval.query import retrieve_by_revid, retrieve_by_time
+from .compression.compressor import ANCHOR_PLACEMENTS, compress_article
+from .compression.profiles import PROFILES, get_profile
+from .storage.serializer import ArtifactWriter, open_article
+from .storage.zdict import load_dictionary
+from .storage.blob_store import BlobStore
+from .storage.store import BaseStore, open_store
+from .retrieval.retrieval import iter_many, iter_range, retrieve_latest, retrieve_range
+from .retrieval.diff import diff_revisions, format_hunks
+from .retrieval.query import indices_by_revid, indices_by_time
 
 # helpers for dumps
 from .cli_helpers.dump_sweeper import extract_from_dump_dir
@@ -28,6 +35,102 @@ def _ensure_user_agent(ua: Optional[str]) -> str:
     return ua if ua else DEFAULT_USER_AGENT
 
 
+@contextmanager
+def _open_blob_store(path: Optional[str]) -> Iterator[Optional[BlobStore]]:
+    blob_store = BlobStore(path) if path else None
+    try:
+        yield blob_store
+    finally:
+        if blob_store is not None:
+            blob_store.close()
+
+
+def _writer_kwargs(args) -> Dict:
+    """Codec and level of --profile (compress commands only)."""
+    profile = getattr(args, "profile", None)
+    return get_profile(profile).writer_kwargs() if profile else {}
+
+
+@contextmanager
+def _open_store(uri: str, args) -> Iterator[BaseStore]:
+    """The store at `uri` with --zdict/--blob-store; both are closed on exit."""
+    with _open_blob_store(args.blob_store) as blob_store, \
+            open_store(uri, zdict=load_dictionary(args.zdict), blob_store=blob_store,
+                       anchor_encoding=getattr(args, "anchor_encoding", "text"), **_writer_kwargs(args)) as store:
+        yield store
+
+
+@contextmanager
+def _artifact_writer(args, out: str) -> Iterator[ArtifactWriter]:
+    """With --store, `out` is a key in that store; otherwise a file path."""
+    if args.store:
+        with _open_store(args.store, args) as store, store.writer(out) as writer:
+            yield writer
+        return
+    with _open_blob_store(args.blob_store) as blob_store, \
+            ArtifactWriter(out, zdict=load_dictionary(args.zdict), blob_store=blob_store,
+                           anchor_encoding=args.anchor_encoding, **_writer_kwargs(args)) as writer:
+        yield writer
+
+
+@contextmanager
+def _open_input(args) -> Iterator[Tuple]:
+    """(article, base_texts) for --in: a key in --store, or an artifact path; open until exit."""
+    if args.store:
+        with _open_store(args.store, args) as store:
+            yield store.open_article(args.inp)
+        return
+    with _open_blob_store(args.blob_store) as blob_store:
+        yield open_article(args.inp, zdict=load_dictionary(args.zdict), blob_store=blob_store)
+
+
+def _emit_revisions(args, article, indices: Iterable[int], texts: Iterable[str]) -> Tuple[int, Optional[str]]:
+    """
+    Stream retrieved revisions to --out ("-" for stdout) as JSON lines, one
+    revision in memory at a time, and count the ones actually emitted in
+    --access-log. Returns (count, last text).
+    """
+    revids = article.meta.get("revids") or []
+    stamps = article.meta.get("timestamps") or []
+    out = None
+    if args.out:
+        out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    n, last, emitted = 0, None, []
+    try:
+        for idx, text in zip(indices, texts):
+            if out is not None:
+                row = {"index": idx,
+                       "revid": revids[idx] if idx < len(revids) else None,
+                       "timestamp": stamps[idx] if idx < len(stamps) else None,
+                       "text": text}
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            n, last = n + 1, text
+            emitted.append(idx)
+    finally:
+        if out is not None and out is not sys.stdout:
+            out.close()
+        _record_access(args, emitted)
+    return n, last
+
+
+def _record_access(args, indices: Iterable[int], key: Optional[str] = None) -> None:
+    """Count the retrieved revisions in --access-log (keyed like --in)."""
+    if args.access_log:
+        from .retrieval.access import AccessLog
+        log = AccessLog(args.access_log)
+        log.record(key or args.inp, indices)
+        log.save()
+
+
+def _report(args, msg: str, last: Optional[str]) -> None:
+    # keep stdout clean when revisions are streamed there
+    stream = sys.stderr if args.out == "-" else sys.stdout
+    print(msg, file=stream)
+    if args.print and last is not None:
+        print("--- LAST REVISION ---", file=stream)
+        stream.write(last)
+
+
 def main():
     ap = argparse.ArgumentParser(prog="wikecd", description="Wikipedia Efficient Compression & Decompression")
     subparsers = ap.add_subparsers(dest="cmd", required=True)
@@ -40,10 +143,23 @@ def main():
     ap_api.add_argument("--time-budget", type=int, default=None)
     ap_api.add_argument("--user-agent", default=None, help="Custom User-Agent with contact info")
     ap_api.add_argument("--verbose", action="store_true")
-    ap_api.add_argument("--solver", choices=["heuristic", "exact"], default="heuristic")
-    ap_api.add_argument("--strategy", choices=["auto", "greedy", "fptas", "sparse"], default="auto")
-    ap_api.add_argument("--eps", type=float, default=0.1, help="FPTAS epsilon (smaller = better, slower)")
-    ap_api.add_argument("--max-states", type=int, default=100000, help="Sparse DP state cap")
+    ap_api.add_argument("--solver", choices=["heuristic", "exact"], default=None, help="Default: heuristic")
+    ap_api.add_argument("--strategy", choices=["auto", "greedy", "fptas", "sparse"], default=None, help="Default: auto")
+    ap_api.add_argument("--eps", type=float, default=None, help="FPTAS epsilon (smaller = better, slower; default 0.1)")
+    ap_api.add_argument("--max-states", type=int, default=None, help="Sparse DP state cap (default 100000)")
+    ap_api.add_argument("--zdict", default=None, help="Preset dictionary built by train-dict")
+    ap_api.add_argument("--blob-store", default=None, help="SQLite blob store for shared anchor texts")
+    ap_api.add_argument("--anchor-placement", choices=ANCHOR_PLACEMENTS, default="start",
+                        help="Full text at the start, middle (reverse patches before it) or end of each chain")
+    ap_api.add_argument("--keep-tip", action="store_true",
+                        help="Store the newest revision as a full text (fast retrieve-latest)")
+    ap_api.add_argument("--profile", choices=sorted(PROFILES), default=None,
+                        help="fast | balanced | max: sets solver, strategy, eps, max-states, diff and codec together "
+                             "(explicit flags win)")
+    ap_api.add_argument("--anchor-encoding", choices=["text", "chunks"], default="text",
+                        help="Store anchors in --blob-store whole or as content-defined chunks")
+    ap_api.add_argument("--store", default=None,
+                        help="Store URI (file://dir, pack://file, sqlite://file, mem://name); --out is then the article key")
 
     # compress-from-dump (remote dump locator + download)
     ap_fromdump = subparsers.add_parser("compress-from-dump", help="Compress selected pages from a Wikimedia dump date")
@@ -57,11 +173,26 @@ def main():
     ap_fromdump.add_argument("--user-agent", default=None)
     ap_fromdump.add_argument("--verbose", action="store_true")
     ap_fromdump.add_argument("--time-budget", type=int, default=None)
-    ap_fromdump.add_argument("--solver", choices=["heuristic", "exact"], default="heuristic")
-    ap_fromdump.add_argument("--strategy", choices=["auto", "greedy", "fptas", "sparse"], default="auto")
-    ap_fromdump.add_argument("--eps", type=float, default=0.1)
-    ap_fromdump.add_argument("--max-states", type=int, default=100000)
+    ap_fromdump.add_argument("--solver", choices=["heuristic", "exact"], default=None, help="Default: heuristic")
+    ap_fromdump.add_argument("--strategy", choices=["auto", "greedy", "fptas", "sparse"], default=None, help="Default: auto")
+    ap_fromdump.add_argument("--eps", type=float, default=None, help="Default: 0.1")
+    ap_fromdump.add_argument("--max-states", type=int, default=None, help="Default: 100000")
     ap_fromdump.add_argument("--limit-revs", type=int, default=None, help="Optional cap for testing")
+    ap_fromdump.add_argument("--parallelization", type=int, default=1,
+                             help="bz2 decoder threads (1: stdlib bz2; 0: one per CPU)")
+    ap_fromdump.add_argument("--zdict", default=None, help="Preset dictionary built by train-dict")
+    ap_fromdump.add_argument("--blob-store", default=None, help="SQLite blob store for shared anchor texts")
+    ap_fromdump.add_argument("--anchor-placement", choices=ANCHOR_PLACEMENTS, default="start",
+                             help="Full text at the start, middle (reverse patches before it) or end of each chain")
+    ap_fromdump.add_argument("--keep-tip", action="store_true",
+                             help="Store the newest revision as a full text (fast retrieve-latest)")
+    ap_fromdump.add_argument("--profile", choices=sorted(PROFILES), default=None,
+                             help="fast | balanced | max: sets solver, strategy, eps, max-states, diff and codec together "
+                                  "(explicit flags win)")
+    ap_fromdump.add_argument("--anchor-encoding", choices=["text", "chunks"], default="text",
+                             help="Store anchors in --blob-store whole or as content-defined chunks")
+    ap_fromdump.add_argument("--store", default=None,
+                             help="Store URI (file://dir, pack://file, sqlite://file, mem://name); default: --out-dir")
 
     # compress-from-dump-dir (local dump directory index + sweep)
     # ---------------------------------------------------------------------
@@ -70,10 +201,26 @@ def main():
     ap_fromdumpdir.add_argument("--page-ids", required=True, help="Comma-separated page ids")
     ap_fromdumpdir.add_argument("--out-dir", required=True, help="Output directory for compressed artifacts")
     ap_fromdumpdir.add_argument("--index", required=False, help="Optional path to write/read dump index JSON")
-    ap_fromdumpdir.add_argument("--solver", default="heuristic", choices=["heuristic", "exact"])
-    ap_fromdumpdir.add_argument("--strategy", default="fptas", choices=["auto", "greedy", "fptas", "sparse"])
-    ap_fromdumpdir.add_argument("--eps", type=float, default=0.1)
+    ap_fromdumpdir.add_argument("--solver", choices=["heuristic", "exact"], default=None, help="Default: heuristic")
+    ap_fromdumpdir.add_argument("--strategy", choices=["auto", "greedy", "fptas", "sparse"], default=None,
+                                help="Default: fptas, or the --profile's strategy")
+    ap_fromdumpdir.add_argument("--eps", type=float, default=None, help="Default: 0.1")
     ap_fromdumpdir.add_argument("--max-pages-scan", type=int, default=None, help="Optional limit for XML scan pages")
+    ap_fromdumpdir.add_argument("--parallelization", type=int, default=1,
+                                help="bz2 decoder threads (1: stdlib bz2; 0: one per CPU)")
+    ap_fromdumpdir.add_argument("--zdict", default=None, help="Preset dictionary built by train-dict")
+    ap_fromdumpdir.add_argument("--blob-store", default=None, help="SQLite blob store for shared anchor texts")
+    ap_fromdumpdir.add_argument("--anchor-placement", choices=ANCHOR_PLACEMENTS, default="start",
+                                help="Full text at the start, middle (reverse patches before it) or end of each chain")
+    ap_fromdumpdir.add_argument("--keep-tip", action="store_true",
+                                help="Store the newest revision as a full text (fast retrieve-latest)")
+    ap_fromdumpdir.add_argument("--profile", choices=sorted(PROFILES), default=None,
+                                help="fast | balanced | max: sets solver, strategy, eps, max-states, diff and codec together "
+                                     "(explicit flags win)")
+    ap_fromdumpdir.add_argument("--anchor-encoding", choices=["text", "chunks"], default="text",
+                                help="Store anchors in --blob-store whole or as content-defined chunks")
+    ap_fromdumpdir.add_argument("--store", default=None,
+                                help="Store URI (file://dir, pack://file, sqlite://file, mem://name); default: --out-dir")
 
     # 🚀 NEW PERFORMANCE FLAGS
     ap_fromdumpdir.add_argument("--jobs", type=int, default=1, help="Parallel worker count (default: 1)")
@@ -89,16 +236,52 @@ def main():
     ap_xml.add_argument("--count", type=int, default=200, help="Max revisions to process (first N)")
     ap_xml.add_argument("--out", required=True)
     ap_xml.add_argument("--time-budget", type=int, default=None)
-    ap_xml.add_argument("--solver", choices=["heuristic", "exact"], default="heuristic")
-    ap_xml.add_argument("--strategy", choices=["auto", "greedy", "fptas", "sparse"], default="auto")
-    ap_xml.add_argument("--eps", type=float, default=0.1)
-    ap_xml.add_argument("--max-states", type=int, default=100000)
+    ap_xml.add_argument("--solver", choices=["heuristic", "exact"], default=None, help="Default: heuristic")
+    ap_xml.add_argument("--strategy", choices=["auto", "greedy", "fptas", "sparse"], default=None, help="Default: auto")
+    ap_xml.add_argument("--eps", type=float, default=None, help="Default: 0.1")
+    ap_xml.add_argument("--max-states", type=int, default=None, help="Default: 100000")
+    ap_xml.add_argument("--parallelization", type=int, default=1,
+                        help="bz2 decoder threads (1: stdlib bz2; 0: one per CPU)")
+    ap_xml.add_argument("--zdict", default=None, help="Preset dictionary built by train-dict")
+    ap_xml.add_argument("--blob-store", default=None, help="SQLite blob store for shared anchor texts")
+    ap_xml.add_argument("--anchor-placement", choices=ANCHOR_PLACEMENTS, default="start",
+                        help="Full text at the start, middle (reverse patches before it) or end of each chain")
+    ap_xml.add_argument("--keep-tip", action="store_true",
+                        help="Store the newest revision as a full text (fast retrieve-latest)")
+    ap_xml.add_argument("--profile", choices=sorted(PROFILES), default=None,
+                        help="fast | balanced | max: sets solver, strategy, eps, max-states, diff and codec together "
+                             "(explicit flags win)")
+    ap_xml.add_argument("--anchor-encoding", choices=["text", "chunks"], default="text",
+                        help="Store anchors in --blob-store whole or as content-defined chunks")
+    ap_xml.add_argument("--store", default=None,
+                        help="Store URI (file://dir, pack://file, sqlite://file, mem://name); --out is then the article key")
 
     # retrieve-by-id
     ap_byid = subparsers.add_parser("retrieve-by-id", help="Retrieve by Wikipedia revision IDs")
-    ap_byid.add_argument("--in", dest="inp", required=True)
+    ap_byid.add_argument("--in", dest="inp", default=None,
+                         help="Artifact (or --store key); omit to look the ids up in the store's revid index")
+    ap_byid.add_argument("--revid-index", default=None,
+                         help="Revid index built by build-revid-index (default: next to --store)")
     ap_byid.add_argument("--ids", required=True, help="Comma-separated list of revision IDs")
     ap_byid.add_argument("--print", action="store_true")
+    ap_byid.add_argument("--workers", type=int, default=None,
+                         help="Rebuild partitions in this many processes (ranges spanning several partitions)")
+    ap_byid.add_argument("--out", default=None,
+                         help="Stream retrieved revisions as JSON lines to this file ('-' for stdout)")
+    ap_byid.add_argument("--access-log", default=None, help="Count retrieved revisions in this file (see rebalance-hot)")
+    ap_byid.add_argument("--zdict", default=None, help="Preset dictionary built by train-dict")
+    ap_byid.add_argument("--blob-store", default=None, help="SQLite blob store for shared anchor texts")
+    ap_byid.add_argument("--store", default=None,
+                         help="Store URI (file://dir, pack://file, sqlite://file, mem://name); --in is then the article key")
+
+    # build-revid-index
+    ap_ridx = subparsers.add_parser("build-revid-index", help="Index the revision IDs of every article in a store")
+    ap_ridx.add_argument("--store", required=True, help="Store URI (file://dir, pack://file, sqlite://file)")
+    ap_ridx.add_argument("--index", default=None, help="Index file (default: next to the store)")
+    ap_ridx.add_argument("--keys", default=None,
+                         help="Comma-separated keys to (re)index, merged into the existing index")
+    ap_ridx.add_argument("--zdict", default=None, help="Preset dictionary built by train-dict")
+    ap_ridx.add_argument("--blob-store", default=None, help="SQLite blob store for shared anchor texts")
 
     # retrieve-by-time
     ap_bytime = subparsers.add_parser("retrieve-by-time", help="Retrieve by timestamp range (ISO)")
@@ -106,6 +289,24 @@ def main():
     ap_bytime.add_argument("--start-ts", default=None, help='Start ts e.g. "2021-01-01" or "2021-01-01T00:00:00Z"')
     ap_bytime.add_argument("--end-ts", default=None, help='End ts e.g. "2021-01-31" or "2021-01-31T23:59:59Z"')
     ap_bytime.add_argument("--print", action="store_true")
+    ap_bytime.add_argument("--workers", type=int, default=None,
+                           help="Rebuild partitions in this many processes (ranges spanning several partitions)")
+    ap_bytime.add_argument("--out", default=None,
+                           help="Stream retrieved revisions as JSON lines to this file ('-' for stdout)")
+    ap_bytime.add_argument("--access-log", default=None, help="Count retrieved revisions in this file (see rebalance-hot)")
+    ap_bytime.add_argument("--zdict", default=None, help="Preset dictionary built by train-dict")
+    ap_bytime.add_argument("--blob-store", default=None, help="SQLite blob store for shared anchor texts")
+    ap_bytime.add_argument("--store", default=None,
+                           help="Store URI (file://dir, pack://file, sqlite://file, mem://name); --in is then the article key")
+
+    # retrieve-latest
+    ap_latest = subparsers.add_parser("retrieve-latest", help="Retrieve the newest revision of an article")
+    ap_latest.add_argument("--in", dest="inp", required=True)
+    ap_latest.add_argument("--out", default=None, help="Write the text to this file (default: stdout)")
+    ap_latest.add_argument("--zdict", default=None, help="Preset dictionary built by train-dict")
+    ap_latest.add_argument("--blob-store", default=None, help="SQLite blob store for shared anchor texts")
+    ap_latest.add_argument("--store", default=None,
+                           help="Store URI (file://dir, pack://file, sqlite://file, mem://name); --in is then the article key")
 
     # retrieve
     ap_get = subparsers.add_parser("retrieve", help="Retrieve revisions from a compressed file")
@@ -113,6 +314,37 @@ def main():
     ap_get.add_argument("--start", type=int, required=True)
     ap_get.add_argument("--length", type=int, default=0)
     ap_get.add_argument("--print", action="store_true", help="Print the last retrieved revision")
+    ap_get.add_argument("--workers", type=int, default=None,
+                        help="Rebuild partitions in this many processes (ranges spanning several partitions)")
+    ap_get.add_argument("--out", default=None,
+                        help="Stream retrieved revisions as JSON lines to this file ('-' for stdout)")
+    ap_get.add_argument("--access-log", default=None, help="Count retrieved revisions in this file (see rebalance-hot)")
+    ap_get.add_argument("--zdict", default=None, help="Preset dictionary built by train-dict")
+    ap_get.add_argument("--blob-store", default=None, help="SQLite blob store for shared anchor texts")
+    ap_get.add_argument("--store", default=None,
+                        help="Store URI (file://dir, pack://file, sqlite://file, mem://name); --in is then the article key")
+
+    # snapshot
+    ap_snap = subparsers.add_parser("snapshot", help="Every page of a store as it was at a point in time")
+    ap_snap.add_argument("--store", required=True, help="Store URI (file://dir, pack://file, sqlite://file)")
+    ap_snap.add_argument("--at", required=True, help='Snapshot time e.g. "2019-10-01" or "2019-10-01T00:00:00Z"')
+    ap_snap.add_argument("--out", required=True, help="Write JSON lines (key, index, revid, timestamp, text); '-' for stdout")
+    ap_snap.add_argument("--keys", default=None, help="File with one article key per line (default: all keys)")
+    ap_snap.add_argument("--jobs", type=int, default=1, help="Worker processes")
+    ap_snap.add_argument("--zdict", default=None, help="Preset dictionary built by train-dict")
+    ap_snap.add_argument("--blob-store", default=None, help="SQLite blob store for shared anchor texts")
+
+    # diff
+    ap_diff = subparsers.add_parser("diff", help="Show the line changes between two revisions")
+    ap_diff.add_argument("--in", dest="inp", required=True)
+    ap_diff.add_argument("--a", type=int, required=True, help="Older side (revision index)")
+    ap_diff.add_argument("--b", type=int, required=True, help="Newer side (revision index)")
+    ap_diff.add_argument("--show-deleted", action="store_true",
+                         help="Print removed lines (rebuilds revision a; otherwise only counted)")
+    ap_diff.add_argument("--zdict", default=None, help="Preset dictionary built by train-dict")
+    ap_diff.add_argument("--blob-store", default=None, help="SQLite blob store for shared anchor texts")
+    ap_diff.add_argument("--store", default=None,
+                         help="Store URI (file://dir, pack://file, sqlite://file, mem://name); --in is then the article key")
 
     # debug-resolve
     ap_dbg = subparsers.add_parser("debug-resolve", help="Resolve titles to page IDs and show chosen dump parts")
@@ -130,11 +362,26 @@ def main():
     ap_hist.add_argument("--user-agent", default=None)
     ap_hist.add_argument("--limit-revs", type=int, default=None)
     ap_hist.add_argument("--time-budget", type=int, default=None)
-    ap_hist.add_argument("--solver", choices=["heuristic", "exact"], default="heuristic")
-    ap_hist.add_argument("--strategy", choices=["auto", "greedy", "fptas", "sparse"], default="auto")
-    ap_hist.add_argument("--eps", type=float, default=0.1)
-    ap_hist.add_argument("--max-states", type=int, default=100000)
+    ap_hist.add_argument("--solver", choices=["heuristic", "exact"], default=None, help="Default: heuristic")
+    ap_hist.add_argument("--strategy", choices=["auto", "greedy", "fptas", "sparse"], default=None, help="Default: auto")
+    ap_hist.add_argument("--eps", type=float, default=None, help="Default: 0.1")
+    ap_hist.add_argument("--max-states", type=int, default=None, help="Default: 100000")
     ap_hist.add_argument("--verbose", action="store_true")
+    ap_hist.add_argument("--parallelization", type=int, default=1,
+                         help="bz2 decoder threads (1: stdlib bz2; 0: one per CPU)")
+    ap_hist.add_argument("--zdict", default=None, help="Preset dictionary built by train-dict")
+    ap_hist.add_argument("--blob-store", default=None, help="SQLite blob store for shared anchor texts")
+    ap_hist.add_argument("--anchor-placement", choices=ANCHOR_PLACEMENTS, default="start",
+                         help="Full text at the start, middle (reverse patches before it) or end of each chain")
+    ap_hist.add_argument("--keep-tip", action="store_true",
+                         help="Store the newest revision as a full text (fast retrieve-latest)")
+    ap_hist.add_argument("--profile", choices=sorted(PROFILES), default=None,
+                         help="fast | balanced | max: sets solver, strategy, eps, max-states, diff and codec together "
+                              "(explicit flags win)")
+    ap_hist.add_argument("--anchor-encoding", choices=["text", "chunks"], default="text",
+                         help="Store anchors in --blob-store whole or as content-defined chunks")
+    ap_hist.add_argument("--store", default=None,
+                         help="Store URI (file://dir, pack://file, sqlite://file, mem://name); default: --out-dir")
 
     # build-bz2-index
     ap_bz2idx = subparsers.add_parser("build-bz2-index", help="Build per-file page index for a bz2 history file")
@@ -146,43 +393,97 @@ def main():
 
     # analyze-comp
     ap_an = subparsers.add_parser("analyze-comp", help="Analyze compressed artifacts and plot trade-offs")
-    ap_an.add_argument("--in-dir", required=True, help="Directory containing .comp.gz artifacts")
+    ap_an.add_argument("--in-dir", required=True, help="Directory containing .comp.gz artifacts, or a store URI")
     ap_an.add_argument("--out-csv", required=True, help="Path to write CSV summary")
     ap_an.add_argument("--plots-dir", default=None, help="Directory to save PNG charts (optional)")
     ap_an.add_argument("--show", action="store_true", help="Show plots interactively")
+    ap_an.add_argument("--zdict", default=None, help="Preset dictionary built by train-dict")
+    ap_an.add_argument("--blob-store", default=None, help="SQLite blob store for shared anchor texts")
+
+    # train-dict
+    ap_td = subparsers.add_parser("train-dict", help="Train a shared zlib preset dictionary from artifacts")
+    ap_td.add_argument("--in-dir", required=True, help="Directory (or store URI) of artifacts to sample")
+    ap_td.add_argument("--out", required=True, help="Path to write the dictionary (e.g. wiki.zdict)")
+    ap_td.add_argument("--samples", type=int, default=1000, help="Number of artifacts to sample (0 = all)")
+    ap_td.add_argument("--size", type=int, default=32768, help="Dictionary size in bytes (max 32768)")
+    ap_td.add_argument("--level", type=int, default=9, help="Compression level used for the benchmark")
+    ap_td.add_argument("--seed", type=int, default=0)
+
+    # migrate
+    ap_mig = subparsers.add_parser("migrate", help="Convert legacy .comp.gz artifacts to the framed format")
+    ap_mig.add_argument("--in-dir", required=True, help="Directory containing legacy .comp.gz artifacts")
+    ap_mig.add_argument("--out-store", required=True,
+                        help="Output store URI (directory, pack://file, sqlite://file) for migrated artifacts")
+    ap_mig.add_argument("--jobs", type=int, default=1, help="Parallel worker processes (default: 1)")
+    ap_mig.add_argument("--progress-log", default=None,
+                        help="JSONL progress log used to resume (default: next to the output store)")
+    ap_mig.add_argument("--verify-sample", type=int, default=3, help="Revisions to verify per artifact")
+    ap_mig.add_argument("--zdict", default=None, help="Preset dictionary for the migrated artifacts")
+    ap_mig.add_argument("--blob-store", default=None, help="SQLite blob store for shared anchor texts")
+
+    # serve
+    ap_serve = subparsers.add_parser("serve", help="Serve revisions from a store over HTTP")
+    ap_serve.add_argument("--store", required=True, help="Store URI (file://dir, pack://file, sqlite://file)")
+    ap_serve.add_argument("--host", default="127.0.0.1")
+    ap_serve.add_argument("--port", type=int, default=8080)
+    ap_serve.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                          help="Reconstruction processes (0 = in-process thread)")
+    ap_serve.add_argument("--article-cache", type=int, default=64, help="Opened articles kept per worker")
+    ap_serve.add_argument("--revision-cache-mb", type=int, default=256, help="Revision cache per worker (MB)")
+    ap_serve.add_argument("--zdict", default=None, help="Preset dictionary built by train-dict")
+    ap_serve.add_argument("--blob-store", default=None, help="SQLite blob store for shared anchor texts")
+    ap_serve.add_argument("--access-log", default=None, help="Count served revisions in this file (see rebalance-hot)")
+
+    # rebalance-hot
+    ap_hot = subparsers.add_parser("rebalance-hot", help="Add checkpoints at frequently retrieved revisions")
+    ap_hot.add_argument("--store", required=True, help="Store URI (file://dir, pack://file, sqlite://file)")
+    ap_hot.add_argument("--access-log", required=True, help="Access counts written by serve/retrieve --access-log")
+    ap_hot.add_argument("--budget-mb", type=float, required=True, help="Extra full text to store, over all articles (MB)")
+    ap_hot.add_argument("--min-count", type=int, default=1, help="Ignore revisions retrieved fewer times")
+    ap_hot.add_argument("--dry-run", action="store_true", help="Report the plan without rewriting artifacts")
+    ap_hot.add_argument("--zdict", default=None, help="Preset dictionary built by train-dict")
+    ap_hot.add_argument("--blob-store", default=None, help="SQLite blob store for shared anchor texts")
+
+    # bench-profiles
+    ap_bench = subparsers.add_parser("bench-profiles", help="Measure size and throughput of the compression profiles")
+    ap_bench.add_argument("--xml", default=None, help="Benchmark on revisions from this XML dump (default: synthetic)")
+    ap_bench.add_argument("--title", default=None, help="Page title filter for --xml")
+    ap_bench.add_argument("--count", type=int, default=200, help="Number of revisions")
+    ap_bench.add_argument("--seed", type=int, default=0, help="Seed for the synthetic history")
+    ap_bench.add_argument("--budget-fraction", type=float, default=0.5,
+                          help="Time budget as a fraction of chaining every revision (see full_chain_time_cost)")
+    ap_bench.add_argument("--profiles", default=",".join(PROFILES), help="Comma-separated profiles to run")
 
     args = ap.parse_args()
 
     # dispatch
     if args.cmd == "compress-api":
-        from .compression.compressor import compress_article
-        from .storage.serializer import save
         ua = _ensure_user_agent(args.user_agent)
         src = MediaWikiAPISource(user_agent=ua, verbose=args.verbose)
         revs = list(src.get_revisions(title=args.title, limit=args.limit))
-        article = compress_article(
-            args.title, revs, time_budget=args.time_budget,
-            solver=args.solver, strategy=args.strategy, eps=args.eps, max_states=args.max_states
-        )
-        texts = [r.text for r in revs]
-        base_texts: Dict[int, str] = {base: texts[base] for base in article.anchors}
-        save(args.out, article, base_texts)
+        with _artifact_writer(args, args.out) as writer:
+            compress_article(
+                args.title, revs, time_budget=args.time_budget,
+                solver=args.solver, strategy=args.strategy, eps=args.eps, max_states=args.max_states,
+                anchor_placement=args.anchor_placement, keep_tip=args.keep_tip,
+                profile=args.profile, writer=writer,
+            )
         print(f"[OK] Compressed {len(revs)} revisions -> {args.out}")
 
     elif args.cmd == "compress-xml":
-        src = XMLDumpSource(args.xml)
+        src = XMLDumpSource(args.xml, parallelization=args.parallelization)
         revs_iter = src.get_revisions(title=args.title, max_revisions=args.count)
         revs = list(revs_iter)
         if not revs:
             print("[WikECD] No revisions found in XML for given title/filters.")
             raise SystemExit(1)
-        article = compress_article(
-            args.title or "XML-Article", revs, time_budget=args.time_budget,
-            solver=args.solver, strategy=args.strategy, eps=args.eps, max_states=args.max_states,
-        )
-        texts = [r.text for r in revs]
-        base_texts = {base: texts[base] for base in article.anchors}
-        save(args.out, article, base_texts)
+        with _artifact_writer(args, args.out) as writer:
+            compress_article(
+                args.title or "XML-Article", revs, time_budget=args.time_budget,
+                solver=args.solver, strategy=args.strategy, eps=args.eps, max_states=args.max_states,
+                anchor_placement=args.anchor_placement, keep_tip=args.keep_tip,
+                profile=args.profile, writer=writer,
+            )
         print(f"[OK] Compressed {len(revs)} revisions -> {args.out}")
 
     elif args.cmd == "compress-from-dump":
@@ -212,63 +513,67 @@ def main():
             part_to_pids.setdefault(part.fname, []).append(pid)
         print(f"[WikECD] Will fetch {len(part_to_pids)} dump file(s) covering requested pages")
         os.makedirs(args.out_dir, exist_ok=True)
-        import time, json, csv
-        manifest_rows = []
-        for part_fname, pids in part_to_pids.items():
-            part = next(p for p in parts if p.fname == part_fname)
-            local_path = ensure_download(part.url, args.download_dir, user_agent=ua)
-            print(f"[WikECD] Parsing {part.fname} for {len(pids)} page(s)")
-            src = XMLDumpSource(local_path)
-            try:
-                from tqdm import tqdm
-            except Exception:
-                tqdm = None
-            for pid in pids:
-                bar = None
-                revs = []
-                parsed = 0
-                total_hint = args.limit_revs if args.limit_revs else None
-                title = next((k for k, v in page_ids_map.items() if v == pid), f"page_{pid}")
-                if tqdm:
-                    bar = tqdm(total=total_hint, unit="rev", desc=f"Parsing {title} (pid {pid})")
-                for r in src.get_revisions(page_id=pid, max_revisions=args.limit_revs):
-                    revs.append(r)
-                    parsed += 1
+        with _open_store(args.store or args.out_dir, args) as store:
+            import time, csv
+            manifest_rows = []
+            for part_fname, pids in part_to_pids.items():
+                part = next(p for p in parts if p.fname == part_fname)
+                local_path = ensure_download(part.url, args.download_dir, user_agent=ua)
+                print(f"[WikECD] Parsing {part.fname} for {len(pids)} page(s)")
+                src = XMLDumpSource(local_path, parallelization=args.parallelization)
+                try:
+                    from tqdm import tqdm
+                except Exception:
+                    tqdm = None
+                for pid in pids:
+                    bar = None
+                    revs = []
+                    parsed = 0
+                    total_hint = args.limit_revs if args.limit_revs else None
+                    title = next((k for k, v in page_ids_map.items() if v == pid), f"page_{pid}")
+                    if tqdm:
+                        bar = tqdm(total=total_hint, unit="rev", desc=f"Parsing {title} (pid {pid})")
+                    for r in src.get_revisions(page_id=pid, max_revisions=args.limit_revs):
+                        revs.append(r)
+                        parsed += 1
+                        if bar:
+                            bar.update(1)
                     if bar:
-                        bar.update(1)
-                if bar:
-                    bar.close()
-                if not revs:
-                    print(f"[WikECD] No revisions found for page_id {pid} in {part.fname}")
-                    continue
-                print(f"[WikECD] Compressing {title} ({len(revs)} revs)")
-                t0 = time.time()
-                article = compress_article(
-                    title, revs, time_budget=args.time_budget,
-                    solver=args.solver, strategy=args.strategy, eps=args.eps, max_states=args.max_states
-                )
-                texts = [r.text for r in revs]
-                base_texts = {b: texts[b] for b in article.anchors}
-                out_path = os.path.join(args.out_dir, f"{title}.comp.gz")
-                save(out_path, article, base_texts)
-                t1 = time.time()
-                manifest_rows.append({
-                    "title": title,
-                    "page_id": pid,
-                    "dump_file": part.fname,
-                    "dump_url": part.url,
-                    "revisions": len(revs),
-                    "anchors": len(article.anchors),
-                    "partitions": len(article.meta.get("partitions", [])),
-                    "time_budget": args.time_budget if args.time_budget is not None else f"{len(revs)}^2",
-                    "solver": args.solver,
-                    "strategy": args.strategy,
-                    "eps": args.eps if args.solver == "heuristic" and args.strategy == "fptas" else None,
-                    "max_states": args.max_states if args.solver == "heuristic" and args.strategy == "sparse" else None,
-                    "artifact": out_path,
-                    "compress_seconds": round(t1 - t0, 3),
-                })
-                print(f"[OK] {title} -> {out_path}")
+                        bar.close()
+                    if not revs:
+                        print(f"[WikECD] No revisions found for page_id {pid} in {part.fname}")
+                        continue
+                    print(f"[WikECD] Compressing {title} ({len(revs)} revs)")
+                    t0 = time.time()
+                    out_path = store.location(title)
+                    with store.writer(title) as writer:
+                        article = compress_article(
+                            title, revs, time_budget=args.time_budget,
+                            solver=args.solver, strategy=args.strategy, eps=args.eps, max_states=args.max_states,
+                            anchor_placement=args.anchor_placement, keep_tip=args.keep_tip,
+                            profile=args.profile, writer=writer,
+                        )
+                    t1 = time.time()
+                    meta = article.meta  # effective settings (profile and explicit flags resolved)
+                    manifest_rows.append({
+                        "title": title,
+                        "page_id": pid,
+                        "dump_file": part.fname,
+                        "dump_url": part.url,
+                        "revisions": len(revs),
+                        "anchors": len(article.anchors),
+                        "partitions": len(article.meta.get("partitions", [])),
+                        "time_budget": args.time_budget if args.time_budget is not None else f"{len(revs)}^2",
+                        "profile": meta.get("profile"),
+                        "solver": meta.get("solver"),
+                        "strategy": meta.get("strategy"),
+                        "eps": meta.get("eps") if meta.get("solver") == "heuristic" and meta.get("strategy") == "fptas" else None,
+                        "max_states": (meta.get("max_states")
+                                       if meta.get("solver") == "heuristic" and meta.get("strategy") == "sparse" else None),
+                        "artifact": out_path,
+                        "compress_seconds": round(t1 - t0, 3),
+                    })
+                    print(f"[OK] {title} -> {out_path}")
         manifest_json = os.path.join(args.out_dir, "manifest.json")
         manifest_csv = os.path.join(args.out_dir, "manifest.csv")
         with open(manifest_json, "w", encoding="utf-8") as f:
@@ -288,7 +593,6 @@ def main():
         print(f"[WikECD] Manifest written: {manifest_csv}")
 
     elif args.cmd == "compress-from-dump-dir":
-        from .cli_helpers.dump_sweeper import extract_from_dump_dir
         page_ids = [int(x.strip()) for x in args.page_ids.split(",") if x.strip().isdigit()]
         if not page_ids:
             raise SystemExit("No valid numeric page IDs provided.")
@@ -306,6 +610,14 @@ def main():
             resume=args.resume,
             force=args.force,
             auto_index=args.auto_index,
+            zdict=load_dictionary(args.zdict),
+            blob_store=args.blob_store,
+            store=args.store,
+            anchor_encoding=args.anchor_encoding,
+            profile=args.profile,
+            anchor_placement=args.anchor_placement,
+            keep_tip=args.keep_tip,
+            parallelization=args.parallelization,
         )
 
         print(f"[WikECD] Completed dump-dir compression for {len(page_ids)} page(s).")
@@ -326,11 +638,6 @@ def main():
 
     elif args.cmd == "compress-from-history-file":
         from urllib.parse import urlparse
-        from WikECD.sources.dump_locator import ensure_download
-        from WikECD.sources.xml_parser import XMLDumpSource
-        from WikECD.compression.compressor import compress_article
-        from WikECD.storage.serializer import save
-        import os
 
         target = args.file
         parsed = urlparse(target)
@@ -342,63 +649,135 @@ def main():
         os.makedirs(args.out_dir, exist_ok=True)
 
         pids = [int(x.strip()) for x in args.page_ids.split(",") if x.strip().isdigit()]
-        src = XMLDumpSource(local_path)
+        src = XMLDumpSource(local_path, parallelization=args.parallelization)
 
         use_index = args.use_index  # might be None
+        with _open_store(args.store or args.out_dir, args) as store:
 
-        for pid in pids:
-            if args.verbose:
-                print(f"[WikECD] Streaming page_id={pid} from {local_path}" if not use_index
-                      else f"[WikECD] Seeking page_id={pid} via index {use_index}")
+            for pid in pids:
+                if args.verbose:
+                    print(f"[WikECD] Streaming page_id={pid} from {local_path}" if not use_index
+                          else f"[WikECD] Seeking page_id={pid} via index {use_index}")
+
+                if use_index:
+                    # FAST SEEK PATH
+                    from WikECD.sources.fast_page_reader import iter_revisions_fast
+                    revs = list(iter_revisions_fast(local_path, use_index, pid))
+                else:
+                    # STREAMING FALLBACK
+                    revs = list(src.get_revisions(page_id=pid, max_revisions=args.limit_revs))
 
-            if use_index:
-                # FAST SEEK PATH
-                from WikECD.sources.fast_page_reader import iter_revisions_fast
-                revs = list(iter_revisions_fast(local_path, use_index, pid))
-            else:
-                # STREAMING FALLBACK
-                revs = list(src.get_revisions(page_id=pid, max_revisions=args.limit_revs))
+                if not revs:
+                    print(f"[WikECD] No revisions found for page_id {pid} in {local_path}")
+                    continue
 
-            if not revs:
-                print(f"[WikECD] No revisions found for page_id {pid} in {local_path}")
-                continue
+                # Title is unknown here; use page_id as name (or set later if you have a map)
+                title = f"page_{pid}"
+                out_path = store.location(title)
+                with store.writer(title) as writer:
+                    compress_article(
+                        title, revs, time_budget=args.time_budget,
+                        solver=args.solver, strategy=args.strategy, eps=args.eps, max_states=args.max_states,
+                        anchor_placement=args.anchor_placement, keep_tip=args.keep_tip,
+                        profile=args.profile, writer=writer,
+                    )
+                print(f"[OK] {title} -> {out_path}")
 
-            # Title is unknown here; use page_id as name (or set later if you have a map)
-            title = f"page_{pid}"
-            article = compress_article(
-                title, revs, time_budget=args.time_budget,
-                solver=args.solver, strategy=args.strategy, eps=args.eps, max_states=args.max_states
-            )
-            texts = [r.text for r in revs]
-            base_texts = {b: texts[b] for b in article.anchors}
-            out_path = os.path.join(args.out_dir, f"{title}.comp.gz")
-            save(out_path, article, base_texts)
-            print(f"[OK] {title} -> {out_path}")
+    elif args.cmd == "retrieve-latest":
+        with _open_input(args) as (article, base_texts):
+            text = retrieve_latest(article, base_texts)
+            if args.out:
+                with open(args.out, "w", encoding="utf-8") as f:
+                    f.write(text)
+                print(f"[OK] Latest revision ({len(text)} chars) -> {args.out}")
+            else:
+                sys.stdout.write(text)
 
     elif args.cmd == "retrieve":
-        article, base_texts = load(args.inp)
-        outs = retrieve_range(article, base_texts, start=args.start, length=args.length)
-        print(f"[OK] Retrieved {len(outs)} revisions (indices {args.start}..{args.start+args.length})")
-        if args.print and outs:
-            print("--- LAST REVISION ---")
-            sys.stdout.write(outs[-1])
+        with _open_input(args) as (article, base_texts):
+            indices = range(args.start, args.start + args.length + 1)
+            n, last = _emit_revisions(args, article, indices,
+                                      iter_range(article, base_texts, start=args.start, length=args.length,
+                                                 workers=args.workers))
+            _report(args, f"[OK] Retrieved {n} revisions (indices {args.start}..{args.start+args.length})", last)
+
+    elif args.cmd == "snapshot":
+        from .retrieval.snapshot import iter_snapshot
+        keys = None
+        if args.keys:
+            with open(args.keys, encoding="utf-8") as f:
+                keys = [line.rstrip("\n") for line in f if line.strip()]
+        out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+        n = 0
+        try:
+            for row in iter_snapshot(args.store, args.at, keys=keys, jobs=args.jobs,
+                                     zdict=load_dictionary(args.zdict), blob_store=args.blob_store):
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                n += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        print(f"[OK] Snapshot at {args.at}: {n} pages -> {args.out}", file=sys.stderr if args.out == "-" else sys.stdout)
+
+    elif args.cmd == "diff":
+        with _open_input(args) as (article, base_texts):
+            hunks = diff_revisions(article, base_texts, args.a, args.b)
+            old_lines = None
+            if args.show_deleted:
+                old_lines = retrieve_range(article, base_texts, args.a, 0)[0].splitlines(keepends=True)
+            sys.stdout.write(f"--- {args.inp}@{args.a}\n+++ {args.inp}@{args.b}\n")
+            sys.stdout.write(format_hunks(hunks, old_lines))
+
+    elif args.cmd == "retrieve-by-id" and args.inp is None:
+        from .storage.revid_index import RevidIndex
+        from .retrieval.query import iter_store_revids
+        if not args.store:
+            ap.error("retrieve-by-id needs --in, or --store with a revid index")
+        ids = [int(x.strip()) for x in args.ids.split(",") if x.strip()]
+        with _open_store(args.store, args) as store:
+            index_path = args.revid_index or store.revid_index_path()
+            if not index_path or not os.path.exists(index_path):
+                ap.error(f"no revid index for {args.store}; run build-revid-index first")
+            out = None
+            if args.out:
+                out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+            n, last, keys = 0, None, {}
+            try:
+                with RevidIndex(index_path) as index:
+                    for row in iter_store_revids(store, index, ids, workers=args.workers):
+                        if out is not None:
+                            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                        n, last = n + 1, row["text"]
+                        keys.setdefault(row["key"], []).append(row["index"])
+            finally:
+                if out is not None and out is not sys.stdout:
+                    out.close()
+        for key, idxs in keys.items():
+            _record_access(args, idxs, key=key)
+        _report(args, f"[OK] Retrieved {n} revisions from {len(keys)} article(s) for {len(ids)} requested IDs.", last)
+
+    elif args.cmd == "build-revid-index":
+        from .storage.revid_index import build_revid_index
+        with _open_store(args.store, args) as store:
+            index_path = args.index or store.revid_index_path()
+            if not index_path:
+                ap.error(f"{args.store} has no default index location; pass --index")
+            keys = [k.strip() for k in args.keys.split(",") if k.strip()] if args.keys else None
+            n = build_revid_index(store, index_path, keys=keys)
+        print(f"[OK] Indexed {n} revisions -> {index_path}")
 
     elif args.cmd == "retrieve-by-id":
-        article, base_texts = load(args.inp)
-        ids = [int(x.strip()) for x in args.ids.split(",") if x.strip()]
-        outs = retrieve_by_revid(article, base_texts, ids)
-        print(f"[OK] Retrieved {len(outs)} revisions for {len(ids)} requested IDs.")
-        if args.print and outs:
-            print("--- LAST REVISION ---")
-            sys.stdout.write(outs[-1])
+        with _open_input(args) as (article, base_texts):
+            ids = [int(x.strip()) for x in args.ids.split(",") if x.strip()]
+            idxs = indices_by_revid(article, ids)
+            n, last = _emit_revisions(args, article, idxs, iter_many(article, base_texts, idxs, workers=args.workers))
+            _report(args, f"[OK] Retrieved {n} revisions for {len(ids)} requested IDs.", last)
 
     elif args.cmd == "retrieve-by-time":
-        article, base_texts = load(args.inp)
-        outs = retrieve_by_time(article, base_texts, start=args.start_ts, end=args.end_ts)
-        print(f"[OK] Retrieved {len(outs)} revisions in range [{args.start_ts} .. {args.end_ts}].")
-        if args.print and outs:
-            print("--- LAST REVISION ---")
-            sys.stdout.write(outs[-1])
+        with _open_input(args) as (article, base_texts):
+            idxs = indices_by_time(article, start=args.start_ts, end=args.end_ts)
+            n, last = _emit_revisions(args, article, idxs, iter_many(article, base_texts, idxs, workers=args.workers))
+            _report(args, f"[OK] Retrieved {n} revisions in range [{args.start_ts} .. {args.end_ts}].", last)
 
     elif args.cmd == "build-bz2-index":
         from WikECD.sources.bz2_page_index import build_page_index
@@ -407,7 +786,9 @@ def main():
 
     elif args.cmd == "analyze-comp":
         from WikECD.analytics.analyze import analyze_dir
-        res = analyze_dir(args.in_dir, args.out_csv, plots_dir=args.plots_dir, show=args.show)
+        with _open_blob_store(args.blob_store) as blob_store:
+            res = analyze_dir(args.in_dir, args.out_csv, plots_dir=args.plots_dir, show=args.show,
+                              zdict=load_dictionary(args.zdict), blob_store=blob_store)
         print(f"[WikECD] Wrote CSV: {args.out_csv}")
         if args.plots_dir:
             for p in res["plots"]:
@@ -421,6 +802,95 @@ def main():
                   f"avg_anchor_density={agg.get('avg_anchor_density')},",
                   f"avg_time_cost={agg.get('avg_time_cost')},",
                   f"avg_space_cost={agg.get('avg_space_cost')}")
+        if agg.get("anchor_refs"):
+            print("[WikECD] Anchors:",
+                  f"refs={agg.get('anchor_refs')},",
+                  f"distinct={agg.get('distinct_anchors')},",
+                  f"dedup_ratio={agg.get('anchor_dedup_ratio')}")
+        if agg.get("chunk_refs"):
+            print("[WikECD] Anchor chunks:",
+                  f"refs={agg.get('chunk_refs')},",
+                  f"distinct={agg.get('distinct_chunks')},",
+                  f"dedup_ratio={agg.get('chunk_dedup_ratio')}")
+
+    elif args.cmd == "migrate":
+        from WikECD.cli_helpers.migrate import migrate_dir
+        res = migrate_dir(
+            args.in_dir, args.out_store,
+            jobs=args.jobs,
+            progress_log=args.progress_log,
+            verify_sample=args.verify_sample,
+            zdict=load_dictionary(args.zdict),
+            blob_store=args.blob_store,
+        )
+        print(f"[OK] Migrated {res['ok']} artifact(s), {res['error']} failed, {res['skipped']} already done "
+              f"({res['verified']} revisions verified)")
+        if res["artifacts_per_sec"] is not None:
+            print(f"[WikECD] Throughput: {res['artifacts_per_sec']:.1f} artifacts/s, "
+                  f"{res['mb_per_sec']:.2f} MB/s in; {res['bytes_in']} -> {res['bytes_out']} bytes")
+        print(f"[WikECD] Progress log: {res['progress_log']}")
+
+    elif args.cmd == "serve":
+        from WikECD.retrieval.server import serve
+        print(f"[WikECD] Serving {args.store} on http://{args.host}:{args.port} ({args.workers} workers)")
+        try:
+            serve(args.store, args.host, args.port, workers=args.workers, zdict=load_dictionary(args.zdict),
+                  blob_store=args.blob_store, max_articles=args.article_cache,
+                  revision_cache_bytes=args.revision_cache_mb << 20, access_log=args.access_log)
+        except KeyboardInterrupt:
+            pass
+
+    elif args.cmd == "rebalance-hot":
+        from WikECD.cli_helpers.rebalance import rebalance_store
+        from WikECD.retrieval.access import AccessLog
+        log = AccessLog.load(args.access_log)
+        with _open_store(args.store, args) as store:
+            rows = rebalance_store(store, log, int(args.budget_mb * (1 << 20)), min_count=args.min_count,
+                                   dry_run=args.dry_run)
+        for row in rows:
+            print(f"{row['key']}: +{len(row['checkpoints'])} checkpoints, "
+                  f"patches per logged access {row['patches_before']} -> {row['patches_after']}"
+                  + ("" if args.dry_run else f", {row['bytes_before']} -> {row['bytes_after']} bytes"))
+        print(f"[OK] {'Planned' if args.dry_run else 'Rebalanced'} {len(rows)} article(s) from {log.total()} logged accesses")
+
+    elif args.cmd == "bench-profiles":
+        from WikECD.analytics.bench import benchmark_profiles, edit_war_history, full_chain_time_cost
+        if args.xml:
+            revs = list(XMLDumpSource(args.xml).get_revisions(title=args.title, max_revisions=args.count))
+        else:
+            revs = edit_war_history(args.count, seed=args.seed)
+        if not revs:
+            raise SystemExit("No revisions to benchmark.")
+        budget = int(args.budget_fraction * full_chain_time_cost(revs))
+        rows = benchmark_profiles(revs, [p.strip() for p in args.profiles.split(",") if p.strip()],
+                                  time_budget=budget)
+        print(f"[WikECD] {len(revs)} revisions, {rows[0]['input_bytes'] / 1e6:.1f} MB of text, time budget {budget}")
+        print(f"{'profile':<10}{'partitions':>12}{'patches':>10}{'artifact bytes':>16}{'ratio':>10}"
+              f"{'compress MB/s':>16}{'retrieve MB/s':>16}")
+        for r in rows:
+            print(f"{r['profile']:<10}{r['partitions']:>12}{r['patches']:>10}{r['artifact_bytes']:>16}"
+                  f"{r['ratio']:>10.4f}{r['compress_mb_s']:>16.1f}{r['retrieve_mb_s']:>16.1f}")
+
+    elif args.cmd == "train-dict":
+        from WikECD.storage.serializer import decode_payload
+        from WikECD.storage.zdict import train_dictionary, save_dictionary, sample_paths, benchmark_dictionary
+        with open_store(args.in_dir) as store:
+            paths = sample_paths(list(store.iter_articles()), args.samples, seed=args.seed)
+            if not paths:
+                raise SystemExit(f"No artifacts found in {args.in_dir}")
+            payloads = [decode_payload(store.get_blob(key)) for key in paths]
+        zdict = train_dictionary(payloads, size=args.size)
+        dict_id = save_dictionary(args.out, zdict)
+        print(f"[OK] Trained dictionary {dict_id:08x} ({len(zdict)} bytes) from {len(paths)} artifacts -> {args.out}")
+        bench = benchmark_dictionary(payloads, zdict, level=args.level)
+        print("[WikECD] gzip :",
+              f"ratio={bench['gzip_ratio']:.4f},",
+              f"compress={bench['gzip_compress_mbps']:.1f} MB/s,",
+              f"decompress={bench['gzip_decompress_mbps']:.1f} MB/s")
+        print("[WikECD] zdict:",
+              f"ratio={bench['zdict_ratio']:.4f},",
+              f"compress={bench['zdict_compress_mbps']:.1f} MB/s,",
+              f"decompress={bench['zdict_decompress_mbps']:.1f} MB/s")
 
 
     else:
@@ -15,7 +15,8 @@ from ..sources.dump_utils import (
 )
 from ..sources.xml_parser import get_revisions_from_file
 from ..compression.compressor import compress_article
-from ..storage.serializer import save
+from ..storage.store import open_store
+from ..compression.profiles import get_profile
 from ..logger import get_logger
 
 from concurrent.futures import ProcessPoolExecutor, as_completed
@@ -58,9 +59,9 @@ def _compute_manifest_row(
     return row
 
 
-def _get_out_path_for_pid(out_dir: str, pid: int) -> str:
+def _key_for_pid(pid: int) -> str:
     # consistent artifact naming
-    return os.path.join(out_dir, f"page_{pid}.comp.gz")
+    return f"page_{pid}"
 
 
 def _work_file(args_tuple):
@@ -78,24 +79,39 @@ def _work_file(args_tuple):
         eps,
         assume_sorted,
         max_pages_scan,
-        out_dir,
+        store_uri,
         use_fast,
         index_path_for_file,
         force,
+        zdict,
+        blob_store_path,
+        save_workers,
+        anchor_encoding,
+        profile,
+        anchor_placement,
+        keep_tip,
+        parallelization,
     ) = args_tuple
 
     rows: List[Dict] = []
+    blob_store = None
+    store = None
 
     try:
         # lazy imports inside the worker to keep the parent fast/light
         from ..sources.fast_page_reader import iter_revisions_fast  # fast seek
         from ..sources.xml_parser import get_revisions_from_file    # streaming
         from ..compression.compressor import compress_article
-        from ..storage.serializer import save
+        from ..storage.blob_store import BlobStore
+        blob_store = BlobStore(blob_store_path) if blob_store_path else None
+        writer_kwargs = get_profile(profile).writer_kwargs() if profile else {}
+        store = open_store(store_uri, zdict=zdict, blob_store=blob_store, anchor_encoding=anchor_encoding,
+                           **writer_kwargs)
 
         for pid in pids:
-            out_path = _get_out_path_for_pid(out_dir, pid)
-            if (not force) and os.path.exists(out_path):
+            key = _key_for_pid(pid)
+            out_path = store.location(key)
+            if (not force) and key in store:
                 # skip existing artifact
                 rows.append({
                     "title": f"page_{pid}",
@@ -119,7 +135,8 @@ def _work_file(args_tuple):
                     assume_sorted=assume_sorted,
                     progress=True,
                     progress_interval=250,
-                    max_pages_scan=max_pages_scan
+                    max_pages_scan=max_pages_scan,
+                    parallelization=parallelization,
                 ))
 
             if not revs:
@@ -134,12 +151,12 @@ def _work_file(args_tuple):
                 continue
 
             # compress
-            title = f"page_{pid}"
+            title = key
             t0 = time.time()
-            article = compress_article(title, revs, solver=solver, strategy=strategy, eps=eps)
-            texts = [r.text for r in revs]
-            base_texts = {b: texts[b] for b in getattr(article, "anchors", [])}
-            save(out_path, article, base_texts)
+            with store.writer(key, workers=save_workers) as writer:
+                article = compress_article(title, revs, solver=solver, strategy=strategy, eps=eps,
+                                           anchor_placement=anchor_placement, keep_tip=keep_tip,
+                                           profile=profile, writer=writer)
             t1 = time.time()
 
             rows.append(_compute_manifest_row(
@@ -158,6 +175,11 @@ def _work_file(args_tuple):
             "error_file": os.path.basename(fp),
             "error": traceback.format_exc()
         })
+    finally:
+        if store is not None:
+            store.close()
+        if blob_store is not None:
+            blob_store.close()
 
     return rows
 
@@ -168,16 +190,24 @@ def extract_from_dump_dir(
     out_dir: str,
     index_path: str = None,
     pattern: str = "*pages-meta-history*.xml.bz2",  # bz2-only default
-    solver: str = "heuristic",
-    strategy: str = "fptas",
-    eps: float = 0.1,
+    solver: str = None,
+    strategy: str = None,
+    eps: float = None,
     assume_sorted: bool = True,
     max_pages_scan: int = None,
     verbose: bool = False,
     jobs: int = 1,
     resume: bool = True,
     force: bool = False,
-    auto_index: bool = False
+    auto_index: bool = False,
+    zdict: bytes = None,
+    blob_store: str = None,
+    store: str = None,
+    anchor_encoding: str = "text",
+    profile: str = None,
+    anchor_placement: str = "start",
+    keep_tip: bool = False,
+    parallelization: int = 1,
 ):
     """
     Orchestrates extraction for a set of page_ids from a local dump directory.
@@ -187,9 +217,21 @@ def extract_from_dump_dir(
     - (Optional) Auto-builds a seek index per bz2 (file.pageidx.sqlite).
     - Parallelizes work by file with ProcessPoolExecutor.
     - Respects resume/force flags.
-    - Emits manifest.json and manifest.csv.
+    - Compresses artifacts with a shared preset dictionary when `zdict` is given.
+    - Stores anchor texts once in the SQLite blob store at `blob_store`, if given
+      (whole, or as content-defined chunks with anchor_encoding="chunks").
+    - `profile` (fast/balanced/max) sets solver/strategy/eps, diff and codec;
+      solver/strategy/eps given explicitly win over it. Without a profile the
+      strategy defaults to "fptas".
+    - `anchor_placement` ("start" | "middle" | "end") and `keep_tip` are passed to compress_article.
+    - `parallelization` > 1 decodes each streamed bz2 file on that many threads (0: one per CPU).
+    - Writes artifacts to the store at URI `store` (default: files in out_dir).
+    - Emits manifest.json and manifest.csv (in out_dir).
     """
     os.makedirs(out_dir, exist_ok=True)
+    store_uri = store or out_dir
+    if strategy is None and profile is None:
+        strategy = "fptas"
 
     # 1) Load or build the filename-range index for the dump directory
     if index_path and os.path.exists(index_path):
@@ -250,14 +292,15 @@ def extract_from_dump_dir(
     # 4) Build tasks (grouped per file). Apply resume/force filtering here.
     tasks: List[Tuple] = []
     total_targets = 0
+    existing = open_store(store_uri)
     for fp, pids in file_to_pids.items():
         # Apply resume/force per-pid
         target_pids = []
         for pid in pids:
-            out_path = _get_out_path_for_pid(out_dir, pid)
-            if resume and (not force) and os.path.exists(out_path):
+            key = _key_for_pid(pid)
+            if resume and (not force) and key in existing:
                 if verbose:
-                    logger.info("Skipping existing artifact: %s", out_path)
+                    logger.info("Skipping existing artifact: %s", existing.location(key))
                 continue
             target_pids.append(pid)
         if not target_pids:
@@ -273,12 +316,23 @@ def extract_from_dump_dir(
             eps,
             assume_sorted,
             max_pages_scan,
-            out_dir,
+            store_uri,
             use_fast,
             idx_sqlite,
             force,
+            zdict,
+            blob_store,
+            # one process per file already uses the cores; keep frame compression serial there
+            1 if (jobs and jobs > 1) else None,
+            anchor_encoding,
+            profile,
+            anchor_placement,
+            keep_tip,
+            parallelization,
         ))
 
+    existing.close()
+
     if not tasks:
         logger.info("Nothing to do (all requested pages already exist or no matches).")
         _write_manifests(out_dir, [])
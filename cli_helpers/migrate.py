@@ -0,0 +1,232 @@
+# WikECD/cli_helpers/migrate.py
+from __future__ import annotations
+import glob
+import json
+import multiprocessing.util
+import os
+import random
+import time
+import traceback
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from ..logger import get_logger
+
+logger = get_logger("WikECD.migrate")
+
+_BLOB_STORES: Dict[str, object] = {}  # per-process BlobStore cache (one SQLite connection per worker)
+_STORES: Dict[Tuple, object] = {}       # per-process output store cache
+
+
+def _blob_store(path: Optional[str]):
+    if not path:
+        return None
+    if path not in _BLOB_STORES:
+        from ..storage.blob_store import BlobStore
+        _BLOB_STORES[path] = BlobStore(path)
+    return _BLOB_STORES[path]
+
+
+def _store(uri: str, zdict: Optional[bytes], blob_store_path: Optional[str]):
+    key = (uri, zdict, blob_store_path)
+    if key not in _STORES:
+        from ..storage.store import open_store
+        _STORES[key] = open_store(uri, zdict=zdict, blob_store=_blob_store(blob_store_path))
+    return _STORES[key]
+
+
+def _close_cached() -> None:
+    """Close the stores and blob stores this process opened (see _store)."""
+    while _STORES:
+        _STORES.popitem()[1].close()
+    while _BLOB_STORES:
+        _BLOB_STORES.popitem()[1].close()
+
+
+def _init_worker() -> None:
+    # runs when the pool shuts the worker down
+    multiprocessing.util.Finalize(None, _close_cached, exitpriority=10)
+
+
+def _default_progress_log(store) -> str:
+    if getattr(store, "root", None):
+        return os.path.join(store.root, "migrate.progress.jsonl")
+    if getattr(store, "path", None):
+        return store.path + ".migrate.progress.jsonl"
+    return "migrate.progress.jsonl"
+
+
+def _strip_duplicate_base_texts(meta: Dict, base_texts: Dict[int, str]) -> Dict:
+    """Older compressors copied anchor texts into meta; drop that copy only if it is exact."""
+    dup = meta.get("base_texts")
+    if isinstance(dup, dict) and {int(k): v for k, v in dup.items()} == base_texts:
+        meta = dict(meta)
+        del meta["base_texts"]
+    return meta
+
+
+def _verify(old_article, old_base, store, key: str, sample: int, seed: int) -> int:
+    """Compare index fields and `sample` random revisions of the migrated artifact. Returns #checked."""
+    from ..retrieval.retrieval import retrieve_many
+
+    new_article, new_base = store.open_article(key)
+    if new_article.title != old_article.title or list(new_article.anchors) != list(old_article.anchors):
+        raise ValueError("title/anchors differ after migration")
+    if dict(new_base.items()) != old_base:
+        raise ValueError("base_texts differ after migration")
+
+    n = sum(len(p) for p in old_article.partitions())
+    if n == 0 or sample <= 0:
+        return 0
+    picks = random.Random(seed).sample(range(n), min(sample, n))
+    new_texts = retrieve_many(new_article, new_base, picks)
+    for idx, old_text, new_text in zip(picks, retrieve_many(old_article, old_base, picks), new_texts):
+        if new_text != old_text:
+            raise ValueError(f"revision {idx} differs after migration")
+    return len(picks)
+
+
+def _migrate_one(task: Tuple[str, str, str, Optional[bytes], Optional[str], int]) -> Dict:
+    """
+    Worker: convert one artifact to the framed format, store it under `key`
+    and verify it. Returns a progress-log row.
+    """
+    in_path, store_uri, key, zdict, blob_store_path, verify_sample = task
+    t0 = time.time()
+    row: Dict = {"artifact": in_path}
+    try:
+        from ..storage.serializer import load
+        from ..storage.compressed_store import CompressedArticle
+
+        store = _store(store_uri, zdict, blob_store_path)
+        row["out"] = store.location(key)
+
+        # legacy artifacts were written without a dictionary; framed ones may have used one
+        article, base_texts = load(in_path, zdict=zdict, blob_store=_blob_store(blob_store_path))
+        meta = _strip_duplicate_base_texts(article.meta, base_texts)
+        migrated = CompressedArticle(title=article.title, anchors=article.anchors,
+                                     patches=article.patches, meta=meta, lines=article.lines)
+        store.put_article(key, migrated, base_texts, workers=1)
+
+        checked = _verify(article, base_texts, store, key, verify_sample,
+                          seed=zlib.crc32(os.path.basename(in_path).encode("utf-8")))
+        row.update({
+            "status": "ok",
+            "bytes_in": os.path.getsize(in_path),
+            "bytes_out": store.size(key),
+            "revisions": meta.get("count"),
+            "verified": checked,
+        })
+    except Exception:
+        row.update({"status": "error", "error": traceback.format_exc()})
+    row["seconds"] = round(time.time() - t0, 4)
+    return row
+
+
+def _read_progress(progress_log: str) -> Set[str]:
+    done: Set[str] = set()
+    if not os.path.exists(progress_log):
+        return done
+    with open(progress_log, "r", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue  # torn last line after a crash
+            if row.get("status") == "ok":
+                done.add(os.path.realpath(row["artifact"]))
+    return done
+
+
+def _run(tasks: Iterable[Tuple], jobs: int) -> Iterator[Dict]:
+    """Stream results, keeping at most a few tasks per worker in flight."""
+    if jobs <= 1:
+        for t in tasks:
+            yield _migrate_one(t)
+        return
+    window = 4 * jobs
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as ex:
+        pending = set()
+        for t in tasks:
+            pending.add(ex.submit(_migrate_one, t))
+            if len(pending) >= window:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    yield fut.result()
+        for fut in wait(pending).done:
+            yield fut.result()
+
+
+def migrate_dir(
+    in_dir: str,
+    out_store: str,
+    *,
+    jobs: int = 1,
+    progress_log: Optional[str] = None,
+    verify_sample: int = 3,
+    zdict: Optional[bytes] = None,
+    blob_store: Optional[str] = None,
+    pattern: str = "*.comp.gz",
+    report_every: int = 1000,
+) -> Dict:
+    """
+    Convert every artifact in `in_dir` to the framed format in the store at
+    URI `out_store` (a directory, pack://, sqlite://...; see storage/store.py).
+
+    - Runs conversions in a process pool of `jobs` workers, streaming paths.
+    - Each artifact is re-read after writing; index fields, base_texts and
+      `verify_sample` random revisions must match the source.
+    - Appends one JSON line per artifact to `progress_log`, keyed by the
+      artifact's real path; artifacts already logged as ok are skipped, so an
+      interrupted run can simply be restarted (with any spelling of `in_dir`).
+    Returns totals and throughput.
+    """
+    from ..storage.store import ARTIFACT_SUFFIX, open_store
+    with open_store(out_store) as store:  # creates the target and picks the progress log location
+        progress_log = progress_log or _default_progress_log(store)
+    done = _read_progress(progress_log)
+    if done:
+        logger.info("Resuming: %d artifact(s) already migrated", len(done))
+
+    def tasks() -> Iterator[Tuple]:
+        for p in glob.iglob(os.path.join(in_dir, pattern)):
+            real = os.path.realpath(p)
+            if real in done:
+                continue
+            key = os.path.basename(p)
+            if key.endswith(ARTIFACT_SUFFIX):
+                key = key[:-len(ARTIFACT_SUFFIX)]
+            yield (real, out_store, key, zdict, blob_store, verify_sample)
+
+    totals = {"ok": 0, "error": 0, "skipped": len(done), "bytes_in": 0, "bytes_out": 0, "verified": 0}
+    t0 = time.time()
+    try:
+        with open(progress_log, "a", encoding="utf-8") as log:
+            for row in _run(tasks(), jobs):
+                log.write(json.dumps(row, ensure_ascii=False) + "\n")
+                log.flush()
+                totals[row["status"]] += 1
+                if row["status"] == "ok":
+                    totals["bytes_in"] += row["bytes_in"]
+                    totals["bytes_out"] += row["bytes_out"]
+                    totals["verified"] += row["verified"]
+                else:
+                    logger.warning("Failed to migrate %s", row["artifact"])
+                n = totals["ok"] + totals["error"]
+                if report_every and n % report_every == 0:
+                    elapsed = time.time() - t0
+                    logger.info("%d artifact(s) in %.1fs (%.1f/s)", n, elapsed, n / elapsed if elapsed else 0.0)
+    finally:
+        _close_cached()  # stores opened by this process (jobs <= 1)
+
+    elapsed = time.time() - t0
+    n = totals["ok"] + totals["error"]
+    totals["seconds"] = round(elapsed, 3)
+    totals["artifacts_per_sec"] = (n / elapsed) if elapsed else None
+    totals["mb_per_sec"] = (totals["bytes_in"] / 1e6 / elapsed) if elapsed else None
+    totals["progress_log"] = progress_log
+    return totals
@@ -0,0 +1,177 @@
+# WikECD/cli_helpers/rebalance.py
+from __future__ import annotations
+import heapq
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..retrieval.access import AccessLog
+from ..retrieval.retrieval import retrieve_many
+from ..storage.compressed_store import CompressedArticle
+from ..storage.store import BaseStore
+
+Segment = Tuple[int, int, int]  # (first offset, last offset, anchor offset), inclusive
+
+
+def _segments(n: int, anchor: int, hot: Sequence[int]) -> List[Segment]:
+    """
+    Split a chain of n revisions anchored at offset `anchor` so that each
+    offset in `hot` becomes an anchor too, without re-diffing: a checkpoint
+    below the anchor ends its segment (the reverse patches below it stay
+    valid), one above the anchor starts its segment (forward patches).
+    """
+    below = sorted(h for h in set(hot) if h < anchor)
+    above = sorted(h for h in set(hot) if h > anchor)
+    segments: List[Segment] = []
+    lo = 0
+    for h in below:
+        segments.append((lo, h, h))
+        lo = h + 1
+    for hi, nxt in zip([anchor] + above, above + [n]):
+        segments.append((lo, nxt - 1, hi))
+        lo = nxt
+    return segments
+
+
+def _walk_cost(n: int, anchor: int, hot: Sequence[int], counts: Dict[int, int]) -> int:
+    """Patches applied to serve `counts` (offset -> accesses) with checkpoints at `hot`."""
+    cost = 0
+    for lo, hi, a in _segments(n, anchor, hot):
+        cost += sum(c * abs(off - a) for off, c in counts.items() if lo <= off <= hi)
+    return cost
+
+
+def _revision_bytes(article: CompressedArticle, idx: int) -> Optional[int]:
+    sizes = article.meta.get("sizes")
+    if sizes and idx < len(sizes):
+        return int(sizes[idx])
+    return None
+
+
+def plan_checkpoints(articles: Dict[str, CompressedArticle], log: AccessLog, budget_bytes: int,
+                     *, min_count: int = 1) -> Dict[str, List[int]]:
+    """
+    Revisions to store as extra anchors, per article key: greedy by patches
+    saved per stored byte over all articles (gains are recomputed as
+    checkpoints land in the same chain), until `budget_bytes` of full text
+    is spent. Revision sizes come from meta["sizes"].
+    """
+    # per (key, part_id): chain length, anchor offset, access counts by offset, chosen offsets
+    chains: Dict[Tuple[str, int], Tuple[int, int, Dict[int, int], List[int]]] = {}
+    for key, article in articles.items():
+        for idx, n in log.counts(key).items():
+            if n < min_count:
+                continue
+            try:
+                part_id, off = article.locate(idx)
+            except KeyError:
+                continue
+            chain = chains.get((key, part_id))
+            if chain is None:
+                part = article.partitions()[part_id]
+                anchor = article.locate(article.anchor_of(part_id))[1]
+                chain = chains[(key, part_id)] = (len(part), anchor, {}, [])
+            chain[2][off] = n
+
+    def gain(ck: Tuple[str, int], off: int) -> int:
+        n, anchor, counts, chosen = chains[ck]
+        return _walk_cost(n, anchor, chosen, counts) - _walk_cost(n, anchor, chosen + [off], counts)
+
+    heap = []
+    for ck, (n, anchor, counts, _) in chains.items():
+        part = articles[ck[0]].partitions()[ck[1]]
+        for off in counts:
+            size = _revision_bytes(articles[ck[0]], part[off])
+            g = gain(ck, off)
+            if off != anchor and size is not None and g > 0:
+                heapq.heappush(heap, (-g / max(size, 1), ck, off, size, 0))
+
+    plan: Dict[str, List[int]] = {}
+    spent = 0
+    while heap:
+        _, ck, off, size, version = heapq.heappop(heap)
+        chosen = chains[ck][3]
+        if spent + size > budget_bytes or off in chosen:
+            continue
+        if version != len(chosen):  # the chain changed since this gain was computed
+            g = gain(ck, off)
+            if g > 0:
+                heapq.heappush(heap, (-g / max(size, 1), ck, off, size, len(chosen)))
+            continue
+        chosen.append(off)
+        spent += size
+        plan.setdefault(ck[0], []).append(articles[ck[0]].partitions()[ck[1]][off])
+    return {key: sorted(idxs) for key, idxs in plan.items()}
+
+
+def add_checkpoints(article: CompressedArticle, base_texts: Dict[int, str],
+                    checkpoints: Sequence[int]) -> Tuple[CompressedArticle, Dict[int, str]]:
+    """
+    Copy of `article` where every revision in `checkpoints` is an anchor: its
+    chain is split there (see _segments) and the patch across each new chain
+    boundary is dropped. No diffs are recomputed.
+    """
+    wanted = set(checkpoints)
+    texts = dict(zip(sorted(wanted), retrieve_many(article, base_texts, sorted(wanted))))
+    patches = dict(article.patches.items())
+    new_base = dict(base_texts.items())
+    partitions: List[List[int]] = []
+    anchors: List[int] = []
+    for part_id, part in enumerate(article.partitions()):
+        anchor = article.locate(article.anchor_of(part_id))[1]
+        hot = [off for off, r in enumerate(part) if r in wanted]
+        segments = _segments(len(part), anchor, hot)
+        for (lo, hi, a), nxt in zip(segments, segments[1:]):
+            patches.pop((part[hi], part[nxt[0]]), None)
+            patches.pop((part[nxt[0]], part[hi]), None)
+        for lo, hi, a in segments:
+            partitions.append(part[lo:hi + 1])
+            anchors.append(part[a])
+            if part[a] in texts:
+                new_base[part[a]] = texts[part[a]]
+    meta = dict(article.meta)
+    meta["partitions"] = partitions
+    meta["chain_lengths"] = [len(p) for p in partitions]
+    meta["checkpoints"] = sorted(set(meta.get("checkpoints") or []) | wanted)
+    rebalanced = CompressedArticle(title=article.title, anchors=anchors, patches=patches, meta=meta,
+                                   lines=article.lines)
+    return rebalanced, new_base
+
+
+def rebalance_store(store: BaseStore, log: AccessLog, budget_bytes: int, *, min_count: int = 1,
+                    dry_run: bool = False) -> List[Dict]:
+    """
+    Add checkpoints to the articles of `store` that `log` shows as hot, within
+    `budget_bytes` of extra full text in total, and rewrite those artifacts.
+    Returns one report row per rewritten article.
+    """
+    articles = {}
+    for key in log.keys():
+        if key in store:
+            articles[key] = store.open_article(key)
+    plan = plan_checkpoints({k: a for k, (a, _) in articles.items()}, log, budget_bytes, min_count=min_count)
+    rows = []
+    for key, checkpoints in plan.items():
+        article, base_texts = articles[key]
+        counts = log.counts(key)
+        before = sum(n * _walk_length(article, idx) for idx, n in counts.items())
+        rebalanced, new_base = add_checkpoints(article, base_texts, checkpoints)
+        after = sum(n * _walk_length(rebalanced, idx) for idx, n in counts.items())
+        if not dry_run:
+            bytes_before = store.size(key)
+            store.put_article(key, rebalanced, new_base)
+        rows.append({
+            "key": key,
+            "checkpoints": checkpoints,
+            "patches_before": before,
+            "patches_after": after,
+            "bytes_before": None if dry_run else bytes_before,
+            "bytes_after": None if dry_run else store.size(key),
+        })
+    return rows
+
+
+def _walk_length(article: CompressedArticle, idx: int) -> int:
+    try:
+        part_id, off = article.locate(idx)
+    except KeyError:
+        return 0
+    return abs(off - article.locate(article.anchor_of(part_id))[1])
@@ -1,9 +1,11 @@
 from __future__ import annotations
-from typing import Iterable, Optional, Tuple
+from typing import Iterable, Optional, Tuple, Union, TYPE_CHECKING
 import difflib
 from ..sources.base import Revision
 from ..storage.compressed_store import CompressedArticle
 from .partitioner import optimal_partition_indices
+from .line_table import DIFF_METHODS, LineTable, diff_ids
+from .profiles import PROFILES, Profile, get_profile
 from WikECD.logger import get_logger
 import logging
 
@@ -13,6 +15,9 @@ from .metrics import (
     orig_size_from_sizes,
 )
 
+if TYPE_CHECKING:
+    from ..storage.serializer import ArtifactWriter
+
 logger = get_logger("WikECD.compressor", level=logging.DEBUG)
 
 
@@ -21,10 +26,83 @@ def _ndiff(from_text: str, to_text: str) -> list[str]:
                               to_text.splitlines(keepends=True)))
 
 
-def compress_article(title: str, revisions: Iterable[Revision], time_budget: Optional[int] = None, *, solver: str = "heuristic", strategy: str = "auto", eps: float = 0.1, max_states: int = 100_000,) -> CompressedArticle:
+ENCODINGS = ("lineid", "ndiff")
+ANCHOR_PLACEMENTS = ("start", "middle", "end")
+
+
+def _patch_weight(patch) -> int:
+    """Lines a patch touches when applied (the walk cost retrieval pays for it)."""
+    if patch and isinstance(patch[0], str):  # ndiff
+        return sum(1 for line in patch if line[:2] in ("- ", "+ "))
+    return sum(max(i2 - i1, len(new)) for i1, i2, new in patch)
+
+
+def _place_anchor(part: list[int], forward: dict, placement: str) -> int:
+    """Offset of the anchor in `part`; `forward` holds the chain's forward patches."""
+    if placement == "end":
+        return len(part) - 1
+    if placement == "start" or len(part) < 3:
+        return 0
+    # middle: minimize the longer of the two walks, in lines touched
+    cum = [0]
+    for u, v in zip(part, part[1:]):
+        cum.append(cum[-1] + 1 + _patch_weight(forward[(u, v)]))
+    return min(range(len(part)), key=lambda a: max(cum[a], cum[-1] - cum[a]))
+
+
+def compress_article(title: str, revisions: Iterable[Revision], time_budget: Optional[int] = None, *, solver: Optional[str] = None, strategy: Optional[str] = None, eps: Optional[float] = None, max_states: Optional[int] = None, encoding: Optional[str] = None, line_diff: Optional[str] = None, anchor_placement: str = "start", keep_tip: bool = False, profile: Union[str, Profile, None] = None, writer: Optional["ArtifactWriter"] = None,) -> CompressedArticle:
+    """
+    `encoding` selects the patch format:
+      - "lineid": lines are interned in a per-article table (`article.lines`) and
+        patches are edit scripts over line ids (see line_table.py)
+      - "ndiff": difflib.ndiff line lists (the original format)
+    `line_diff` ("matcher" | "trim", see line_table.DIFF_METHODS) is the
+    algorithm behind "lineid" patches.
+
+    `anchor_placement` picks where each partition keeps its full text:
+      - "start": first revision, forward patches only (the original layout)
+      - "middle": the revision that minimizes the longer walk in lines touched;
+        revisions before it get reverse patches (i+1, i), which roughly halves
+        worst-case and average walk length at the same anchor count
+      - "end": last revision (reverse patches only), the cheapest tip reads
+    `keep_tip` places the last partition's anchor at the newest revision
+    whatever `anchor_placement` says, so retrieve_latest() reads a stored
+    full text instead of walking a chain.
+
+    `profile` ("fast" | "balanced" | "max", see profiles.py) supplies
+    solver/strategy/eps/max_states/encoding/line_diff and is recorded in meta;
+    arguments passed explicitly (not None) win over it. Without a profile the
+    unset knobs take the "balanced" values. The profile's codec and level
+    apply to the ArtifactWriter (Profile.writer_kwargs()).
+
+    With `writer`, each partition (anchor text + patches) is pushed to the
+    ArtifactWriter as soon as it is diffed instead of being collected, and the
+    returned article carries anchors/meta only (`patches` is empty). This
+    bounds the patches held at once, not the call's memory: every revision
+    text (and its line ids) stays loaded until the end, since partitioning
+    needs all sizes before the first diff, and `article.base_texts` keeps the
+    anchor texts.
+    """
+    if isinstance(profile, str):
+        profile = get_profile(profile)
+    knobs = (profile or PROFILES["balanced"]).compress_kwargs()
+    given = {"solver": solver, "strategy": strategy, "eps": eps, "max_states": max_states,
+             "encoding": encoding, "line_diff": line_diff}
+    knobs.update((k, v) for k, v in given.items() if v is not None)
+    solver, strategy, eps = knobs["solver"], knobs["strategy"], knobs["eps"]
+    max_states, encoding, line_diff = knobs["max_states"], knobs["encoding"], knobs["line_diff"]
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown encoding: {encoding!r} (expected one of {ENCODINGS})")
+    if line_diff not in DIFF_METHODS:
+        raise ValueError(f"Unknown line diff: {line_diff!r} (expected one of {DIFF_METHODS})")
+    if anchor_placement not in ANCHOR_PLACEMENTS:
+        raise ValueError(f"Unknown anchor placement: {anchor_placement!r} (expected one of {ANCHOR_PLACEMENTS})")
     revs = list(revisions)
     if not revs:
-        return CompressedArticle(title=title, anchors=[], patches={}, meta={"title": title, "count": 0})
+        article = CompressedArticle(title=title, anchors=[], patches={}, meta={"title": title, "count": 0})
+        if writer is not None:
+            writer.set_article(article)
+        return article
 
     texts = [r.text for r in revs]
     sizes = [len(t) for t in texts]
@@ -37,16 +115,39 @@ def compress_article(title: str, revisions: Iterable[Revision], time_budget: Opt
         sizes, time_budget=time_budget, solver=solver, strategy=strategy, eps=eps, max_states=max_states
     )
 
-    anchors: list[int] = [part[0] for part in partitions]
-    patches: dict[tuple[int, int], list[str]] = {}
+    anchors: list[int] = []
+    patches: dict[tuple[int, int], list] = {}
+
+    table = None
+    if encoding == "lineid":
+        table = LineTable()
+        seqs = [table.intern(t) for t in texts]
 
-    for part in partitions:
-        base = part[0]
-        prev = texts[base]
-        for idx in part[1:]:
-            nd = _ndiff(prev, texts[idx])
-            patches[(idx-1, idx)] = nd
-            prev = texts[idx]
+    def diff(u: int, v: int) -> list:
+        if table is not None:
+            return diff_ids(seqs[u], seqs[v], line_diff)
+        return _ndiff(texts[u], texts[v])
+
+    for part_id, part in enumerate(partitions):
+        tip = keep_tip and part_id == len(partitions) - 1
+        placement = "end" if tip else anchor_placement
+        chain_patches: dict[tuple[int, int], list] = {}
+        if placement != "end":
+            for u, v in zip(part, part[1:]):
+                chain_patches[(u, v)] = diff(u, v)
+        a = _place_anchor(part, chain_patches, placement)
+        for u, v in zip(part[:a], part[1:a + 1]):
+            chain_patches.pop((u, v), None)
+            chain_patches[(v, u)] = diff(v, u)
+        base = part[a]
+        anchors.append(base)
+        if writer is not None:
+            # the kept tip gets its own verbatim frame: retrieve_latest() decodes neither
+            # the chain nor the line table
+            writer.add_chain(base, texts[base], chain_patches,
+                             base_ids=seqs[base] if table is not None and not tip else None, tip=tip)
+        else:
+            patches.update(chain_patches)
 
     article = CompressedArticle(
         title=title,
@@ -58,9 +159,19 @@ def compress_article(title: str, revisions: Iterable[Revision], time_budget: Opt
             "partitions": partitions,
             "revids": revids,  # <— NEW
             "timestamps": timestamps,  # <— NEW (ISO-like strings from API/XML)
-        }
+            "encoding": encoding,
+            "line_diff": line_diff if encoding == "lineid" else None,
+            "anchor_placement": anchor_placement,
+            "keep_tip": keep_tip,
+        },
+        lines=table.lines if table is not None else None,
     )
 
+    if writer is not None:
+        if table is not None:
+            writer.add_lines(table.lines)
+        writer.set_article(article)  # index (meta) is written when the writer closes
+
     # --- robustly populate article.base_texts from the input revisions (revs) ---
     import logging
     from WikECD.logger import get_logger
@@ -145,10 +256,9 @@ def compress_article(title: str, revisions: Iterable[Revision], time_budget: Opt
                         base_texts_map[ai] = txt
 
         if base_texts_map:
+            # Attribute only: the serializer persists anchors once, in their chain frames
+            # (or in a shared BlobStore), so they must not be copied into meta as well.
             article.base_texts = base_texts_map
-            if not getattr(article, "meta", None):
-                article.meta = {}
-            article.meta["base_texts"] = base_texts_map
             logger.debug("compress_article: populated article.base_texts keys=%r", sorted(base_texts_map.keys()))
         else:
             logger.debug("compress_article: no base_texts found to populate (anchors=%r, revs_len=%s)", anchors_list,
@@ -184,8 +294,11 @@ def compress_article(title: str, revisions: Iterable[Revision], time_budget: Opt
     article.meta["sizes"] = sizes
     article.meta["solver"] = solver
     article.meta["strategy"] = strategy
+    article.meta["eps"] = eps
+    article.meta["max_states"] = max_states
     article.meta["time_budget"] = time_budget
     article.meta["page_id"] = getattr(revs[0], "page_id", None)
+    article.meta["profile"] = profile.name if profile is not None else None
 
     # Optional: exact chain lengths (better histogram)
     try:
@@ -0,0 +1,85 @@
+# WikECD/compression/line_table.py
+from __future__ import annotations
+import difflib
+from array import array
+from typing import Iterable, List, Optional, Sequence
+
+# A "lineid" patch is a list of ops [i1, i2, new_ids]: replace ids[i1:i2] of the
+# previous revision with new_ids. Offsets refer to the previous revision, ops are
+# sorted and non-overlapping, and unchanged lines are never repeated.
+LineOp = List  # [int, int, List[int]]
+
+
+class LineTable:
+    """
+    Per-article line dictionary: every distinct line (with its newline) gets a
+    small int id, so revisions become id arrays and patches only carry ids.
+    """
+
+    def __init__(self, lines: Optional[Iterable[str]] = None):
+        self.lines: List[str] = list(lines or [])
+        self._ids = {line: i for i, line in enumerate(self.lines)}
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def intern(self, text: str) -> array:
+        """Ids of `text`'s lines, adding unseen lines to the table."""
+        ids = array("I")
+        for line in text.splitlines(keepends=True):
+            i = self._ids.get(line)
+            if i is None:
+                i = self._ids[line] = len(self.lines)
+                self.lines.append(line)
+            ids.append(i)
+        return ids
+
+    def lookup(self, text: str) -> array:
+        """Ids of `text`'s lines; raises KeyError if a line is not in the table."""
+        ids = self._ids
+        return array("I", [ids[line] for line in text.splitlines(keepends=True)])
+
+    def text(self, ids: Sequence[int]) -> str:
+        lines = self.lines
+        return "".join([lines[i] for i in ids])
+
+
+# "matcher": every common run is kept (difflib.SequenceMatcher)
+# "trim": only the common prefix and suffix are kept and the middle is replaced in one
+#         op; an order of magnitude cheaper, larger patches when an edit touches several places
+DIFF_METHODS = ("matcher", "trim")
+
+
+def _trim_ops(a: Sequence[int], b: Sequence[int]) -> List[LineOp]:
+    n = min(len(a), len(b))
+    head = 0
+    while head < n and a[head] == b[head]:
+        head += 1
+    tail = 0
+    while tail < n - head and a[len(a) - 1 - tail] == b[len(b) - 1 - tail]:
+        tail += 1
+    if head + tail == len(a) == len(b):
+        return []
+    return [[head, len(a) - tail, list(b[head:len(b) - tail])]]
+
+
+def diff_ids(a: Sequence[int], b: Sequence[int], method: str = "matcher") -> List[LineOp]:
+    """Edit script turning id sequence `a` into `b` (see DIFF_METHODS)."""
+    if method == "trim":
+        return _trim_ops(a, b)
+    ops = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b).get_opcodes():
+        if tag != "equal":
+            ops.append([i1, i2, list(b[j1:j2])])
+    return ops
+
+
+def apply_ops(ids: Sequence[int], ops: Sequence[LineOp]) -> array:
+    out = array("I")
+    pos = 0
+    for i1, i2, new in ops:
+        out.extend(ids[pos:i1])
+        out.extend(new)
+        pos = i2
+    out.extend(ids[pos:])
+    return out
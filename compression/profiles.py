@@ -0,0 +1,53 @@
+# WikECD/compression/profiles.py
+from __future__ import annotations
+from dataclasses import asdict, dataclass
+from typing import Any, Dict
+
+
+@dataclass(frozen=True)
+class Profile:
+    """
+    A named set of knobs spanning partitioning, diffing and the artifact codec.
+    Measured throughput for each profile is in the readme (see bench-profiles).
+    """
+    name: str
+    solver: str
+    strategy: str
+    eps: float
+    max_states: int
+    encoding: str     # patch format, see compress_article()
+    line_diff: str    # "lineid" diff algorithm, see line_table.DIFF_METHODS
+    codec: str        # frame codec, see storage/serializer.py
+    level: int
+
+    def compress_kwargs(self) -> Dict[str, Any]:
+        """Keyword arguments for compress_article()."""
+        return {"solver": self.solver, "strategy": self.strategy, "eps": self.eps,
+                "max_states": self.max_states, "encoding": self.encoding, "line_diff": self.line_diff}
+
+    def writer_kwargs(self) -> Dict[str, Any]:
+        """Keyword arguments for ArtifactWriter / save() / open_store()."""
+        return {"codec": self.codec, "level": self.level}
+
+    def as_meta(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+PROFILES: Dict[str, Profile] = {
+    # ingest throughput: ratio-greedy partitioning, prefix/suffix line diffs, cheapest zlib level
+    "fast": Profile("fast", solver="heuristic", strategy="greedy", eps=0.1, max_states=100_000,
+                    encoding="lineid", line_diff="trim", codec="zlib", level=1),
+    # compress_article()'s defaults without a profile: the original partitioning knobs, line-id patches
+    "balanced": Profile("balanced", solver="heuristic", strategy="auto", eps=0.1, max_states=100_000,
+                        encoding="lineid", line_diff="matcher", codec="zlib", level=9),
+    # archive density: sparse DP with a large state cap (exact while under the cap) and LZMA frames
+    "max": Profile("max", solver="heuristic", strategy="sparse", eps=0.01, max_states=2_000_000,
+                   encoding="lineid", line_diff="matcher", codec="lzma", level=9),
+}
+
+
+def get_profile(name: str) -> Profile:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown profile: {name!r} (expected one of {sorted(PROFILES)})") from None
@@ -0,0 +1,69 @@
+# WikECD/retrieval/access.py
+from __future__ import annotations
+import json
+import os
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+
+class AccessLog:
+    """
+    Access counts per (article key, revision index). Retrieval front ends
+    (the HTTP service, the CLI with --access-log) record what they serve;
+    `rebalance-hot` reads the merged counts to place checkpoints.
+
+    On disk the log is one JSON object {key: {index: count}}; save() adds the
+    in-memory counts to what the file already holds and resets them, so
+    several processes can flush into one file in turn.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._counts: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, indices: Iterable[int]) -> None:
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = Counter()
+            counts.update(indices)
+
+    def counts(self, key: str) -> Dict[int, int]:
+        return dict(self._counts.get(key, {}))
+
+    def keys(self) -> Iterator[str]:
+        return iter(list(self._counts))
+
+    def items(self) -> Iterator[Tuple[str, Dict[int, int]]]:
+        for key in self.keys():
+            yield key, self.counts(key)
+
+    def total(self) -> int:
+        return sum(sum(c.values()) for c in self._counts.values())
+
+    @classmethod
+    def load(cls, path: str) -> "AccessLog":
+        log = cls(path)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as fh:
+                raw = json.load(fh)
+            for key, counts in raw.items():
+                log._counts[key] = Counter({int(i): n for i, n in counts.items()})
+        return log
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Merge the recorded counts into `path` (default: self.path) and reset them."""
+        path = path or self.path
+        if path is None:
+            raise ValueError("AccessLog.save() needs a path")
+        with self._lock:
+            pending, self._counts = self._counts, {}
+        merged = AccessLog.load(path)._counts
+        for key, counts in pending.items():
+            merged.setdefault(key, Counter()).update(counts)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({key: {str(i): n for i, n in sorted(c.items())} for key, c in sorted(merged.items())}, fh)
+        os.replace(tmp, path)
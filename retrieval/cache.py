@@ -0,0 +1,101 @@
+# WikECD/retrieval/cache.py
+from __future__ import annotations
+import itertools
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+_ARTICLE_IDS = itertools.count(1)
+
+
+def article_key(article: Any) -> Hashable:
+    """
+    Cache identity of a loaded article. Callers that reload the same artifact
+    (e.g. a server reopening a store key) can set `article.cache_key` so the
+    reloaded object shares entries; otherwise each object gets a fresh id.
+    """
+    key = getattr(article, "cache_key", None)
+    if key is None:
+        key = article.cache_key = ("article", next(_ARTICLE_IDS))
+    return key
+
+
+def _state_bytes(state: Any) -> int:
+    if isinstance(state, array):
+        return len(state) * state.itemsize
+    if isinstance(state, str):
+        return len(state)
+    return sum(len(x) for x in state)
+
+
+class RevisionCache:
+    """
+    Byte-bounded LRU of reconstructed revisions keyed by (article key, index).
+
+    Entries hold the walk state of retrieval (line-id arrays for "lineid"
+    articles, text otherwise), so a "lineid" revision costs 4 bytes per line.
+    Retrieval resumes from the nearest cached revision at or before the target
+    in the same partition, and stores a checkpoint every `checkpoint_every`
+    patches of a walk besides the revisions it returns. One cache can be
+    shared by any number of articles and threads.
+    """
+
+    def __init__(self, max_bytes: int = 64 << 20, checkpoint_every: int = 32):
+        self.max_bytes = max_bytes
+        self.checkpoint_every = checkpoint_every
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items: "OrderedDict[Tuple[Hashable, int], Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable, idx: int) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get((key, idx))
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end((key, idx))
+            self.hits += 1
+            return item[0]
+
+    def peek(self, key: Hashable, idx: int) -> Optional[Any]:
+        """Like get() but without touching recency or counters."""
+        item = self._items.get((key, idx))
+        return None if item is None else item[0]
+
+    def put(self, key: Hashable, idx: int, state: Any) -> None:
+        size = _state_bytes(state)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop((key, idx), None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._items[(key, idx)] = (state, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, old_size) = self._items.popitem(last=False)
+                self.bytes -= old_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._items),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / total) if total else None,
+        }
@@ -0,0 +1,160 @@
+# WikECD/retrieval/diff.py
+from __future__ import annotations
+import difflib
+import sys
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from ..storage.compressed_store import CompressedArticle
+from .retrieval import _codec, _find_partition, _line_table, retrieve_many
+
+_OPEN = sys.maxsize  # length of "the rest of revision a", which is never materialized
+
+
+class DiffHunk(NamedTuple):
+    """Lines a[a_start:a_end] of the older side are replaced by `added` at line b_start of the newer side."""
+    a_start: int
+    a_end: int
+    b_start: int
+    added: List[str]
+
+
+# A revision reached from `a` is kept as pieces: ("a", start, end) is a run of
+# a's lines, ("n", items) are lines inserted on the way (line ids or texts).
+Piece = Tuple
+
+
+def _plen(p: Piece) -> int:
+    return p[2] - p[1] if p[0] == "a" else len(p[1])
+
+
+def _split(p: Piece, cut: int) -> Tuple[Piece, Piece]:
+    if p[0] == "a":
+        return ("a", p[1], p[1] + cut), ("a", p[1] + cut, p[2])
+    return ("n", p[1][:cut]), ("n", p[1][cut:])
+
+
+def _edit_pieces(pieces: List[Piece], ops) -> List[Piece]:
+    """Apply one edit script to a piece list; cost is O(pieces + ops), independent of text size."""
+    out: List[Piece] = []
+    queue = deque(pieces)
+    pos = 0
+
+    def advance(target: int, keep: bool) -> None:
+        nonlocal pos
+        while pos < target and queue:
+            p = queue[0]
+            n = _plen(p)
+            if pos + n <= target:
+                queue.popleft()
+                if keep:
+                    out.append(p)
+                pos += n
+            else:
+                head, queue[0] = _split(p, target - pos)
+                if keep:
+                    out.append(head)
+                pos = target
+
+    for i1, i2, new in ops:
+        advance(i1, True)
+        advance(i2, False)
+        if new:
+            out.append(("n", list(new)))
+    out.extend(queue)
+
+    merged: List[Piece] = []
+    for p in out:
+        if not _plen(p) and not (p[0] == "a" and p[2] == _OPEN):
+            continue
+        last = merged[-1] if merged else None
+        if last is not None and last[0] == p[0] == "n":
+            merged[-1] = ("n", last[1] + p[1])
+        elif last is not None and last[0] == p[0] == "a" and last[2] == p[1]:
+            merged[-1] = ("a", last[1], p[2])
+        else:
+            merged.append(p)
+    return merged
+
+
+def _hunks(pieces: List[Piece]) -> List[Tuple[int, int, int, list]]:
+    hunks = []
+    pa = pb = 0
+    added: list = []
+    for p in pieces:
+        if p[0] == "n":
+            added.extend(p[1])
+            continue
+        if p[1] > pa or added:
+            hunks.append((pa, p[1], pb, added))
+            pb += len(added)
+            added = []
+        pb += p[2] - p[1]
+        pa = p[2]
+    if added:
+        hunks.append((pa, pa, pb, added))
+    return hunks
+
+
+def _composable_path(article: CompressedArticle, a: int, b: int) -> Optional[List[Tuple[int, int]]]:
+    """Stored edges leading from a to b, or None when the walk would run against the stored direction."""
+    pid_a, off_a = _find_partition(article, a)
+    pid_b, off_b = _find_partition(article, b)
+    if pid_a != pid_b:
+        return None
+    part = article.partitions()[pid_a]
+    anchor_off = article.locate(article.anchor_of(pid_a))[1]
+    if anchor_off <= off_a <= off_b:
+        return [(part[i - 1], part[i]) for i in range(off_a + 1, off_b + 1)]
+    if off_b <= off_a <= anchor_off:
+        return [(part[i + 1], part[i]) for i in range(off_a - 1, off_b - 1, -1)]
+    return None
+
+
+def diff_revisions(article: CompressedArticle, base_texts: Dict[int, str], a: int, b: int) -> List[DiffHunk]:
+    """
+    Line hunks turning revision `a` into revision `b`.
+
+    When the stored patches lead from a to b (same chain, a between the
+    anchor and b) their edit scripts are composed without reconstructing
+    either revision, so the cost follows the number of edits, not the page
+    size. Otherwise both revisions are rebuilt and diffed.
+    """
+    if a == b:
+        _find_partition(article, a)
+        return []
+    path = _composable_path(article, a, b)
+    if path is None:
+        old, new = (t.splitlines(keepends=True) for t in retrieve_many(article, base_texts, [a, b]))
+        return [DiffHunk(i1, i2, j1, new[j1:j2])
+                for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes()
+                if tag != "equal"]
+
+    ops = _codec(article)[3]
+    pieces: List[Piece] = [("a", 0, _OPEN)]
+    for u, v in path:
+        pieces = _edit_pieces(pieces, ops(u, v))
+    lineid = article.meta.get("encoding") == "lineid"
+    lines = _line_table(article).lines if lineid else None
+    return [DiffHunk(i1, i2, j1, [lines[i] for i in added] if lineid else added)
+            for i1, i2, j1, added in _hunks(pieces)]
+
+
+def format_hunks(hunks: List[DiffHunk], old_lines: Optional[List[str]] = None) -> str:
+    """
+    Unified-style rendering. Removed lines are printed from `old_lines`
+    (revision a split into lines) when given, else summarized by count.
+    """
+    out = []
+    for h in hunks:
+        n_old = h.a_end - h.a_start
+        # unified-diff convention: an empty side names the line before it
+        a_pos = h.a_start + 1 if n_old else h.a_start
+        b_pos = h.b_start + 1 if h.added else h.b_start
+        out.append(f"@@ -{a_pos},{n_old} +{b_pos},{len(h.added)} @@\n")
+        if old_lines is not None:
+            out.extend("-" + line for line in old_lines[h.a_start:h.a_end])
+        elif n_old:
+            out.append(f"- ({n_old} line{'s' if n_old != 1 else ''} removed)\n")
+        out.extend("+" + line for line in h.added)
+    return "".join(line if line.endswith("\n") else line + "\n" for line in out)
@@ -1,8 +1,16 @@
 from __future__ import annotations
-from typing import List, Dict, Iterable, Optional
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, List, Dict, Iterable, Iterator, Optional, Tuple
 from datetime import datetime, timezone
 from ..storage.compressed_store import CompressedArticle
-from .retrieval import retrieve_range
+from ..storage.revid_index import RevidIndex
+from ..storage.store import BaseStore
+from .cache import RevisionCache
+from .retrieval import iter_many, iter_range, retrieve_many, retrieve_range
+from ..logger import get_logger
+
+logger = get_logger("WikECD.query")
 
 
 def _parse_iso(ts: str) -> datetime:
@@ -17,12 +25,35 @@ def _ensure_meta(article: CompressedArticle, key: str):
         raise KeyError(f"CompressedArticle.meta lacks '{key}'. Recompress with a newer WikECD that stores this field.")
 
 
-def retrieve_by_indices(article: CompressedArticle, base_texts: Dict[int, str], indices: List[int]) -> List[str]:
+def retrieve_by_indices(article: CompressedArticle, base_texts: Dict[int, str], indices: List[int],
+                        *, cache: Optional[RevisionCache] = None) -> List[str]:
     """Retrieve arbitrary indices; returns texts in the same order as indices."""
-    outputs: List[str] = []
-    for idx in indices:
-        outputs.extend(retrieve_range(article, base_texts, idx, 0))
-    return outputs
+    return retrieve_many(article, base_texts, indices, cache=cache)
+
+
+def _revid_index(article: CompressedArticle) -> Dict[int, int]:
+    index_of = getattr(article, "_revid_index", None)
+    if index_of is None:
+        _ensure_meta(article, "revids")
+        index_of = article._revid_index = {int(rid): i for i, rid in enumerate(article.meta["revids"])}
+    return index_of
+
+
+def indices_by_revid(article: CompressedArticle, revids: Iterable[int], *, missing: str = "warn") -> List[int]:
+    """Indices of `revids` in request order; unknown ids are warned about, ignored or raise per `missing`."""
+    index_of = _revid_index(article)
+    idxs: List[int] = []
+    for rid in revids:
+        idx = index_of.get(int(rid))
+        if idx is None:
+            msg = f"revid {rid} not found in this compressed article"
+            if missing == "error":
+                raise KeyError(msg)
+            elif missing == "warn":
+                logger.warning(msg)  # stderr: stdout may carry --out - JSONL
+            continue
+        idxs.append(idx)
+    return idxs
 
 
 def retrieve_by_revid(
@@ -30,28 +61,148 @@ def retrieve_by_revid(
     base_texts: Dict[int, str],
     revids: List[int],
     *,
-    missing: str = "warn"  # "warn" | "ignore" | "error"
+    missing: str = "warn",  # "warn" | "ignore" | "error"
+    cache: Optional[RevisionCache] = None,
 ) -> List[str]:
     """
     Retrieve revisions by Wikipedia revision IDs.
     Requires article.meta['revids'] aligned to indices 0..n-1.
     """
-    _ensure_meta(article, "revids")
-    id_list: List[int] = [int(x) for x in article.meta["revids"]]
-    index_of: Dict[int, int] = {rid: i for i, rid in enumerate(id_list)}
+    idxs = indices_by_revid(article, revids, missing=missing)
+    return retrieve_many(article, base_texts, idxs, cache=cache)
+
 
-    results: List[str] = []
+def iter_by_revid(
+    article: CompressedArticle,
+    base_texts: Dict[int, str],
+    revids: Iterable[int],
+    *,
+    missing: str = "warn",
+    cache: Optional[RevisionCache] = None,
+) -> Iterator[str]:
+    """Generator form of retrieve_by_revid(); yields in request order, one revision in memory at a time."""
+    idxs = indices_by_revid(article, revids, missing=missing)
+    return iter_many(article, base_texts, idxs, cache=cache)
+
+
+def iter_store_revids(
+    store: BaseStore,
+    index: RevidIndex,
+    revids: Iterable[int],
+    *,
+    missing: str = "warn",
+    cache: Optional[RevisionCache] = None,
+    workers: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Revisions of any article in `store` by revid, located through the
+    corpus-wide `index`: one row (key, index, revid, timestamp, text) per
+    found revid, grouped by article in order of first request.
+    """
+    by_key: Dict[str, List[int]] = {}
     for rid in revids:
-        idx = index_of.get(int(rid))
-        if idx is None:
-            msg = f"revid {rid} not found in this compressed article"
+        hit = index.lookup(int(rid))
+        if hit is None:
+            msg = f"revid {rid} not found in the revid index"
             if missing == "error":
                 raise KeyError(msg)
             elif missing == "warn":
-                print("[WikECD] WARNING:", msg)
+                logger.warning(msg)
             continue
-        results.extend(retrieve_range(article, base_texts, idx, 0))
-    return results
+        by_key.setdefault(hit[0], []).append(hit[1])
+    for key, idxs in by_key.items():
+        article, base_texts = store.open_article(key)
+        revids_meta = article.meta.get("revids") or []
+        stamps = article.meta.get("timestamps") or []
+        for idx, text in zip(idxs, iter_many(article, base_texts, idxs, cache=cache, workers=workers)):
+            yield {
+                "key": key,
+                "index": idx,
+                "revid": revids_meta[idx] if idx < len(revids_meta) else None,
+                "timestamp": stamps[idx] if idx < len(stamps) else None,
+                "text": text,
+            }
+
+
+def _epoch(ts: str) -> int:
+    dt = _parse_iso(ts)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _bound(ts: Optional[str], end_of_day: bool) -> Optional[int]:
+    if not ts:
+        return None
+    if len(ts) == 10:
+        ts += "T23:59:59Z" if end_of_day else "T00:00:00Z"
+    return _epoch(ts)
+
+
+def _epochs(article: CompressedArticle) -> Tuple[array, bool]:
+    """
+    meta['timestamps'] as int64 epoch seconds, parsed once per loaded article,
+    and whether they are sorted (histories normally are; bisect needs it).
+    """
+    cached = getattr(article, "_epochs", None)
+    if cached is None:
+        _ensure_meta(article, "timestamps")
+        epochs = array("q", map(_epoch, article.meta["timestamps"]))
+        ordered = all(epochs[i] <= epochs[i + 1] for i in range(len(epochs) - 1))
+        cached = article._epochs = (epochs, ordered)
+    return cached
+
+
+def indices_by_time(
+    article: CompressedArticle,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    *,
+    inclusive: bool = True,
+) -> List[int]:
+    """Indices of revisions whose timestamps fall in [start, end]; O(log n) for sorted histories."""
+    epochs, ordered = _epochs(article)
+    lo_t, hi_t = _bound(start, False), _bound(end, True)
+    if ordered:
+        lo = 0 if lo_t is None else (bisect_left if inclusive else bisect_right)(epochs, lo_t)
+        hi = len(epochs) if hi_t is None else (bisect_right if inclusive else bisect_left)(epochs, hi_t)
+        return list(range(lo, max(lo, hi)))
+    idxs: List[int] = []
+    for i, t in enumerate(epochs):
+        if lo_t is not None and (t < lo_t if inclusive else t <= lo_t):
+            continue
+        if hi_t is not None and (t > hi_t if inclusive else t >= hi_t):
+            continue
+        idxs.append(i)
+    return idxs
+
+
+def index_as_of(article: CompressedArticle, when: str) -> Optional[int]:
+    """Index of the revision current at `when` (latest timestamp <= when), or None if `when` predates the page."""
+    epochs, ordered = _epochs(article)
+    t = _bound(when, True)
+    if ordered:
+        i = bisect_right(epochs, t) - 1
+        return i if i >= 0 else None
+    best = None
+    for i, e in enumerate(epochs):
+        if e <= t and (best is None or e >= epochs[best]):
+            best = i
+    return best
+
+
+def retrieve_as_of(
+    article: CompressedArticle,
+    base_texts: Dict[int, str],
+    when: str,
+    *,
+    cache: Optional[RevisionCache] = None,
+) -> Optional[str]:
+    """Text of the page as it was at `when`, or None if it did not exist yet."""
+    idx = index_as_of(article, when)
+    if idx is None:
+        return None
+    return retrieve_range(article, base_texts, idx, 0, cache=cache)[0]
 
 
 def retrieve_by_time(
@@ -60,36 +211,35 @@ def retrieve_by_time(
     start: Optional[str] = None,
     end: Optional[str] = None,
     *,
-    inclusive: bool = True
+    inclusive: bool = True,
+    cache: Optional[RevisionCache] = None,
 ) -> List[str]:
     """
     Retrieve all revisions whose timestamps fall in [start, end] (inclusive by default).
     Timestamps must be present as article.meta['timestamps'] aligned to indices.
     start/end: ISO-8601 like 'YYYY-MM-DD' or 'YYYY-MM-DDTHH:MM:SSZ'
     """
-    _ensure_meta(article, "timestamps")
-    ts_list: List[str] = article.meta["timestamps"]
+    idxs = indices_by_time(article, start, end, inclusive=inclusive)
+    if not idxs:
+        return []
+    if idxs[-1] - idxs[0] == len(idxs) - 1:
+        return retrieve_range(article, base_texts, idxs[0], len(idxs) - 1, cache=cache)
+    return retrieve_many(article, base_texts, idxs, cache=cache)
 
-    # Build list of indices that match range
-    idxs: List[int] = []
-    dt_start = _parse_iso(start + "T00:00:00Z") if (start and len(start) == 10) else (_parse_iso(start) if start else None)
-    dt_end   = _parse_iso(end + "T23:59:59Z")   if (end and len(end) == 10)   else (_parse_iso(end) if end else None)
-
-    for i, ts in enumerate(ts_list):
-        dt = _parse_iso(ts)
-        ok = True
-        if dt_start:
-            ok = ok and (dt >= dt_start if inclusive else dt > dt_start)
-        if dt_end:
-            ok = ok and (dt <= dt_end if inclusive else dt < dt_end)
-        if ok:
-            idxs.append(i)
-
-    # Retrieve sequentially (already sorted by index/time)
-    outputs: List[str] = []
-    last_idx = None
-    for idx in idxs:
-        # Optionally coalesce adjacent indices into a single retrieve_range call.
-        outputs.extend(retrieve_range(article, base_texts, idx, 0))
-        last_idx = idx
-    return outputs
+
+def iter_by_time(
+    article: CompressedArticle,
+    base_texts: Dict[int, str],
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    *,
+    inclusive: bool = True,
+    cache: Optional[RevisionCache] = None,
+) -> Iterator[str]:
+    """Generator form of retrieve_by_time()."""
+    idxs = indices_by_time(article, start, end, inclusive=inclusive)
+    if not idxs:
+        return iter(())
+    if idxs[-1] - idxs[0] == len(idxs) - 1:
+        return iter_range(article, base_texts, idxs[0], len(idxs) - 1, cache=cache)
+    return iter_many(article, base_texts, idxs, cache=cache)
@@ -1,8 +1,13 @@
 from __future__ import annotations
-from typing import List, Dict, Tuple, Iterable
+from typing import List, Dict, Tuple, Iterable, Iterator
 import difflib
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
 from ..storage.compressed_store import CompressedArticle
-from typing import Any, List, Optional
+from ..compression.line_table import LineOp, LineTable, apply_ops
+from .cache import RevisionCache, article_key
+from typing import Any, Callable, List, Optional
 import warnings
 
 
@@ -12,82 +17,402 @@ def _apply_ndiff(prev_text: str, ndiff_lines: List[str]) -> str:
     return "".join(after_lines)
 
 
-def _find_partition(partitions: List[List[int]], idx: int) -> List[int]:
-    for part in partitions:
-        if idx in part:
-            return part
-    raise ValueError(f"revision index {idx} not found in any partition")
+def _compile_ndiff(ndiff_lines: List[str]) -> List[LineOp]:
+    """
+    ndiff line list -> edit script [i1, i2, new_lines] over the previous
+    revision's lines (the same shape as "lineid" patches), so applying it
+    only touches changed lines instead of re-parsing every "  " line.
+    """
+    ops: List[LineOp] = []
+    i = 0
+    cur = None
+    for line in ndiff_lines:
+        tag = line[:2]
+        if tag == "  ":
+            i += 1
+            cur = None
+        elif tag == "- " or tag == "+ ":
+            if cur is None:
+                cur = [i, i, []]
+                ops.append(cur)
+            if tag == "- ":
+                cur[1] += 1
+                i += 1
+            else:
+                cur[2].append(line[2:])
+        # "? " lines are intraline hints and carry no content
+    return ops
+
+
+def _apply_line_ops(lines: List[str], ops: List[LineOp]) -> List[str]:
+    out: List[str] = []
+    pos = 0
+    for i1, i2, new in ops:
+        out.extend(lines[pos:i1])
+        out.extend(new)
+        pos = i2
+    out.extend(lines[pos:])
+    return out
+
+
+def _line_table(article: CompressedArticle) -> LineTable:
+    table = getattr(article, "_line_table", None)
+    if table is None:
+        if article.lines is None:
+            raise ValueError("lineid article has no line table")
+        table = article._line_table = LineTable(article.lines)
+    return table
+
+
+def _codec(article: CompressedArticle) -> Tuple[Callable[[str], Any], Callable[[Any, Any], Any],
+                                                 Callable[[Any], str], Callable[[int, int], Any]]:
+    """
+    (seed, step, render, ops) for the article's patch encoding. The walk keeps
+    its state as a line-id array ("lineid") or a list of lines ("ndiff") and
+    only renders text for revisions that are returned. ops(u, v) is the edit
+    script of transition u -> v; ndiff patches are compiled on first use and
+    kept on the article, so later walks skip parsing them.
+    """
+    patches = article.patches
+
+    def fetch(u: int, v: int):
+        patch = patches.get((u, v))
+        if patch is None:
+            raise KeyError(f"Missing patch for transition {(u, v)}")
+        return patch
 
+    if article.meta.get("encoding") == "lineid":
+        table = _line_table(article)
+        return table.lookup, apply_ops, table.text, fetch
 
-def retrieve_range(
+    compiled = article.__dict__.setdefault("_compiled_patches", {})
+
+    def fetch_compiled(u: int, v: int):
+        ops = compiled.get((u, v))
+        if ops is None:
+            ops = compiled[(u, v)] = _compile_ndiff(fetch(u, v))
+        return ops
+
+    return _split_lines, _apply_line_ops, "".join, fetch_compiled
+
+
+def _split_lines(text: str) -> List[str]:
+    return text.splitlines(keepends=True)
+
+
+def _find_partition(article: CompressedArticle, idx: int) -> Tuple[int, int]:
+    try:
+        return article.locate(idx)
+    except KeyError:
+        raise ValueError(f"revision index {idx} not found in any partition") from None
+
+
+def _partition_states(article: CompressedArticle, base_texts: Dict[int, str], part_id: int,
+                      offsets: List[int], codec, cache: Optional[RevisionCache] = None) -> Iterator[Tuple[int, Any]]:
+    """
+    (offset, state) for the ascending `offsets` of one partition, with one
+    walk outward from the anchor in each direction: reverse patches down to
+    the lowest offset before the anchor (those states are collected, then
+    yielded in order) and forward patches up through the rest (yielded as
+    reached). Walks start from the nearest revision held in `cache` on the
+    way, and leave a checkpoint there every `checkpoint_every` patches.
+    """
+    seed, step, _, ops = codec
+    part = article.partitions()[part_id]
+    anchor = article.anchor_of(part_id)
+    a = article.locate(anchor)[1]
+    key = article_key(article) if cache is not None else None
+    every = cache.checkpoint_every if cache is not None else 0
+
+    def anchor_state():
+        if anchor not in base_texts:
+            raise KeyError(f"Missing base text for anchor {anchor}")
+        return seed(base_texts[anchor])
+
+    below = [o for o in offsets if o < a]
+    if below:
+        states: Dict[int, Any] = {}
+        need = set(below)
+        if cache is not None:
+            for o in below:
+                found = cache.get(key, part[o])
+                if found is not None:
+                    states[o] = found
+                    need.discard(o)
+        if need:
+            lo, hi = min(need), max(need)
+            start, cur = a, None
+            if cache is not None:
+                for i in range(hi + 1, a):
+                    cur = cache.peek(key, part[i])
+                    if cur is not None:
+                        start = i
+                        break
+            if cur is None:
+                cur = anchor_state()
+            for i in range(start - 1, lo - 1, -1):
+                cur = step(cur, ops(part[i + 1], part[i]))
+                if i in need:
+                    states[i] = cur
+                elif every and (a - i) % every == 0:
+                    cache.put(key, part[i], cur)
+        for o in below:
+            yield o, states[o]
+
+    have: Optional[Tuple[int, Any]] = None
+    for o in offsets:
+        if o < a:
+            continue
+        if have is None or o - have[0] > 1:
+            found = cache.get(key, part[o]) if cache is not None else None
+            if found is not None:
+                have = (o, found)
+                yield o, found
+                continue
+        if have is None:
+            start, cur = a, None
+            if cache is not None:
+                for i in range(o - 1, a, -1):
+                    cur = cache.peek(key, part[i])
+                    if cur is not None:
+                        start = i
+                        break
+            if cur is None:
+                cur = anchor_state()
+        else:
+            start, cur = have
+        for i in range(start + 1, o + 1):
+            cur = step(cur, ops(part[i - 1], part[i]))
+            if every and (i - a) % every == 0 and i < o:
+                cache.put(key, part[i], cur)
+        have = (o, cur)
+        yield o, cur
+
+
+def retrieve_many(
     article: CompressedArticle,
     base_texts: Dict[int, str],
-    start: int,
-    length: int
+    indices: Iterable[int],
+    *,
+    cache: Optional[RevisionCache] = None,
 ) -> List[str]:
     """
-    Retrieve revisions [start, start+length] as raw texts.
-    Requires:
-      - base_texts: dict of {anchor_index: full_text} for all anchors in article.anchors
+    Retrieve arbitrary revision indices, in the order given (duplicates
+    allowed). Requested revisions are grouped by partition and each partition
+    is walked once, so the cost is one chain walk per partition touched
+    rather than one per index.
+    """
+    indices = list(indices)
+    codec = _codec(article)
+    render = codec[2]
+    key = article_key(article) if cache is not None else None
+    parts = article.partitions()
+    plan: Dict[int, List[int]] = {}
+    for idx in set(indices):
+        part_id, offset = _find_partition(article, idx)
+        plan.setdefault(part_id, []).append(offset)
+
+    texts: Dict[int, str] = {}
+    for part_id in sorted(plan):
+        part = parts[part_id]
+        for offset, cur in _partition_states(article, base_texts, part_id, sorted(plan[part_id]), codec, cache):
+            if cache is not None:
+                cache.put(key, part[offset], cur)
+            texts[part[offset]] = render(cur)
+    return [texts[idx] for idx in indices]
+
+
+def _runs(article: CompressedArticle, indices: Iterable[int]) -> Iterator[Tuple[int, List[int]]]:
+    """Split `indices` into (partition id, ascending offsets) runs, keeping their order."""
+    run_part, run = None, []
+    for idx in indices:
+        part_id, offset = _find_partition(article, idx)
+        if run and (part_id != run_part or offset < run[-1]):
+            yield run_part, run
+            run = []
+        run_part = part_id
+        run.append(offset)
+    if run:
+        yield run_part, run
+
+
+_WORKER_TABLE: Optional[LineTable] = None
+
+
+def _init_worker(lines: Optional[List[str]]) -> None:
+    global _WORKER_TABLE
+    _WORKER_TABLE = LineTable(lines) if lines is not None else None
+
+
+def _run_task(article: CompressedArticle, base_texts: Dict[int, str], part_id: int, offsets: List[int]) -> Tuple:
+    """Picklable slice of one partition: the revisions between its anchor and `offsets`, and their patches."""
+    part = article.partitions()[part_id]
+    anchor = article.anchor_of(part_id)
+    a = article.locate(anchor)[1]
+    lo, hi = min(offsets[0], a), max(offsets[-1], a)
+    edges = [(part[i + 1], part[i]) for i in range(lo, a)] + [(part[i - 1], part[i]) for i in range(a + 1, hi + 1)]
+    patches = {}
+    for edge in edges:
+        patch = article.patches.get(edge)
+        if patch is None:
+            raise KeyError(f"Missing patch for transition {edge}")
+        patches[edge] = patch
+    if anchor not in base_texts:
+        raise KeyError(f"Missing base text for anchor {anchor}")
+    return (part[lo:hi + 1], anchor, base_texts[anchor], patches, [o - lo for o in offsets],
+            article.meta.get("encoding"))
+
+
+def _reconstruct_run(task: Tuple) -> List[str]:
+    part, anchor, base_text, patches, offsets, encoding = task
+    article = CompressedArticle(title="", anchors=[anchor], patches=patches,
+                                meta={"partitions": [part], "encoding": encoding})
+    if _WORKER_TABLE is not None:
+        article._line_table = _WORKER_TABLE
+    return list(_iter_runs(article, {anchor: base_text}, [(0, offsets)], None))
+
+
+def _iter_runs_parallel(article: CompressedArticle, base_texts: Dict[int, str],
+                        runs: List[Tuple[int, List[int]]], workers: int) -> Iterator[str]:
+    """
+    Reconstruct runs in a process pool and yield their texts in order. The
+    line table goes to each worker once; each task carries one partition
+    slice. At most 2 * workers runs are in flight, so memory stays bounded.
+    """
+    lines = article.lines if article.meta.get("encoding") == "lineid" else None
+    ex = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(lines,))
+    pending: deque = deque()
+    try:
+        for part_id, offsets in runs:
+            pending.append(ex.submit(_reconstruct_run, _run_task(article, base_texts, part_id, offsets)))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        ex.shutdown(wait=True, cancel_futures=True)
+
+
+def _iter_runs(article: CompressedArticle, base_texts: Dict[int, str], runs: Iterable[Tuple[int, List[int]]],
+               cache: Optional[RevisionCache], workers: Optional[int] = None) -> Iterator[str]:
+    if workers and workers > 1:
+        runs = list(runs)
+        if len(runs) > 1:
+            return _iter_runs_parallel(article, base_texts, runs, workers)
+    return _iter_runs_serial(article, base_texts, runs, cache)
+
+
+def _iter_runs_serial(article: CompressedArticle, base_texts: Dict[int, str],
+                      runs: Iterable[Tuple[int, List[int]]], cache: Optional[RevisionCache]) -> Iterator[str]:
+    codec = _codec(article)
+    render = codec[2]
+    key = article_key(article) if cache is not None else None
+    parts = article.partitions()
+    for part_id, offsets in runs:
+        part = parts[part_id]
+        for offset, cur in _partition_states(article, base_texts, part_id, offsets, codec, cache):
+            if cache is not None:
+                cache.put(key, part[offset], cur)
+            yield render(cur)
+
+
+def iter_many(
+    article: CompressedArticle,
+    base_texts: Dict[int, str],
+    indices: Iterable[int],
+    *,
+    cache: Optional[RevisionCache] = None,
+    workers: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    Yield the texts of `indices` in the order given, one at a time. Runs of
+    ascending indices within a partition share one walk, so sorted input
+    costs one walk per partition while only the revisions between the
+    anchor and the walk's end are held. For arbitrary orders retrieve_many()
+    batches better. `workers` > 1 reconstructs runs in a process pool (see
+    iter_range).
+    """
+    return _iter_runs(article, base_texts, _runs(article, indices), cache, workers)
+
+
+def _range_runs(article: CompressedArticle, start: int, end: int) -> Iterator[Tuple[int, List[int]]]:
+    parts = article.partitions()
+    last = max((p[-1] for p in parts if p), default=-1)
+    idx = start
+    while idx <= end and (idx == start or idx <= last):
+        part_id, offset = _find_partition(article, idx)
+        part = parts[part_id]
+        hi = offset
+        while hi + 1 < len(part) and part[hi + 1] == part[hi] + 1 and part[hi + 1] <= end:
+            hi += 1
+        yield part_id, list(range(offset, hi + 1))
+        idx = part[hi] + 1
+
+
+def iter_range(
+    article: CompressedArticle,
+    base_texts: Dict[int, str],
+    start: int,
+    length: int,
+    *,
+    cache: Optional[RevisionCache] = None,
+    workers: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    Yield revisions [start, start+length] as raw texts, each as soon as it is
+    reconstructed (revisions before an anchor placed mid-chain come from one
+    reverse walk, so those are yielded once it reaches the lowest). Each
+    revision is located through article.locate(), so a range costs one walk
+    per partition touched. With a RevisionCache, walks resume from cached
+    revisions and every yielded revision is cached.
+
+    With `workers` > 1 and a range spanning several partitions, partitions
+    are rebuilt concurrently in a process pool and streamed back in order;
+    patches are still decoded here, and `cache` is not used.
     """
     if length < 0:
         raise ValueError("length must be >= 0")
+    return _iter_runs(article, base_texts, _range_runs(article, start, start + length), cache, workers)
 
-    end = start + length
-    parts = article.partitions()
-    part = _find_partition(parts, start)
-    base = part[0]
-    if base not in base_texts:
-        raise KeyError(f"Missing base text for anchor {base}")
-
-    # Step 1: reconstruct up to `start`
-    cur_text = base_texts[base]
-    idx_in_part = part.index(start)
-    # walk from base->start
-    for i in range(1, idx_in_part + 1):
-        u, v = part[i-1], part[i]
-        patch = article.patches.get((u, v))
-        if patch is None:
-            # v must be an anchor starting a new block (shouldn't happen inside same part)
-            raise KeyError(f"Missing patch for transition {(u, v)}")
-        cur_text = _apply_ndiff(cur_text, patch)
 
-    results = [cur_text]
+def retrieve_range(
+    article: CompressedArticle,
+    base_texts: Dict[int, str],
+    start: int,
+    length: int,
+    *,
+    cache: Optional[RevisionCache] = None,
+    workers: Optional[int] = None,
+) -> List[str]:
+    """
+    Retrieve revisions [start, start+length] as raw texts (see iter_range).
+    Requires:
+      - base_texts: dict of {anchor_index: full_text} for all anchors in article.anchors
+    """
+    return list(iter_range(article, base_texts, start, length, cache=cache, workers=workers))
 
-    # Step 2: continue to end within same partition or across partitions
-    cur_idx = start
-    while cur_idx < end:
-        # try next in same partition
-        next_idx = cur_idx + 1
-        if next_idx in part:
-            patch = article.patches.get((cur_idx, next_idx))
-            if patch is None:
-                raise KeyError(f"Missing patch for transition {(cur_idx, next_idx)}")
-            cur_text = _apply_ndiff(cur_text, patch)
-            results.append(cur_text)
-            cur_idx = next_idx
-        else:
-            # move to next partition's base
-            # find which partition contains next_idx
-            if next_idx > max(max(p) for p in parts):
-                break
-            next_part = _find_partition(parts, next_idx)
-            base = next_part[0]
-            if base not in base_texts:
-                raise KeyError(f"Missing base text for anchor {base}")
-            cur_text = base_texts[base]
-            # walk up inside next partition until we reach `next_idx`
-            for i in range(1, next_part.index(next_idx) + 1):
-                u, v = next_part[i-1], next_part[i]
-                patch = article.patches.get((u, v))
-                if patch is None:
-                    raise KeyError(f"Missing patch for transition {(u, v)}")
-                cur_text = _apply_ndiff(cur_text, patch)
-            results.append(cur_text)
-            cur_idx = next_idx
-            part = next_part
 
-    return results
+def retrieve_latest(
+    article: CompressedArticle,
+    base_texts: Dict[int, str],
+    *,
+    cache: Optional[RevisionCache] = None,
+) -> str:
+    """
+    Text of the newest revision. Articles compressed with keep_tip=True keep
+    it verbatim in a frame of its own (or in the blob store), so a lazy
+    article reads only that text, whatever the chain length; with
+    anchor_placement="end" it is the last chain's anchor (that chain's frame
+    is decoded, no patches applied). Otherwise the last chain is walked.
+    """
+    parts = [p for p in article.partitions() if p]
+    if not parts:
+        raise ValueError("article has no revisions")
+    last = max(p[-1] for p in parts)
+    part_id = article.locate(last)[0]
+    if article.anchor_of(part_id) == last and last in base_texts:
+        return base_texts[last]
+    return retrieve_range(article, base_texts, last, 0, cache=cache)[0]
 
 
 def reconstruct_range(article: Any, start: int, length: int, *, base_texts: Optional[dict] = None) -> List[str]:
@@ -207,6 +532,16 @@ def reconstruct_range(article: Any, start: int, length: int, *, base_texts: Opti
     if not anchors_list:
         raise AttributeError("reconstruct_range: anchors could not be parsed; found anchors={!r}".format(anchors))
 
+    # Partitioned WikECD articles take the indexed walk: state stays as line
+    # lists / line-id arrays between steps and only returned revisions are joined.
+    if (isinstance(article, CompressedArticle) and isinstance(base_texts, Mapping) and article.partitions()
+            and all(article.anchor_of(i) in base_texts for i, p in enumerate(article.partitions()) if p)):
+        return retrieve_range(article, base_texts, start, length - 1)
+
+    line_table = None
+    if isinstance(article, CompressedArticle) and article.meta.get("encoding") == "lineid":
+        line_table = _line_table(article)
+
     # ---------------- helper functions ----------------
     def _get_patch_for_step(patches_obj, i):
         if patches_obj is None:
@@ -237,6 +572,8 @@ def reconstruct_range(article: Any, start: int, length: int, *, base_texts: Opti
             return text
         if callable(patch_obj):
             return patch_obj(text)
+        if line_table is not None and isinstance(patch_obj, (list, tuple)):
+            return line_table.text(apply_ops(line_table.lookup(text), patch_obj))
         # handle list-of-ops like ['- old', '+ new']
         if isinstance(patch_obj, (list, tuple)) and all(isinstance(x, str) for x in patch_obj):
             old = None
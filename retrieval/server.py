@@ -0,0 +1,298 @@
+# WikECD/retrieval/server.py
+from __future__ import annotations
+import asyncio
+import bisect
+import json
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from ..storage.blob_store import BlobStore
+from ..storage.store import open_store
+from .access import AccessLog
+from .cache import RevisionCache
+from .query import index_as_of, indices_by_revid
+from .retrieval import retrieve_latest, retrieve_range
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open.
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            500: "Internal Server Error"}
+
+
+class LatencyHistogram:
+    """Fixed-bucket request latency histogram with approximate quantiles."""
+
+    def __init__(self, buckets_ms: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000.0
+        self.counts[bisect.bisect_left(self.buckets_ms, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None if empty or in the open bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets_ms, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{b}" for b in self.buckets_ms] + ["inf"]
+        return {
+            "count": self.count,
+            "mean_ms": (self.sum_ms / self.count) if self.count else None,
+            "p50_ms": self.quantile(0.5),
+            "p99_ms": self.quantile(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class _ArticleCache:
+    """LRU of opened (article, base_texts) by store key."""
+
+    def __init__(self, store, max_articles: int):
+        self.store = store
+        self.max_articles = max_articles
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[str, Tuple[Any, Any]]" = OrderedDict()
+
+    def get(self, key: str):
+        item = self._items.get(key)
+        if item is not None:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item
+        self.misses += 1
+        article, base_texts = self.store.open_article(key)
+        article.cache_key = ("store", key)  # reopened articles share revision-cache entries
+        item = self._items[key] = (article, base_texts)
+        while len(self._items) > self.max_articles:
+            self._items.popitem(last=False)
+        return item
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"entries": len(self._items), "hits": self.hits, "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else None}
+
+
+# Per-worker state: each pool process opens the store once and keeps its own
+# warm article and revision caches across requests.
+_STATE: Optional[Tuple[_ArticleCache, RevisionCache]] = None
+
+
+def _init_worker(store_uri: str, zdict: Optional[bytes], blob_store_path: Optional[str],
+                 max_articles: int, revision_cache_bytes: int) -> None:
+    global _STATE
+    blob_store = BlobStore(blob_store_path) if blob_store_path else None
+    store = open_store(store_uri, zdict=zdict, blob_store=blob_store)
+    _STATE = (_ArticleCache(store, max_articles), RevisionCache(revision_cache_bytes))
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _lookup(kind: str, key: str, arg: Optional[str]) -> Tuple[int, Dict[str, Any], int, Dict[str, Any]]:
+    """
+    Worker side of one request: (status, payload, pid, cache stats). Runs in
+    the pool so decoding and patch application never block the event loop.
+    """
+    articles, revisions = _STATE
+    try:
+        article, base_texts = articles.get(key)
+        if kind == "latest":
+            text = retrieve_latest(article, base_texts, cache=revisions)
+            idx = max(p[-1] for p in article.partitions() if p)
+        else:
+            if kind == "rev":
+                idx = int(arg)
+            elif kind == "revid":
+                idx = indices_by_revid(article, [int(arg)], missing="error")[0]
+            else:  # "at"
+                idx = index_as_of(article, arg)
+                if idx is None:
+                    raise KeyError(f"{key!r} has no revision at or before {arg}")
+            text = retrieve_range(article, base_texts, idx, 0, cache=revisions)[0]
+        revids = article.meta.get("revids") or []
+        stamps = article.meta.get("timestamps") or []
+        status, payload = 200, {
+            "key": key,
+            "index": idx,
+            "revid": revids[idx] if idx < len(revids) else None,
+            "timestamp": stamps[idx] if idx < len(stamps) else None,
+            "text": text,
+        }
+    except KeyError as e:
+        status, payload = 404, {"error": str(e.args[0]) if e.args else "not found"}
+    except ValueError as e:
+        status, payload = 400, {"error": str(e)}
+    stats = {"articles": articles.stats(), "revisions": revisions.stats()}
+    return status, payload, os.getpid(), stats
+
+
+class RetrievalServer:
+    """
+    asyncio HTTP/1.1 server over a Store. Routes (GET, JSON responses;
+    `?format=text` returns the bare revision text):
+
+      /articles/<key>/latest
+      /articles/<key>/rev/<index>
+      /articles/<key>/revid/<revid>
+      /articles/<key>/at?ts=<ISO date or timestamp>
+      /metrics     latency histograms per route and per-worker cache stats
+      /health
+
+    Keys are URL-encoded path segments. Reconstruction runs in a pool of
+    `workers` processes (0: one in-process thread, e.g. for mem:// stores),
+    at most `max_pending` requests are dispatched at once. With `access_log`
+    (a path) the revisions served are counted per key and merged into that
+    file every `access_flush_every` requests and on close (see rebalance-hot).
+    """
+
+    def __init__(self, store_uri: str, *, workers: int = 2, zdict: Optional[bytes] = None,
+                 blob_store: Optional[str] = None, max_articles: int = 64,
+                 revision_cache_bytes: int = 256 << 20, max_pending: int = 64,
+                 access_log: Optional[str] = None, access_flush_every: int = 1000):
+        self.store_uri = store_uri
+        self.workers = workers
+        self._init_args = (store_uri, zdict, blob_store, max_articles, revision_cache_bytes)
+        self._max_pending = max_pending
+        self._pool: Optional[Executor] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self.worker_stats: Dict[int, Dict[str, Any]] = {}
+        self.access = AccessLog(access_log) if access_log else None
+        self._access_flush_every = access_flush_every
+        self._unflushed = 0
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        if self.workers > 0:
+            # spawn, not fork: forked workers would inherit the listening and
+            # accepted sockets and keep client connections open
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=self._init_args,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=1, initializer=_init_worker, initargs=self._init_args)
+        # start a worker (and open the store) before accepting connections, so
+        # a bad store URI fails here rather than on the first request
+        await asyncio.get_running_loop().run_in_executor(self._pool, _ping)
+        self._slots = asyncio.Semaphore(self._max_pending)
+        self._server = await asyncio.start_server(self._handle, host, port)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+        if self.access is not None and self._unflushed:
+            self.access.save()
+            self._unflushed = 0
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        await self.start(host, port)
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    def _observe(self, route: str, seconds: float) -> None:
+        hist = self.latency.get(route)
+        if hist is None:
+            hist = self.latency[route] = LatencyHistogram()
+        hist.observe(seconds)
+
+    async def _dispatch(self, method: str, target: str) -> Tuple[str, int, Any, bool]:
+        """(route, status, payload, as_text) for one request."""
+        if method != "GET":
+            return "other", 405, {"error": "only GET is supported"}, False
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        as_text = query.get("format", ["json"])[0] == "text"
+        parts = [unquote(p) for p in url.path.strip("/").split("/")]
+        if parts == ["health"]:
+            return "health", 200, {"status": "ok"}, False
+        if parts == ["metrics"]:
+            return "metrics", 200, {
+                "latency": {route: h.snapshot() for route, h in sorted(self.latency.items())},
+                "workers": {str(pid): stats for pid, stats in sorted(self.worker_stats.items())},
+            }, False
+        if len(parts) >= 3 and parts[0] == "articles":
+            key, kind, rest = parts[1], parts[2], parts[3:]
+            arg = None
+            if kind in ("rev", "revid") and len(rest) == 1:
+                arg = rest[0]
+            elif kind == "at" and not rest and query.get("ts"):
+                arg = query["ts"][0]
+            elif kind != "latest" or rest:
+                return "other", 404, {"error": f"no route for {url.path}"}, False
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                status, payload, pid, stats = await loop.run_in_executor(self._pool, _lookup, kind, key, arg)
+            self.worker_stats[pid] = stats
+            if self.access is not None and status == 200:
+                self.access.record(key, [payload["index"]])
+                self._unflushed += 1
+                if self._unflushed >= self._access_flush_every:
+                    self.access.save()
+                    self._unflushed = 0
+            return kind, status, payload, as_text and status == 200
+        return "other", 404, {"error": f"no route for {url.path}"}, False
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        t0 = time.perf_counter()
+        route = "other"
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass  # headers are not used
+            try:
+                method, target, _ = request_line.split(" ", 2)
+            except ValueError:
+                status, payload, as_text = 400, {"error": "malformed request line"}, False
+            else:
+                try:
+                    route, status, payload, as_text = await self._dispatch(method, target)
+                except Exception as e:  # keep serving; report the failure to the client
+                    status, payload, as_text = 500, {"error": f"{type(e).__name__}: {e}"}, False
+            if as_text:
+                body, ctype = payload["text"].encode("utf-8"), "text/plain; charset=utf-8"
+            else:
+                body, ctype = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json"
+            head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\nContent-Type: {ctype}\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+            writer.write(head.encode("latin-1") + body)
+            await writer.drain()
+        finally:
+            writer.close()
+            self._observe(route, time.perf_counter() - t0)
+
+
+def serve(store_uri: str, host: str = "127.0.0.1", port: int = 8080, **kwargs) -> None:
+    """Run a RetrievalServer until interrupted (kwargs as for RetrievalServer)."""
+    asyncio.run(RetrievalServer(store_uri, **kwargs).serve_forever(host, port))
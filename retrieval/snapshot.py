@@ -0,0 +1,101 @@
+# WikECD/retrieval/snapshot.py
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from ..storage.blob_store import BlobStore
+from ..storage.store import BaseStore, open_store
+from .query import index_as_of
+from .retrieval import retrieve_range
+
+# Per-worker store, opened once by the pool initializer.
+_STORE: Optional[BaseStore] = None
+
+
+def _init_worker(store_uri: str, zdict: Optional[bytes], blob_store_path: Optional[str]) -> None:
+    global _STORE
+    blob_store = BlobStore(blob_store_path) if blob_store_path else None
+    _STORE = open_store(store_uri, zdict=zdict, blob_store=blob_store)
+
+
+def _snapshot_row(store: BaseStore, key: str, when: str) -> Optional[Dict[str, Any]]:
+    """The revision of `key` current at `when`, or None if the page did not exist yet."""
+    article, base_texts = store.open_article(key)
+    idx = index_as_of(article, when)
+    if idx is None:
+        return None
+    revids = article.meta.get("revids") or []
+    stamps = article.meta.get("timestamps") or []
+    return {
+        "key": key,
+        "index": idx,
+        "revid": revids[idx] if idx < len(revids) else None,
+        "timestamp": stamps[idx] if idx < len(stamps) else None,
+        "text": retrieve_range(article, base_texts, idx, 0)[0],
+    }
+
+
+def _snapshot_batch(keys: List[str], when: str) -> List[Optional[Dict[str, Any]]]:
+    return [_snapshot_row(_STORE, key, when) for key in keys]
+
+
+def _batches(keys: Iterable[str], size: int) -> Iterator[List[str]]:
+    it = iter(keys)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_snapshot(
+    store_uri: str,
+    when: str,
+    *,
+    keys: Optional[Iterable[str]] = None,
+    jobs: int = 1,
+    zdict: Optional[bytes] = None,
+    blob_store: Optional[str] = None,
+    batch_size: int = 64,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Every page of a store as it was at `when`: one row (key, index, revid,
+    timestamp, text) per article that existed then, in the order of `keys`
+    (default: the store's iter_articles()).
+
+    Each article is opened lazily (meta frame only), the revision current at
+    `when` is found by binary search over its timestamps, and only the chain
+    holding it is decoded. With jobs > 1 batches of keys run in a process
+    pool whose workers open the store once; at most 2 * jobs batches are in
+    flight, so memory stays bounded for any corpus size.
+    """
+    if jobs <= 1:
+        store = open_store(store_uri, zdict=zdict, blob_store=BlobStore(blob_store) if blob_store else None)
+        try:
+            for key in (store.iter_articles() if keys is None else keys):
+                row = _snapshot_row(store, key, when)
+                if row is not None:
+                    yield row
+        finally:
+            store.close()
+        return
+
+    if keys is None:
+        store = open_store(store_uri, zdict=zdict)
+        try:
+            keys = list(store.iter_articles())
+        finally:
+            store.close()
+    ex = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(store_uri, zdict, blob_store))
+    pending: deque = deque()
+    try:
+        for batch in _batches(keys, batch_size):
+            pending.append(ex.submit(_snapshot_batch, batch, when))
+            if len(pending) >= 2 * jobs:
+                yield from filter(None, pending.popleft().result())
+        while pending:
+            yield from filter(None, pending.popleft().result())
+    finally:
+        ex.shutdown(wait=True, cancel_futures=True)
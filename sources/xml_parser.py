@@ -4,21 +4,34 @@ import os
 import bz2
 import xml.etree.ElementTree as ET
 from typing import Iterable, Optional, Set
+
+import indexed_bzip2
+
 from .base import Revision, RevisionSource
 
 
-def _open_maybe_bz2(path: str):
+def _open_maybe_bz2(path: str, parallelization: int = 1):
+    """
+    Text stream over a dump. `.bz2` files are decoded by the stdlib for
+    parallelization=1, otherwise by indexed_bzip2's block-parallel decoder
+    with that many threads (0: one per CPU).
+    """
     if path.endswith(".bz2"):
-        return bz2.open(path, mode="rt", encoding="utf-8", errors="replace")
+        if parallelization == 1:
+            return bz2.open(path, mode="rt", encoding="utf-8", errors="replace")
+        threads = parallelization if parallelization > 0 else (os.cpu_count() or 1)
+        raw = indexed_bzip2.open(path, parallelization=threads)
+        return io.TextIOWrapper(raw, encoding="utf-8", errors="replace")
     return open(path, mode="rt", encoding="utf-8", errors="replace")
 
+def _ns_from_tag(tag: str) -> str:
+    # "{namespace}" prefix of a qualified tag, or ""
+    return tag.split("}")[0] + "}" if tag.startswith("{") else ""
+
 def _ns_and_root(context):
     # Grab root and namespace (if any)
     _, root = next(context)
-    ns = ""
-    if root.tag.startswith("{"):
-        ns = root.tag.split("}")[0] + "}"
-    return ns, root
+    return _ns_from_tag(root.tag), root
 
 def _iter_pages(fh):
     """
@@ -42,10 +55,12 @@ def get_revisions_from_file(
     progress: bool = True,
     progress_interval: int = 250,
     max_pages_scan: Optional[int] = None,
+    parallelization: int = 1,
 ) -> Iterable[Revision]:
     """
     Stream Revision objects for pages matching page_ids OR titles from a local dump file.
     Uses ONLY direct children for page-level fields to avoid mixing with revision fields.
+    parallelization: bz2 decoder threads (see _open_maybe_bz2).
     """
     # normalize selectors
     page_ids = set(page_ids) if page_ids else None
@@ -53,7 +68,7 @@ def get_revisions_from_file(
     target_max_pid = max(page_ids) if page_ids else None
 
     scanned = 0
-    with _open_maybe_bz2(file_path) as fh:
+    with _open_maybe_bz2(file_path, parallelization) as fh:
         for ns, page in _iter_pages(fh):
             scanned += 1
             if progress and progress_interval and scanned % progress_interval == 0:
@@ -122,10 +137,13 @@ class XMLDumpSource(RevisionSource):
     """
     Stream parser for Wikipedia XML dumps (.xml or .xml.bz2).
     Yields Revision(revid, timestamp, text) for a given title or page_id.
+    `parallelization` > 1 (or 0 for one per CPU) decodes .bz2 dumps on that
+    many threads.
     """
 
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, parallelization: int = 1):
         self.file_path = file_path
+        self.parallelization = parallelization
 
     def get_revisions(
         self,
@@ -135,7 +153,7 @@ class XMLDumpSource(RevisionSource):
         max_revisions: Optional[int] = None,
     ) -> Iterable[Revision]:
         count = 0
-        with _open_maybe_bz2(self.file_path) as fh:
+        with _open_maybe_bz2(self.file_path, self.parallelization) as fh:
             context = ET.iterparse(fh, events=("start", "end"))
             _, root = next(context)
             ns = _ns_from_tag(root.tag)
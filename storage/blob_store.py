@@ -0,0 +1,114 @@
+# WikECD/storage/blob_store.py
+from __future__ import annotations
+import hashlib
+import sqlite3
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+from .chunking import ChunkCache, chunk_text
+
+
+def blob_hash(text: str) -> str:
+    """Content address of a text (sha256 over its UTF-8 bytes)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class BlobStore:
+    """
+    Content-addressed store for anchor full texts, shared by many artifacts.
+
+    Each distinct text is stored once (zlib-compressed) in a SQLite file,
+    keyed by its sha256, with a reference count of the artifacts using it.
+    Texts are deleted when their count drops to zero.
+
+    Anchors may also be stored as content-defined chunks (put_chunks), so
+    anchors that share paragraphs only pay for the chunks that differ;
+    reassembly goes through a byte-bounded chunk cache.
+    """
+
+    def __init__(self, path: str, level: int = 6, cache_bytes: int = 32 << 20):
+        self.path = path
+        self.level = level
+        self.cache = ChunkCache(cache_bytes)
+        self._db = sqlite3.connect(path, timeout=60)
+        self._db.execute("""
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash     TEXT PRIMARY KEY,
+            data     BLOB NOT NULL,
+            size     INTEGER NOT NULL,
+            refcount INTEGER NOT NULL
+        )""")
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "BlobStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def put(self, text: str) -> str:
+        """Store `text` (or add a reference to it) and return its hash."""
+        return self.put_many([text])[0]
+
+    def put_many(self, texts: Iterable[str]) -> List[str]:
+        """put() for several texts (one reference per occurrence) in a single transaction."""
+        hashes = []
+        for text in texts:
+            h = blob_hash(text)
+            raw = text.encode("utf-8")
+            cur = self._db.execute("UPDATE blobs SET refcount = refcount + 1 WHERE hash=?", (h,))
+            if cur.rowcount == 0:
+                self._db.execute(
+                    "INSERT INTO blobs(hash, data, size, refcount) VALUES (?, ?, ?, 1)",
+                    (h, zlib.compress(raw, self.level), len(raw)),
+                )
+            hashes.append(h)
+        self._db.commit()
+        return hashes
+
+    def get(self, h: str) -> str:
+        row = self._db.execute("SELECT data FROM blobs WHERE hash=?", (h,)).fetchone()
+        if row is None:
+            raise KeyError(f"blob {h} not found in {self.path}")
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def put_chunks(self, text: str) -> List[str]:
+        """Chunk `text`, store each chunk (one reference per occurrence) and return the hashes."""
+        return self.put_many(chunk_text(text))
+
+    def get_chunks(self, hashes: Iterable[str]) -> str:
+        return "".join([self.cache.get(h, self.get) for h in hashes])
+
+    def release(self, hashes: Iterable[str]) -> None:
+        """Drop one reference per hash; blobs without references are deleted."""
+        for h in hashes:
+            self._db.execute("UPDATE blobs SET refcount = refcount - 1 WHERE hash=?", (h,))
+            self._db.execute("DELETE FROM blobs WHERE hash=? AND refcount <= 0", (h,))
+        self._db.commit()
+
+    def refcount(self, h: str) -> int:
+        row = self._db.execute("SELECT refcount FROM blobs WHERE hash=?", (h,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """
+        blobs          : distinct texts stored
+        refs           : references held by artifacts
+        logical_bytes  : bytes the anchors would take if stored per artifact
+        physical_bytes : bytes of distinct texts (before zlib)
+        dedup_ratio    : logical_bytes / physical_bytes
+        """
+        blobs, refs, logical, physical = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(refcount), 0), COALESCE(SUM(size * refcount), 0), "
+            "COALESCE(SUM(size), 0) FROM blobs"
+        ).fetchone()
+        return {
+            "blobs": blobs,
+            "refs": refs,
+            "logical_bytes": logical,
+            "physical_bytes": physical,
+            "dedup_ratio": (logical / physical) if physical else None,
+        }
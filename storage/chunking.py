@@ -0,0 +1,81 @@
+# WikECD/storage/chunking.py
+from __future__ import annotations
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+AVG_CHUNK = 2048
+MIN_CHUNK = 256
+MAX_CHUNK = 16384
+
+
+def chunk_text(text: str, *, avg_size: int = AVG_CHUNK, min_size: int = MIN_CHUNK,
+               max_size: int = MAX_CHUNK) -> List[str]:
+    """
+    Split `text` into content-defined chunks ("".join(chunks) == text).
+
+    Wikitext is line oriented, so boundaries are only placed at line ends: a
+    line closes the chunk when its crc32 falls below a threshold proportional
+    to its length, which gives ~avg_size-character chunks whose boundaries move
+    with the content rather than with offsets. An inserted or moved paragraph
+    therefore only changes the chunks around it. Lines longer than max_size
+    are cut into fixed slices.
+    """
+    chunks: List[str] = []
+    cur: List[str] = []
+    size = 0
+    for line in text.splitlines(keepends=True):
+        while len(line) > max_size:
+            if cur:
+                chunks.append("".join(cur))
+                cur, size = [], 0
+            chunks.append(line[:max_size])
+            line = line[max_size:]
+        cur.append(line)
+        size += len(line)
+        if size < min_size:
+            continue
+        h = zlib.crc32(line.encode("utf-8"))
+        if size >= max_size or h * avg_size < len(line) << 32:
+            chunks.append("".join(cur))
+            cur, size = [], 0
+    if cur:
+        chunks.append("".join(cur))
+    return chunks
+
+
+class ChunkCache:
+    """Byte-bounded LRU of chunk texts keyed by hash, with hit/miss counters."""
+
+    def __init__(self, max_bytes: int = 32 << 20):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, h: str, load: Callable[[str], str]) -> str:
+        text = self._items.get(h)
+        if text is not None:
+            self._items.move_to_end(h)
+            self.hits += 1
+            return text
+        self.misses += 1
+        text = load(h)
+        if len(text) <= self.max_bytes:
+            self._items[h] = text
+            self.bytes += len(text)
+            while self.bytes > self.max_bytes:
+                _, old = self._items.popitem(last=False)
+                self.bytes -= len(old)
+        return text
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._items),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else None,
+        }
@@ -1,14 +1,18 @@
 from __future__ import annotations
+from collections.abc import Mapping
 from dataclasses import dataclass, field
-from typing import Dict, List, Tuple, Any
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Any
 
 @dataclass
 class CompressedArticle:
     """
     Representation:
       - anchors: list of base revision indices (0-based)
-      - patches: dict[(i-1, i)] -> ndiff lines from rev(i-1) to rev(i) for edges that are inside partitions
+      - patches: dict[(i-1, i)] -> ndiff lines from rev(i-1) to rev(i) for edges that are inside partitions;
+                 revisions before a partition's anchor (see anchor_of) have reverse patches (i+1, i) instead
       - meta: can include partitions, counts, etc.
+      - lines: line table for meta["encoding"] == "lineid" (patches are then edit
+               scripts over line ids, see compression/line_table.py); None for ndiff
     NOTE: Actual base texts are not stored here; caller should persist them externally
           or embed them (choose what fits your pipeline). For now we store them next to `meta` if needed.
     """
@@ -16,6 +20,145 @@ class CompressedArticle:
     anchors: List[int]
     patches: Dict[Tuple[int, int], List[str]]
     meta: Dict[str, Any] = field(default_factory=dict)
+    lines: Optional[List[str]] = None
 
     def partitions(self) -> List[List[int]]:
         return self.meta.get("partitions", [])
+
+    def anchor_of(self, part_id: int) -> int:
+        """
+        Anchor (full-text revision) of partition `part_id`: anchors[part_id]
+        when it lies in that partition (anchors placed mid-chain or at the
+        end, with reverse patches before them), else the partition's first
+        revision.
+        """
+        anchors = self.anchors
+        if part_id < len(anchors):
+            try:
+                if self.locate(anchors[part_id])[0] == part_id:
+                    return anchors[part_id]
+            except KeyError:
+                pass
+        return self.partitions()[part_id][0]
+
+    def locate(self, idx: int) -> Tuple[int, int]:
+        """
+        (partition id, offset in that partition) of revision `idx`; raises
+        KeyError for revisions outside every partition. The index is built once
+        and rebuilt only if meta["partitions"] is replaced.
+        """
+        parts = self.partitions()
+        cached = self.__dict__.get("_locator")
+        if cached is None or cached[0] is not parts:
+            index = {r: (i, off) for i, part in enumerate(parts) for off, r in enumerate(part)}
+            cached = self._locator = (parts, index)
+        return cached[1][idx]
+
+
+@dataclass
+class Chain:
+    """One partition as stored on disk: its anchor full text plus the patches inside it."""
+    anchor: Optional[int]
+    base_text: Optional[str]
+    patches: Dict[Tuple[int, int], List[str]] = field(default_factory=dict)
+    base_texts: Dict[int, str] = field(default_factory=dict)  # extra (non-chain) texts only
+
+
+class _ChainView(Mapping):
+    def __init__(self, article: "LazyCompressedArticle"):
+        self._article = article
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class _LazyPatches(_ChainView):
+    def __getitem__(self, key: Tuple[int, int]) -> List[str]:
+        u, v = key
+        return self._article._chain_for(v).patches[(u, v)]
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for chain in self._article._all_chains():
+            yield from chain.patches
+
+
+class _LazyBaseTexts(_ChainView):
+    def __getitem__(self, idx: int) -> str:
+        if idx == self._article._tip and self._article._load_tip is not None:
+            return self._article.tip_text()
+        chain = self._article._chain_for(idx)
+        if chain.anchor == idx and chain.base_text is not None:
+            return chain.base_text
+        return chain.base_texts[idx]
+
+    def __iter__(self) -> Iterator[int]:
+        for chain in self._article._all_chains():
+            if chain.anchor is not None and chain.base_text is not None:
+                yield chain.anchor
+            yield from chain.base_texts
+
+
+class LazyCompressedArticle(CompressedArticle):
+    """
+    CompressedArticle whose `meta` is decoded up front while `patches` and
+    `base_texts` are read-only mappings that decode one chain (partition) on
+    first access. `load_chain(i)` returns the Chain for partition i; index
+    len(partitions) holds anything that does not belong to a partition.
+    The line table of "lineid" artifacts is read by `load_lines()` on first use,
+    and the kept tip (revision `tip`, see keep_tip) by `load_tip()`, without
+    decoding its chain.
+    """
+
+    def __init__(self, title: str, anchors: List[int], meta: Dict[str, Any],
+                 load_chain: Callable[[int], Chain], has_extra: bool = False,
+                 load_lines: Optional[Callable[[], List[str]]] = None,
+                 tip: Optional[int] = None, load_tip: Optional[Callable[[], str]] = None):
+        self._load_lines = load_lines
+        self._tip = tip
+        self._load_tip = load_tip
+        self._tip_text: Optional[str] = None
+        super().__init__(title=title, anchors=anchors, patches=_LazyPatches(self), meta=meta)
+        self.base_texts = _LazyBaseTexts(self)
+        self._load_chain = load_chain
+        self._has_extra = has_extra
+        self._chains: Dict[int, Chain] = {}
+
+    @property
+    def lines(self) -> Optional[List[str]]:
+        if self._lines is None and self._load_lines is not None:
+            self._lines = self._load_lines()
+        return self._lines
+
+    @lines.setter
+    def lines(self, value: Optional[List[str]]) -> None:
+        self._lines = value
+
+    def tip_text(self) -> str:
+        if self._tip_text is None:
+            if self._load_tip is None:
+                raise KeyError("artifact has no kept tip")
+            self._tip_text = self._load_tip()
+        return self._tip_text
+
+    def chain(self, chain_id: int) -> Chain:
+        chain = self._chains.get(chain_id)
+        if chain is None:
+            chain = self._chains[chain_id] = self._load_chain(chain_id)
+        return chain
+
+    def loaded_chains(self) -> List[int]:
+        return sorted(self._chains)
+
+    def _chain_for(self, idx: int) -> Chain:
+        try:
+            chain_id = self.locate(idx)[0]
+        except KeyError:
+            if not self._has_extra:
+                raise
+            chain_id = len(self.partitions())
+        return self.chain(chain_id)
+
+    def _all_chains(self) -> Iterator[Chain]:
+        n = len(self.partitions()) + (1 if self._has_extra else 0)
+        for i in range(n):
+            yield self.chain(i)
@@ -0,0 +1,125 @@
+# WikECD/storage/revid_index.py
+from __future__ import annotations
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .store import BaseStore
+
+# file layout: HEADER, `count` RECORDs sorted by revid, then the key table as
+# JSON [[key, page_id], ...] (RECORD.key_id indexes it)
+MAGIC = b"WRID"
+INDEX_VERSION = 1
+HEADER = struct.Struct("<4sIQ")   # magic, version, record count
+RECORD = struct.Struct("<qII")    # revid, key id, revision index
+
+
+class RevidIndex:
+    """
+    Corpus-wide revid -> (store key, revision index) lookup over a sorted,
+    memory-mapped record file; each lookup is a binary search touching
+    O(log n) records. Build it with build_revid_index().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._fh.close()
+            raise ValueError(f"{path} is not a revid index") from None
+        magic, version, self.count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a revid index (version {INDEX_VERSION})")
+        keys_at = HEADER.size + self.count * RECORD.size
+        self._keys: List[List[Any]] = json.loads(self._mm[keys_at:].decode("utf-8"))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __enter__(self) -> "RevidIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._mm.close()
+        self._fh.close()
+
+    def _record(self, i: int) -> Tuple[int, int, int]:
+        return RECORD.unpack_from(self._mm, HEADER.size + i * RECORD.size)
+
+    def lookup(self, revid: int) -> Optional[Tuple[str, int]]:
+        """(store key, revision index) of `revid`, or None."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._record(mid)[0] < revid:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count:
+            rid, key_id, idx = self._record(lo)
+            if rid == revid:
+                return self._keys[key_id][0], idx
+        return None
+
+    def page_id(self, key: str) -> Optional[int]:
+        """Wikipedia page id recorded for `key` (None if unknown)."""
+        page_ids = self.__dict__.get("_page_ids")
+        if page_ids is None:
+            page_ids = self._page_ids = {k: p for k, p in self._keys}
+        return page_ids.get(key)
+
+    def records(self) -> Iterable[Tuple[int, str, int]]:
+        """All (revid, key, index) in revid order."""
+        for i in range(self.count):
+            rid, key_id, idx = self._record(i)
+            yield rid, self._keys[key_id][0], idx
+
+
+def _write_index(path: str, rows: List[Tuple[int, str, int]], page_ids: Dict[str, Optional[int]]) -> None:
+    keys = sorted(page_ids)
+    key_ids = {k: i for i, k in enumerate(keys)}
+    rows.sort(key=lambda r: (r[0], r[1]))
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, INDEX_VERSION, len(rows)))
+        for rid, key, idx in rows:
+            f.write(RECORD.pack(rid, key_ids[key], idx))
+        f.write(json.dumps([[k, page_ids[k]] for k in keys], ensure_ascii=False).encode("utf-8"))
+    os.replace(tmp, path)
+
+
+def build_revid_index(store: BaseStore, path: str, *, keys: Optional[Iterable[str]] = None) -> int:
+    """
+    Write the revid index of `store` to `path` from each artifact's meta
+    (framed artifacts: the index frame only, no chain is decoded). With
+    `keys`, only those articles are re-read and merged into the existing
+    index at `path`, so it can be refreshed after a batch of writes without
+    rescanning the store. Returns the number of indexed revisions.
+    """
+    rows: List[Tuple[int, str, int]] = []
+    page_ids: Dict[str, Optional[int]] = {}
+    if keys is not None:
+        keys = list(keys)
+        if os.path.exists(path):
+            changed = set(keys)
+            with RevidIndex(path) as old:
+                rows = [r for r in old.records() if r[1] not in changed]
+                page_ids = {k: p for k, p in old._keys if k not in changed}
+    for key in (store.iter_articles() if keys is None else keys):
+        if key not in store:
+            continue
+        meta = store.get_meta(key)["meta"]
+        page_ids[key] = meta.get("page_id")
+        rows.extend((int(rid), key, idx) for idx, rid in enumerate(meta.get("revids") or []) if rid is not None)
+    indexed = {r[1] for r in rows}
+    page_ids = {k: p for k, p in page_ids.items() if k in indexed}
+    _write_index(path, rows, page_ids)
+    return len(rows)
@@ -1,34 +1,562 @@
 from __future__ import annotations
-import json, gzip
-from typing import Dict, Any
-from .compressed_store import CompressedArticle
-
-def dumps(article: CompressedArticle, base_texts: Dict[int, str] | None = None) -> bytes:
-    payload: Dict[str, Any] = {
-        "title": article.title,
-        "anchors": article.anchors,
-        "patches": {f"{u}-{v}": p for (u, v), p in article.patches.items()},
-        "meta": article.meta,
-        "base_texts": base_texts or {},  # optional embed
-    }
-    return gzip.compress(json.dumps(payload).encode("utf-8"))
-
-def loads(blob: bytes) -> tuple[CompressedArticle, Dict[int, str]]:
-    obj = json.loads(gzip.decompress(blob).decode("utf-8"))
-    patches = {}
-    for k, v in obj["patches"].items():
-        u, v2 = map(int, k.split("-"))
-        patches[(u, v2)] = v
+import io, json, gzip, lzma, os, struct, zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Callable, Deque, Dict, Any, List, Optional, Tuple, Union
+from .compressed_store import CompressedArticle, LazyCompressedArticle, Chain
+from .zdict import dictionary_id, compress_with_dictionary, decompress_with_dictionary
+from .blob_store import BlobStore, blob_hash
+from .chunking import chunk_text
+from ..compression.line_table import LineTable
+
+# On-disk layout (version 2):
+#   header  : magic, version, codec, flags, dict id
+#   frames  : one compressed JSON frame per partition ("chain"), optionally with a zdict;
+#             "lineid" artifacts add a final frame holding the article's line table
+#   index   : zlib JSON {title, anchors, meta, frames: [[offset, length], ...]} (never uses the zdict)
+#             plus anchor_refs {anchor: sha256} when anchor texts live in a shared BlobStore,
+#             anchor_chunks {anchor: [sha256, ...]} when they are stored as chunks there
+#             and lines_frame (frame number of the line table) for "lineid" artifacts,
+#             tip (anchor kept as the newest revision, keep_tip) and tip_frame (the last frame,
+#             holding that text alone, unless it lives in the BlobStore)
+#   trailer : index offset, index length, magic
+# so metadata is readable with three small reads and chains decode independently.
+# Plain gzip(JSON) artifacts (the original format) are still readable. Version 1 was never
+# released; its header is rejected like any unknown version.
+MAGIC = b"WECD"
+HEADER = struct.Struct("<4sBBHI")
+TRAILER = struct.Struct("<QI4s")
+FORMAT_VERSION = 2
+CODEC_ZLIB = 1
+CODEC_LZMA = 2      # frames only; the index is always zlib
+CODECS = {"zlib": CODEC_ZLIB, "lzma": CODEC_LZMA}
+LZMA_DICT_SIZE = 1 << 22  # frames are small; keeps encoder memory bounded at high presets
+GZIP_MAGIC = b"\x1f\x8b"
+ANCHOR_ENCODINGS = ("text", "chunks")
+
+ReadAt = Callable[[int, int], bytes]
+
+
+def _from_payload(raw: bytes) -> tuple[CompressedArticle, Dict[int, str]]:
+    obj = json.loads(raw.decode("utf-8"))
     article = CompressedArticle(
-        title=obj["title"], anchors=obj["anchors"], patches=patches, meta=obj.get("meta", {})
+        title=obj["title"], anchors=obj["anchors"], patches=_decode_patches(obj["patches"]),
+        meta=obj.get("meta", {}), lines=obj.get("lines"),
     )
     base_texts = {int(k): v for k, v in obj.get("base_texts", {}).items()}
     return article, base_texts
 
-def save(path: str, article: CompressedArticle, base_texts: Dict[int, str] | None = None) -> None:
-    with open(path, "wb") as f:
-        f.write(dumps(article, base_texts))
 
-def load(path: str) -> tuple[CompressedArticle, Dict[int, str]]:
+def _decode_patches(raw: Dict[str, Any]) -> Dict[Tuple[int, int], Any]:
+    patches = {}
+    for k, v in raw.items():
+        u, v2 = map(int, k.split("-"))
+        patches[(u, v2)] = v
+    return patches
+
+
+def _check_dictionary(header: Dict[str, int], zdict: bytes | None) -> Optional[bytes]:
+    dict_id = header["dict_id"]
+    if dict_id and dictionary_id(zdict or b"") != dict_id:
+        raise ValueError(f"Artifact was compressed with dictionary {dict_id:08x}; pass the matching zdict")
+    return zdict if dict_id else None
+
+
+def read_header(blob: bytes) -> Optional[Dict[str, int]]:
+    """Decode the artifact header, or None for legacy gzip artifacts."""
+    if len(blob) < HEADER.size or blob[:4] != MAGIC:
+        return None
+    magic, version, codec, flags, dict_id = HEADER.unpack_from(blob)
+    return {"version": version, "codec": codec, "flags": flags, "dict_id": dict_id}
+
+
+# ---------------------------------------------------------------------------
+# Frames / writer
+# ---------------------------------------------------------------------------
+def _chain_from_frame(obj: Dict[str, Any], blob_store: BlobStore | None = None,
+                      lines: Callable[[], List[str]] | None = None,
+                      tip: Callable[[], str] | None = None) -> Chain:
+    base_text = obj.get("base_text")
+    if obj.get("base_tip"):
+        if tip is None:
+            raise ValueError("Chain keeps its anchor in the tip frame but the artifact has none")
+        base_text = tip()
+    elif "base_ids" in obj:
+        table = lines() if lines is not None else None
+        if table is None:
+            raise ValueError("Chain stores its anchor as line ids but the artifact has no line table")
+        base_text = "".join([table[i] for i in obj["base_ids"]])
+    elif "base_chunks" in obj:
+        if blob_store is None:
+            raise ValueError("Artifact stores anchors as chunks in a blob store; pass blob_store=")
+        base_text = blob_store.get_chunks(obj["base_chunks"])
+    elif "base_ref" in obj:
+        if blob_store is None:
+            raise ValueError("Artifact stores anchors in a blob store; pass blob_store=")
+        base_text = blob_store.get(obj["base_ref"])
+    return Chain(
+        anchor=obj.get("anchor"),
+        base_text=base_text,
+        patches=_decode_patches(obj.get("patches", {})),
+        base_texts={int(k): v for k, v in obj.get("base_texts", {}).items()},
+    )
+
+
+def _compress(data: bytes, zdict: bytes | None, level: int, codec: int = CODEC_ZLIB) -> bytes:
+    if codec == CODEC_LZMA:
+        filters = [{"id": lzma.FILTER_LZMA1, "preset": level, "dict_size": LZMA_DICT_SIZE}]
+        return lzma.compress(data, format=lzma.FORMAT_ALONE, filters=filters)
+    return compress_with_dictionary(data, zdict, level)
+
+
+def _decompress(blob: bytes, zdict: bytes | None, codec: int = CODEC_ZLIB) -> bytes:
+    if codec == CODEC_LZMA:
+        return lzma.decompress(blob, format=lzma.FORMAT_ALONE)
+    return decompress_with_dictionary(blob, zdict)
+
+
+def _encode_frame(obj: Dict[str, Any], zdict: bytes | None, level: int, codec: int = CODEC_ZLIB) -> bytes:
+    return _compress(json.dumps(obj).encode("utf-8"), zdict, level, codec)
+
+
+def _decode_frame(blob: bytes, zdict: bytes | None, codec: int = CODEC_ZLIB) -> Dict[str, Any]:
+    return json.loads(_decompress(blob, zdict, codec).decode("utf-8"))
+
+
+class ArtifactWriter:
+    """
+    Streaming writer for the framed format.
+
+        with ArtifactWriter("page.comp.gz", zdict=zd) as w:
+            article = compress_article(title, revs, writer=w)
+
+    Each add_chain() call becomes one frame that is compressed (in a thread
+    pool of `workers`, default one per CPU) and flushed to disk in order, with
+    at most ~2 frames per worker in flight. The index (title, anchors, meta,
+    frame table) is written on close from the article passed to set_article(),
+    so meta may keep changing until then. Writing to a path goes through a
+    temporary file that replaces the target only on success.
+
+    For "lineid" articles, add_lines() stores the line table after the chains
+    and anchors may be passed as line ids (base_ids) instead of text.
+
+    The anchor of a chain added with tip=True (keep_tip) is written verbatim
+    as the artifact's last frame, on its own, so the newest revision is read
+    without decoding its chain.
+
+    With a blob_store, anchor texts are stored there either whole
+    (anchor_encoding="text") or as content-defined chunks ("chunks"). Their
+    hashes are computed as chains are added; the texts go into the blob
+    store in one transaction on close, so concurrent writers sharing it
+    take its write lock once per artifact.
+
+    Frames use zlib (optionally with `zdict`) or, with codec="lzma", LZMA at
+    preset `level`; the codec is recorded in the header.
+    """
+
+    def __init__(
+        self,
+        target: Union[str, BinaryIO],
+        *,
+        zdict: bytes | None = None,
+        level: int = 9,
+        blob_store: BlobStore | None = None,
+        workers: Optional[int] = None,
+        anchor_encoding: str = "text",
+        codec: str = "zlib",
+    ):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec!r} (expected one of {sorted(CODECS)})")
+        if codec == "lzma" and zdict:
+            raise ValueError("Preset dictionaries are only supported with the zlib codec")
+        if anchor_encoding not in ANCHOR_ENCODINGS:
+            raise ValueError(f"Unknown anchor encoding: {anchor_encoding!r} (expected one of {ANCHOR_ENCODINGS})")
+        if anchor_encoding == "chunks" and blob_store is None:
+            raise ValueError('anchor_encoding="chunks" needs a blob_store')
+        self.path = target if isinstance(target, str) else None
+        self._anchor_encoding = anchor_encoding
+        self._zdict = zdict or None
+        self._level = level
+        self._codec = CODECS[codec]
+        self._blob_store = blob_store
+        self._workers = (os.cpu_count() or 1) if workers is None else max(1, workers)
+        self._pool = ThreadPoolExecutor(max_workers=self._workers) if self._workers > 1 else None
+        self._pending: Deque[Future] = deque()
+        self._table: List[List[int]] = []
+        self._anchor_refs: Dict[str, str] = {}
+        self._anchor_chunks: Dict[str, List[str]] = {}
+        self._blobs: List[str] = []  # texts behind _anchor_refs/_anchor_chunks, stored on close
+        self._has_extra = False
+        self._frames = 0
+        self._lines_frame: Optional[int] = None
+        self._article: Optional[CompressedArticle] = None
+        self._tip: Optional[int] = None
+        self._tip_text: Optional[str] = None
+        # references held by an artifact we are about to overwrite
+        self._stale: List[str] = []
+        if self.path is not None:
+            if blob_store is not None and os.path.exists(self.path):
+                self._stale = held_refs(self.path)
+            self._fh: BinaryIO = open(self.path + ".tmp", "wb")
+        else:
+            self._fh = target
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, self._codec, 0, dictionary_id(self._zdict) if self._zdict else 0)
+        self._fh.write(header)
+        self._offset = HEADER.size
+
+    def __enter__(self) -> "ArtifactWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add_chain(self, anchor: Optional[int], base_text: Optional[str],
+                  patches: Dict[Tuple[int, int], Any], *, base_ids: Optional[List[int]] = None,
+                  tip: bool = False) -> None:
+        """Append one partition: its anchor full text and the patches inside it, in order."""
+        if self._has_extra or self._lines_frame is not None:
+            raise ValueError("add_chain() after add_extra()/add_lines(): chains must come first")
+        if tip and (self._tip is not None or base_text is None):
+            raise ValueError("tip=True needs the anchor text, and only one chain may hold the tip")
+        frame: Dict[str, Any] = {"anchor": anchor, "patches": {f"{u}-{v}": p for (u, v), p in patches.items()}}
+        if tip:
+            self._tip = anchor
+        if self._anchor_encoding == "chunks" and base_text is not None:
+            chunks = chunk_text(base_text)
+            self._blobs.extend(chunks)
+            frame["base_chunks"] = self._anchor_chunks[str(anchor)] = [blob_hash(c) for c in chunks]
+        elif self._blob_store is not None and base_text is not None:
+            self._blobs.append(base_text)
+            frame["base_ref"] = self._anchor_refs[str(anchor)] = blob_hash(base_text)
+        elif tip:
+            frame["base_tip"] = True
+            self._tip_text = base_text
+        elif base_ids is not None:
+            frame["base_ids"] = list(base_ids)
+        else:
+            frame["base_text"] = base_text
+        self._submit(frame)
+
+    def add_extra(self, patches: Dict[Tuple[int, int], Any], base_texts: Dict[int, str]) -> None:
+        """Patches/texts that belong to no partition (kept so conversion stays lossless)."""
+        if self._has_extra or self._lines_frame is not None:
+            raise ValueError("add_extra() may only be called once, before add_lines()")
+        self._submit({
+            "anchor": None,
+            "base_text": None,
+            "patches": {f"{u}-{v}": p for (u, v), p in patches.items()},
+            "base_texts": base_texts,
+        })
+        self._has_extra = True
+
+    def add_lines(self, lines: List[str]) -> None:
+        """Store the line table of a "lineid" article (after all chains)."""
+        if self._lines_frame is not None:
+            raise ValueError("add_lines() may only be called once")
+        self._lines_frame = self._frames
+        self._submit({"lines": lines})
+
+    def set_article(self, article: CompressedArticle) -> None:
+        self._article = article
+
+    def _submit(self, frame: Dict[str, Any]) -> None:
+        self._frames += 1
+        if self._pool is None:
+            self._write(_encode_frame(frame, self._zdict, self._level, self._codec))
+            return
+        self._pending.append(self._pool.submit(_encode_frame, frame, self._zdict, self._level, self._codec))
+        while len(self._pending) > 2 * self._workers:
+            self._write(self._pending.popleft().result())
+
+    def _write(self, blob: bytes) -> None:
+        self._table.append([self._offset, len(blob)])
+        self._fh.write(blob)
+        self._offset += len(blob)
+
+    def close(self) -> None:
+        tip_frame = None
+        if self._tip_text is not None:
+            tip_frame = self._frames
+            self._submit({"base_text": self._tip_text})
+        while self._pending:
+            self._write(self._pending.popleft().result())
+        if self._pool is not None:
+            self._pool.shutdown()
+        if self._article is None:
+            self.abort()
+            raise ValueError("ArtifactWriter closed without set_article()")
+        article = self._article
+        index_obj: Dict[str, Any] = {
+            "title": article.title,
+            "anchors": article.anchors,
+            "meta": article.meta,
+            "frames": self._table,
+            "extra": self._has_extra,
+        }
+        if self._anchor_refs:
+            index_obj["anchor_refs"] = self._anchor_refs
+        if self._anchor_chunks:
+            index_obj["anchor_chunks"] = self._anchor_chunks
+        if self._lines_frame is not None:
+            index_obj["lines_frame"] = self._lines_frame
+        if self._tip is not None:
+            index_obj["tip"] = self._tip
+        if tip_frame is not None:
+            index_obj["tip_frame"] = tip_frame
+        index = zlib.compress(json.dumps(index_obj).encode("utf-8"), self._level)
+        self._fh.write(index)
+        self._fh.write(TRAILER.pack(self._offset, len(index), MAGIC))
+        if self._blobs:
+            self._blob_store.put_many(self._blobs)
+            self._blobs = []
+        if self.path is not None:
+            self._fh.close()
+            os.replace(self.path + ".tmp", self.path)
+            if self._stale:
+                self._blob_store.release(self._stale)
+
+    def abort(self) -> None:
+        for fut in self._pending:
+            fut.cancel()
+        self._pending.clear()
+        if self._pool is not None:
+            self._pool.shutdown()
+        if self.path is not None:
+            self._fh.close()
+            if os.path.exists(self.path + ".tmp"):
+                os.remove(self.path + ".tmp")
+        self._blobs = []  # nothing was stored in the blob store yet
+
+
+def _write_article(writer: ArtifactWriter, article: CompressedArticle, base_texts: Dict[int, str] | None) -> None:
+    """Feed an in-memory article to a writer, one frame per partition."""
+    base_texts = dict(base_texts or {})
+    patches = dict(article.patches.items())
+    table = LineTable(article.lines) if article.lines is not None else None
+    parts = article.partitions()
+    tip = len(parts) - 1 if article.meta.get("keep_tip") else None
+    for part_id, part in enumerate(parts):
+        anchor = article.anchor_of(part_id) if part else None
+        members = set(part)
+        chain_patches = {(u, v): patches.pop((u, v)) for (u, v) in list(patches) if v in members}
+        base_text = base_texts.pop(anchor, None)
+        base_ids = None
+        if table is not None and base_text is not None and part_id != tip:
+            try:
+                base_ids = table.lookup(base_text)
+            except KeyError:
+                pass  # text not from this article's table; keep it verbatim
+        writer.add_chain(anchor, base_text, chain_patches, base_ids=base_ids,
+                         tip=part_id == tip and base_text is not None)
+    if patches or base_texts:
+        writer.add_extra(patches, base_texts)
+    if table is not None:
+        writer.add_lines(table.lines)
+    writer.set_article(article)
+
+
+def dumps(
+    article: CompressedArticle,
+    base_texts: Dict[int, str] | None = None,
+    *,
+    zdict: bytes | None = None,
+    level: int = 9,
+    blob_store: BlobStore | None = None,
+    workers: Optional[int] = None,
+    anchor_encoding: str = "text",
+    codec: str = "zlib",
+) -> bytes:
+    """
+    Serialize to the framed format. `workers` threads compress frames
+    (default: one per CPU, 1 = serial); output is identical either way.
+    """
+    buf = io.BytesIO()
+    with ArtifactWriter(buf, zdict=zdict, level=level, blob_store=blob_store, workers=workers,
+                        anchor_encoding=anchor_encoding, codec=codec) as w:
+        _write_article(w, article, base_texts)
+    return buf.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# Readers
+# ---------------------------------------------------------------------------
+def _read_index(read_at: ReadAt, size: int) -> Tuple[Dict[str, int], Dict[str, Any]]:
+    header = read_header(read_at(0, HEADER.size))
+    if header is None or header["version"] != FORMAT_VERSION:
+        raise ValueError("Not a framed (version 2) WikECD artifact")
+    if header["codec"] not in CODECS.values():
+        raise ValueError(f"Unsupported artifact codec: {header['codec']}")
+    index_offset, index_length, magic = TRAILER.unpack(read_at(size - TRAILER.size, TRAILER.size))
+    if magic != MAGIC:
+        raise ValueError("Truncated WikECD artifact (missing trailer)")
+    index = json.loads(zlib.decompress(read_at(index_offset, index_length)).decode("utf-8"))
+    return header, index
+
+
+def _lazy_article(read_at: ReadAt, size: int, zdict: bytes | None,
+                  blob_store: BlobStore | None = None) -> LazyCompressedArticle:
+    header, index = _read_index(read_at, size)
+    zdict = _check_dictionary(header, zdict)
+    codec = header["codec"]
+    table = index["frames"]
+    lines_frame = index.get("lines_frame")
+    tip, tip_frame = index.get("tip"), index.get("tip_frame")
+
+    def load_chain(i: int) -> Chain:
+        offset, length = table[i]
+        return _chain_from_frame(_decode_frame(read_at(offset, length), zdict, codec), blob_store,
+                                 lambda: article.lines, article.tip_text)
+
+    def load_tip() -> str:
+        if tip_frame is not None:
+            offset, length = table[tip_frame]
+            return _decode_frame(read_at(offset, length), zdict, codec)["base_text"]
+        # kept in the blob store: resolve it from the index references
+        obj: Dict[str, Any] = {"anchor": tip}
+        if tip in article.anchor_chunks:
+            obj["base_chunks"] = article.anchor_chunks[tip]
+        else:
+            obj["base_ref"] = article.anchor_refs[tip]
+        return _chain_from_frame(obj, blob_store).base_text
+
+    def load_lines() -> List[str]:
+        offset, length = table[lines_frame]
+        return _decode_frame(read_at(offset, length), zdict, codec)["lines"]
+
+    article = LazyCompressedArticle(
+        title=index["title"], anchors=index["anchors"], meta=index.get("meta", {}),
+        load_chain=load_chain, has_extra=index.get("extra", False),
+        load_lines=load_lines if lines_frame is not None else None,
+        tip=tip, load_tip=load_tip if tip is not None else None,
+    )
+    article.anchor_refs = {int(k): v for k, v in index.get("anchor_refs", {}).items()}
+    article.anchor_chunks = {int(k): v for k, v in index.get("anchor_chunks", {}).items()}
+    return article
+
+
+def _materialize(article: LazyCompressedArticle) -> tuple[CompressedArticle, Dict[int, str]]:
+    eager = CompressedArticle(title=article.title, anchors=article.anchors,
+                              patches=dict(article.patches.items()), meta=article.meta, lines=article.lines)
+    return eager, dict(article.base_texts.items())
+
+
+def decode_payload(blob: bytes, zdict: bytes | None = None) -> bytes:
+    """Return the uncompressed payload of an artifact blob (all frames for framed artifacts)."""
+    if blob[:2] == GZIP_MAGIC:
+        return gzip.decompress(blob)
+    header = read_header(blob)
+    if header is None:
+        raise ValueError("Not a WikECD artifact (unknown magic)")
+    if header["version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported WikECD artifact version {header['version']}")
+    _, index = _read_index(lambda o, n: blob[o:o + n], len(blob))
+    zdict = _check_dictionary(header, zdict)
+    return b"\n".join(_decompress(blob[o:o + n], zdict, header["codec"]) for o, n in index["frames"])
+
+
+def loads(blob: bytes, *, zdict: bytes | None = None,
+          blob_store: BlobStore | None = None) -> tuple[CompressedArticle, Dict[int, str]]:
+    header = read_header(blob)
+    if header is not None and header["version"] == FORMAT_VERSION:
+        return _materialize(_lazy_article(lambda o, n: blob[o:o + n], len(blob), zdict, blob_store))
+    return _from_payload(decode_payload(blob, zdict))
+
+
+def loads_lazy(blob: bytes, *, zdict: bytes | None = None,
+               blob_store: BlobStore | None = None) -> tuple[CompressedArticle, Dict[int, str]]:
+    """Like loads(), but framed artifacts decode chains on first access."""
+    header = read_header(blob)
+    if header is not None and header["version"] == FORMAT_VERSION:
+        article = _lazy_article(lambda o, n: blob[o:o + n], len(blob), zdict, blob_store)
+        return article, article.base_texts
+    return loads(blob, zdict=zdict)
+
+
+def save(
+    path: str,
+    article: CompressedArticle,
+    base_texts: Dict[int, str] | None = None,
+    *,
+    zdict: bytes | None = None,
+    level: int = 9,
+    blob_store: BlobStore | None = None,
+    workers: Optional[int] = None,
+    anchor_encoding: str = "text",
+    codec: str = "zlib",
+) -> None:
+    with ArtifactWriter(path, zdict=zdict, level=level, blob_store=blob_store, workers=workers,
+                        anchor_encoding=anchor_encoding, codec=codec) as w:
+        _write_article(w, article, base_texts)
+
+
+def load(path: str, *, zdict: bytes | None = None,
+         blob_store: BlobStore | None = None) -> tuple[CompressedArticle, Dict[int, str]]:
+    with open(path, "rb") as f:
+        return loads(f.read(), zdict=zdict, blob_store=blob_store)
+
+
+def _file_reader(path: str) -> ReadAt:
+    def read_at(offset: int, length: int) -> bytes:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+    return read_at
+
+
+def open_article(path: str, *, zdict: bytes | None = None,
+                 blob_store: BlobStore | None = None) -> tuple[CompressedArticle, Dict[int, str]]:
+    """
+    Open an artifact lazily: `meta` is available immediately and each chain's
+    patches/base text are decoded on first access. Legacy gzip JSON artifacts
+    have no frames and are loaded eagerly.
+    """
+    read_at = _file_reader(path)
+    header = read_header(read_at(0, HEADER.size))
+    if header is None or header["version"] != FORMAT_VERSION:
+        return load(path, zdict=zdict)
+    article = _lazy_article(read_at, os.path.getsize(path), zdict, blob_store)
+    return article, article.base_texts
+
+
+def anchor_refs(path: str) -> Dict[int, str]:
+    """Blob-store hashes referenced by an artifact ({} if anchors are embedded)."""
+    read_at = _file_reader(path)
+    header = read_header(read_at(0, HEADER.size))
+    if header is None or header["version"] != FORMAT_VERSION:
+        return {}
+    _, index = _read_index(read_at, os.path.getsize(path))
+    return {int(k): v for k, v in index.get("anchor_refs", {}).items()}
+
+
+def _refs_of(anchor_refs: Dict[Any, str], anchor_chunks: Dict[Any, List[str]]) -> List[str]:
+    refs = list(anchor_refs.values())
+    for hashes in anchor_chunks.values():
+        refs.extend(hashes)
+    return refs
+
+
+def held_refs(path: str) -> List[str]:
+    """Every blob-store reference an artifact holds (whole anchors and chunks, with repeats)."""
+    read_at = _file_reader(path)
+    header = read_header(read_at(0, HEADER.size))
+    if header is None or header["version"] != FORMAT_VERSION:
+        return []
+    _, index = _read_index(read_at, os.path.getsize(path))
+    return _refs_of(index.get("anchor_refs", {}), index.get("anchor_chunks", {}))
+
+
+def delete_artifact(path: str, blob_store: BlobStore | None = None) -> None:
+    """Remove an artifact and drop its references from the blob store."""
+    refs = held_refs(path) if blob_store is not None else []
+    os.remove(path)
+    if refs:
+        blob_store.release(refs)
+
+
+def load_payload(path: str, *, zdict: bytes | None = None) -> bytes:
+    """Uncompressed payload of an artifact on disk (used for dictionary training)."""
     with open(path, "rb") as f:
-        return loads(f.read())
+        return decode_payload(f.read(), zdict)
@@ -0,0 +1,413 @@
+# WikECD/storage/store.py
+from __future__ import annotations
+import glob
+import io
+import json
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .compressed_store import Chain, CompressedArticle
+from .blob_store import BlobStore
+from .serializer import (
+    FORMAT_VERSION, HEADER, ArtifactWriter, ReadAt, _check_dictionary, _chain_from_frame, _decode_frame,
+    _lazy_article, _read_index, _refs_of, _write_article, anchor_refs as _file_anchor_refs,
+    held_refs as _file_held_refs, loads, read_header,
+)
+
+try:  # POSIX only; PackStore falls back to single-writer use elsewhere
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+ARTIFACT_SUFFIX = ".comp.gz"
+
+
+class BaseStore(ABC):
+    """
+    Where artifacts live: one framed artifact (see serializer.py) per key.
+    Keys are article names (e.g. title or "page_<id>"). Subclasses provide
+    byte access: _reader(key) -> (read_at, size), put_blob(), _remove() and
+    iter_articles(); the artifact API (put_article, get_meta, get_chain,
+    open_article, delete, ...) is built on those.
+    """
+
+    uri: str = ""
+
+    def __init__(self, *, zdict: bytes | None = None, blob_store: BlobStore | None = None, level: int = 9,
+                 anchor_encoding: str = "text", codec: str = "zlib"):
+        self.zdict = zdict
+        self.blob_store = blob_store
+        self.level = level
+        self.anchor_encoding = anchor_encoding
+        self.codec = codec
+
+    # -- byte access (subclasses) ---------------------------------------------
+    @abstractmethod
+    def _reader(self, key: str) -> Tuple[ReadAt, int]:
+        """(read_at(offset, length), size) of the artifact under `key`; KeyError if absent."""
+
+    @abstractmethod
+    def put_blob(self, key: str, data: bytes) -> None:
+        """Store a complete artifact blob under `key`, replacing any previous one."""
+
+    @abstractmethod
+    def _remove(self, key: str) -> None:
+        """Drop the bytes under `key`."""
+
+    @abstractmethod
+    def iter_articles(self) -> Iterator[str]:
+        """Keys of all stored artifacts."""
+
+    def close(self) -> None:
+        pass
+
+    # -- artifact API -----------------------------------------------------------
+    def __contains__(self, key: str) -> bool:
+        try:
+            self._reader(key)
+        except KeyError:
+            return False
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def location(self, key: str) -> str:
+        return f"{self.uri}#{key}"
+
+    def revid_index_path(self) -> Optional[str]:
+        """Default location of the store's revid index (see revid_index.py); None if it has no files."""
+        return None
+
+    def size(self, key: str) -> int:
+        return self._reader(key)[1]
+
+    def get_blob(self, key: str) -> bytes:
+        read_at, size = self._reader(key)
+        return read_at(0, size)
+
+    def writer(self, key: str, *, workers: Optional[int] = None) -> ArtifactWriter:
+        """Streaming ArtifactWriter whose output is stored under `key` on close."""
+        return _BufferedStoreWriter(self, key, workers=workers)
+
+    def put_article(self, key: str, article: CompressedArticle, base_texts: Optional[Dict[int, str]] = None,
+                    *, workers: Optional[int] = None) -> None:
+        with self.writer(key, workers=workers) as w:
+            _write_article(w, article, base_texts)
+
+    def _is_framed(self, read_at: ReadAt) -> bool:
+        header = read_header(read_at(0, HEADER.size))
+        return header is not None and header["version"] == FORMAT_VERSION
+
+    def open_article(self, key: str) -> Tuple[CompressedArticle, Dict[int, str]]:
+        """Like serializer.open_article(): lazy for framed artifacts, eager for legacy ones."""
+        read_at, size = self._reader(key)
+        if not self._is_framed(read_at):
+            return loads(read_at(0, size), zdict=self.zdict, blob_store=self.blob_store)
+        article = _lazy_article(read_at, size, self.zdict, self.blob_store)
+        return article, article.base_texts
+
+    def get_meta(self, key: str) -> Dict[str, Any]:
+        """Title, anchors and meta of an artifact (framed artifacts: index only)."""
+        read_at, size = self._reader(key)
+        if self._is_framed(read_at):
+            _, index = _read_index(read_at, size)
+            return {"title": index["title"], "anchors": index["anchors"], "meta": index.get("meta", {})}
+        article, _ = self.open_article(key)
+        return {"title": article.title, "anchors": article.anchors, "meta": article.meta}
+
+    def get_chain(self, key: str, chain_id: int) -> Chain:
+        """Decode one chain frame without building an article."""
+        read_at, size = self._reader(key)
+        if not self._is_framed(read_at):
+            article, base_texts = self.open_article(key)
+            members = set(article.partitions()[chain_id])
+            anchor = article.anchor_of(chain_id)
+            return Chain(anchor=anchor, base_text=base_texts.get(anchor),
+                         patches={k: p for k, p in article.patches.items() if k[1] in members})
+        header, index = _read_index(read_at, size)
+        zdict = _check_dictionary(header, self.zdict)
+        codec = header["codec"]
+        frames = index["frames"]
+        lines_frame = index.get("lines_frame")
+
+        def lines() -> Optional[List[str]]:
+            if lines_frame is None:
+                return None
+            return _decode_frame(read_at(*frames[lines_frame]), zdict, codec)["lines"]
+
+        return _chain_from_frame(_decode_frame(read_at(*frames[chain_id]), zdict, codec), self.blob_store, lines)
+
+    def anchor_refs(self, key: str) -> Dict[int, str]:
+        read_at, size = self._reader(key)
+        if not self._is_framed(read_at):
+            return {}
+        _, index = _read_index(read_at, size)
+        return {int(k): v for k, v in index.get("anchor_refs", {}).items()}
+
+    def held_refs(self, key: str) -> List[str]:
+        """Every blob-store reference the artifact holds (whole anchors and chunks)."""
+        read_at, size = self._reader(key)
+        if not self._is_framed(read_at):
+            return []
+        _, index = _read_index(read_at, size)
+        return _refs_of(index.get("anchor_refs", {}), index.get("anchor_chunks", {}))
+
+    def delete(self, key: str) -> None:
+        """Remove an artifact and drop its anchor references from the blob store."""
+        refs = self.held_refs(key) if self.blob_store is not None else []
+        self._remove(key)
+        if refs:
+            self.blob_store.release(refs)
+
+
+class _BufferedStoreWriter(ArtifactWriter):
+    """ArtifactWriter that builds the artifact in memory and hands it to a store on close."""
+
+    def __init__(self, store: BaseStore, key: str, *, workers: Optional[int] = None):
+        self._store = store
+        self._key = key
+        self._buf = io.BytesIO()
+        super().__init__(self._buf, zdict=store.zdict, level=store.level, blob_store=store.blob_store,
+                         workers=workers, anchor_encoding=store.anchor_encoding, codec=store.codec)
+        if store.blob_store is not None and key in store:
+            self._stale = store.held_refs(key)
+
+    def close(self) -> None:
+        stale, self._stale = self._stale, []
+        super().close()
+        self._store.put_blob(self._key, self._buf.getvalue())
+        if stale:
+            self._store.blob_store.release(stale)
+
+
+class FileStore(BaseStore):
+    """One `<key>.comp.gz` file per article in a directory (the original layout)."""
+
+    def __init__(self, root: str, **kwargs):
+        super().__init__(**kwargs)
+        self.root = root
+        self.uri = f"file://{root}"
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key + ARTIFACT_SUFFIX)
+
+    def location(self, key: str) -> str:
+        return self.path(key)
+
+    def revid_index_path(self) -> Optional[str]:
+        return os.path.join(self.root, "revids.idx")
+
+    def _reader(self, key: str) -> Tuple[ReadAt, int]:
+        path = self.path(key)
+        if not os.path.exists(path):
+            raise KeyError(key)
+
+        def read_at(offset: int, length: int) -> bytes:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                return f.read(length)
+        return read_at, os.path.getsize(path)
+
+    def writer(self, key: str, *, workers: Optional[int] = None) -> ArtifactWriter:
+        # stream straight to disk; ArtifactWriter handles the temp file and stale blob refs
+        return ArtifactWriter(self.path(key), zdict=self.zdict, level=self.level,
+                              blob_store=self.blob_store, workers=workers, anchor_encoding=self.anchor_encoding,
+                              codec=self.codec)
+
+    def put_blob(self, key: str, data: bytes) -> None:
+        path = self.path(key)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+    def _remove(self, key: str) -> None:
+        os.remove(self.path(key))
+
+    def anchor_refs(self, key: str) -> Dict[int, str]:
+        return _file_anchor_refs(self.path(key))
+
+    def held_refs(self, key: str) -> List[str]:
+        return _file_held_refs(self.path(key))
+
+    def iter_articles(self) -> Iterator[str]:
+        for p in sorted(glob.glob(os.path.join(glob.escape(self.root), "*" + ARTIFACT_SUFFIX))):
+            yield os.path.basename(p)[:-len(ARTIFACT_SUFFIX)]
+
+
+class PackStore(BaseStore):
+    """
+    All artifacts appended to one pack file, with a JSONL index next to it
+    (`<pack>.idx`, last entry per key wins). Appends take an exclusive file
+    lock, so several processes may write to the same pack. Deleted or
+    replaced artifacts leave dead bytes behind until the pack is rewritten.
+    """
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.uri = f"pack://{path}"
+        self._index_path = path + ".idx"
+        self._entries: Dict[str, Tuple[int, int]] = {}
+        self._index_pos = 0
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        open(path, "ab").close()
+        open(self._index_path, "ab").close()
+        self._refresh()
+
+    def revid_index_path(self) -> Optional[str]:
+        return self.path + ".revids"
+
+    def _refresh(self) -> None:
+        """Pick up index entries appended since the last read (possibly by other processes)."""
+        with open(self._index_path, "rb") as f:
+            f.seek(self._index_pos)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # entry still being written
+                self._index_pos += len(line)
+                entry = json.loads(line)
+                if entry.get("deleted"):
+                    self._entries.pop(entry["key"], None)
+                else:
+                    self._entries[entry["key"]] = (entry["offset"], entry["length"])
+
+    def _append_entry(self, entry: Dict[str, Any], data: Optional[bytes] = None) -> None:
+        with open(self._index_path, "ab") as idx:
+            if fcntl is not None:
+                fcntl.flock(idx, fcntl.LOCK_EX)
+            try:
+                if data is not None:
+                    with open(self.path, "ab") as pack:
+                        entry["offset"] = pack.seek(0, os.SEEK_END)
+                        pack.write(data)
+                idx.write(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n")
+                idx.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(idx, fcntl.LOCK_UN)
+        self._refresh()
+
+    def _reader(self, key: str) -> Tuple[ReadAt, int]:
+        if key not in self._entries:
+            self._refresh()
+        base, size = self._entries[key]
+        path = self.path
+
+        def read_at(offset: int, length: int) -> bytes:
+            with open(path, "rb") as f:
+                f.seek(base + offset)
+                return f.read(length)
+        return read_at, size
+
+    def put_blob(self, key: str, data: bytes) -> None:
+        self._append_entry({"key": key, "length": len(data)}, data)
+
+    def _remove(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._append_entry({"key": key, "deleted": True})
+
+    def iter_articles(self) -> Iterator[str]:
+        self._refresh()
+        yield from sorted(self._entries)
+
+
+class SQLiteStore(BaseStore):
+    """Artifacts as BLOB rows in a SQLite database; frames are read with substr()."""
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.uri = f"sqlite://{path}"
+        self._db = sqlite3.connect(path, timeout=60)
+        self._db.execute("""
+        CREATE TABLE IF NOT EXISTS artifacts (
+            key  TEXT PRIMARY KEY,
+            data BLOB NOT NULL,
+            size INTEGER NOT NULL
+        )""")
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def revid_index_path(self) -> Optional[str]:
+        return self.path + ".revids"
+
+    def _reader(self, key: str) -> Tuple[ReadAt, int]:
+        row = self._db.execute("SELECT size FROM artifacts WHERE key=?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        db = self._db
+
+        def read_at(offset: int, length: int) -> bytes:
+            (chunk,) = db.execute("SELECT substr(data, ?, ?) FROM artifacts WHERE key=?",
+                                  (offset + 1, length, key)).fetchone()
+            return bytes(chunk)
+        return read_at, int(row[0])
+
+    def put_blob(self, key: str, data: bytes) -> None:
+        self._db.execute("INSERT OR REPLACE INTO artifacts(key, data, size) VALUES (?, ?, ?)",
+                         (key, sqlite3.Binary(data), len(data)))
+        self._db.commit()
+
+    def _remove(self, key: str) -> None:
+        if self._db.execute("DELETE FROM artifacts WHERE key=?", (key,)).rowcount == 0:
+            raise KeyError(key)
+        self._db.commit()
+
+    def iter_articles(self) -> Iterator[str]:
+        for (key,) in self._db.execute("SELECT key FROM artifacts ORDER BY key").fetchall():
+            yield key
+
+
+_MEMORY: Dict[str, Dict[str, bytes]] = {}  # mem://<name> stores, shared within a process
+
+
+class MemoryStore(BaseStore):
+    """Artifacts kept in a dict; `mem://name` opens the same store within one process."""
+
+    def __init__(self, name: str = "", **kwargs):
+        super().__init__(**kwargs)
+        self.uri = f"mem://{name}"
+        self._blobs = _MEMORY.setdefault(name, {}) if name else {}
+
+    def _reader(self, key: str) -> Tuple[ReadAt, int]:
+        blob = self._blobs[key]
+        return (lambda o, n: blob[o:o + n]), len(blob)
+
+    def put_blob(self, key: str, data: bytes) -> None:
+        self._blobs[key] = data
+
+    def _remove(self, key: str) -> None:
+        del self._blobs[key]
+
+    def iter_articles(self) -> Iterator[str]:
+        yield from sorted(self._blobs)
+
+
+STORES = {"file": FileStore, "pack": PackStore, "sqlite": SQLiteStore, "mem": MemoryStore}
+
+
+def open_store(uri: str, *, zdict: bytes | None = None, blob_store: BlobStore | None = None,
+               level: int = 9, anchor_encoding: str = "text", codec: str = "zlib") -> BaseStore:
+    """
+    Open a store by URI:
+      file://<dir> (or a plain directory path), pack://<file>, sqlite://<file>, mem://<name>
+    """
+    scheme, sep, rest = uri.partition("://")
+    if not sep:
+        scheme, rest = "file", uri
+    cls = STORES.get(scheme)
+    if cls is None:
+        raise ValueError(f"Unknown store scheme {scheme!r} in {uri!r} (expected one of {sorted(STORES)})")
+    return cls(rest, zdict=zdict, blob_store=blob_store, level=level, anchor_encoding=anchor_encoding,
+               codec=codec)
@@ -0,0 +1,143 @@
+# WikECD/storage/zdict.py
+from __future__ import annotations
+import gzip
+import hashlib
+import random
+import re
+import time
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# zlib only looks back 32 KiB, so a larger preset dictionary is wasted bytes.
+MAX_DICT_SIZE = 32 * 1024
+
+# Artifact payloads are JSON, so wikitext line breaks appear as the two-byte
+# escape "\n" and list items are separated by '", "'.
+_SEGMENT_SPLIT = re.compile(rb'\\n|", "|": ')
+
+
+def dictionary_id(zdict: bytes) -> int:
+    """Stable 32-bit id for a dictionary (0 is reserved for 'no dictionary')."""
+    if not zdict:
+        return 0
+    return int.from_bytes(hashlib.sha256(zdict).digest()[:4], "little") or 1
+
+
+def _segments(payload: bytes, min_len: int, max_len: int) -> Iterable[bytes]:
+    for seg in _SEGMENT_SPLIT.split(payload):
+        if min_len <= len(seg) <= max_len:
+            yield seg
+
+
+def train_dictionary(
+    samples: Iterable[bytes],
+    size: int = MAX_DICT_SIZE,
+    *,
+    min_len: int = 8,
+    max_len: int = 512,
+    min_docs: int = 2,
+) -> bytes:
+    """
+    Build a zlib preset dictionary from uncompressed artifact payloads.
+
+    Segments (wikitext lines, JSON keys) are scored by how many samples they
+    occur in times their length; the best ones are concatenated up to `size`
+    bytes. The most valuable segments go last because zlib encodes matches
+    closer to the data with shorter distances.
+    """
+    size = min(int(size), MAX_DICT_SIZE)
+    doc_freq: Counter = Counter()
+    n_samples = 0
+    for payload in samples:
+        n_samples += 1
+        doc_freq.update(set(_segments(payload, min_len, max_len)))
+
+    threshold = min(min_docs, n_samples) if n_samples else min_docs
+    ranked = sorted(
+        (seg for seg, df in doc_freq.items() if df >= threshold),
+        key=lambda seg: (doc_freq[seg] * len(seg), seg),
+        reverse=True,
+    )
+
+    picked: List[bytes] = []
+    total = 0
+    for seg in ranked:
+        if total + len(seg) > size:
+            continue
+        picked.append(seg)
+        total += len(seg)
+        if total >= size:
+            break
+    return b"".join(reversed(picked))
+
+
+def save_dictionary(path: str, zdict: bytes) -> int:
+    with open(path, "wb") as f:
+        f.write(zdict)
+    return dictionary_id(zdict)
+
+
+def load_dictionary(path: Optional[str]) -> Optional[bytes]:
+    if not path:
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def compress_with_dictionary(data: bytes, zdict: Optional[bytes], level: int = 9) -> bytes:
+    if zdict:
+        c = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS, 9, zlib.Z_DEFAULT_STRATEGY, zdict)
+    else:
+        c = zlib.compressobj(level)
+    return c.compress(data) + c.flush()
+
+
+def decompress_with_dictionary(blob: bytes, zdict: Optional[bytes]) -> bytes:
+    d = zlib.decompressobj(zlib.MAX_WBITS, zdict) if zdict else zlib.decompressobj()
+    return d.decompress(blob) + d.flush()
+
+
+def sample_paths(paths: Sequence[str], k: int, seed: int = 0) -> List[str]:
+    if k <= 0 or k >= len(paths):
+        return list(paths)
+    return sorted(random.Random(seed).sample(list(paths), k))
+
+
+def benchmark_dictionary(samples: Sequence[bytes], zdict: bytes, level: int = 9) -> Dict[str, float]:
+    """
+    Compare plain gzip against zlib+zdict on the same payloads.
+    Returns total sizes, ratios (compressed/raw) and MB/s for both directions.
+    """
+    raw = sum(len(s) for s in samples)
+
+    t0 = time.perf_counter()
+    gz = [gzip.compress(s, compresslevel=level) for s in samples]
+    t1 = time.perf_counter()
+    for b in gz:
+        gzip.decompress(b)
+    t2 = time.perf_counter()
+
+    zd = [compress_with_dictionary(s, zdict, level) for s in samples]
+    t3 = time.perf_counter()
+    for b in zd:
+        decompress_with_dictionary(b, zdict)
+    t4 = time.perf_counter()
+
+    def _mbps(seconds: float) -> float:
+        return (raw / 1e6) / seconds if seconds > 0 else float("inf")
+
+    gz_size = sum(len(b) for b in gz)
+    zd_size = sum(len(b) for b in zd)
+    return {
+        "samples": len(samples),
+        "raw_bytes": raw,
+        "gzip_bytes": gz_size,
+        "zdict_bytes": zd_size,
+        "gzip_ratio": gz_size / raw if raw else 0.0,
+        "zdict_ratio": zd_size / raw if raw else 0.0,
+        "gzip_compress_mbps": _mbps(t1 - t0),
+        "gzip_decompress_mbps": _mbps(t2 - t1),
+        "zdict_compress_mbps": _mbps(t3 - t2),
+        "zdict_decompress_mbps": _mbps(t4 - t3),
+    }
@@ -38,3 +38,95 @@ def test_partitioner_basic():
     # partitions should cover all indices
     covered = sum(len(p) for p in partitions)
     assert covered == len(sizes)
+
+
+@pytest.mark.parametrize("encoding", ["lineid", "ndiff"])
+def test_anchor_placement_reverse_chains(monkeypatch, encoding):
+    from WikECD.analytics.bench import synthetic_history
+    from WikECD.compression import compressor
+    from WikECD.retrieval.retrieval import retrieve_many, retrieve_range
+    from WikECD.storage.serializer import dumps, loads, loads_lazy
+    # one long chain per 10 revisions, so placement matters
+    monkeypatch.setattr(compressor, "optimal_partition_indices",
+                        lambda sizes, **kw: (set(), [list(range(i, min(i + 10, len(sizes))))
+                                                     for i in range(0, len(sizes), 10)]))
+    revs = synthetic_history(25, n_paragraphs=15)
+    texts = [r.text for r in revs]
+    for placement, first_anchor in (("start", 0), ("end", 9)):
+        article = compressor.compress_article("P", revs, encoding=encoding, anchor_placement=placement)
+        assert article.anchors[0] == first_anchor
+    article = compressor.compress_article("P", revs, encoding=encoding, anchor_placement="middle")
+    assert all(p[0] < a < p[-1] for p, a in zip(article.partitions()[:2], article.anchors))
+    assert (article.anchors[0], article.anchors[0] - 1) in article.patches
+    assert retrieve_range(article, article.base_texts, 0, 24) == texts
+    assert retrieve_many(article, article.base_texts, [24, 3, 9, 0]) == [texts[i] for i in (24, 3, 9, 0)]
+
+    blob = dumps(article, article.base_texts)
+    assert retrieve_range(*loads(blob), 2, 15) == texts[2:18]
+    lazy, lazy_base = loads_lazy(blob)
+    assert retrieve_range(lazy, lazy_base, 5, 3) == texts[5:9]
+    with pytest.raises(ValueError):
+        compressor.compress_article("P", revs, anchor_placement="left")
+
+
+@pytest.mark.parametrize("placement", ["middle", "end"])
+def test_anchor_placement_short_chains_and_reconstruct_range(monkeypatch, placement):
+    from WikECD.analytics.bench import synthetic_history
+    from WikECD.compression import compressor
+    from WikECD.retrieval.retrieval import reconstruct_range, retrieve_range
+    from WikECD.storage.serializer import dumps, loads_lazy
+    # 2-revision chains have no middle; "end" must still store their one (reverse) patch
+    monkeypatch.setattr(compressor, "optimal_partition_indices",
+                        lambda sizes, **kw: (set(), [[0, 1], [2, 3], list(range(4, len(sizes)))]))
+    revs = synthetic_history(12, n_paragraphs=10)
+    texts = [r.text for r in revs]
+    article = compressor.compress_article("S", revs, anchor_placement=placement)
+    if placement == "end":
+        assert article.anchors[:2] == [1, 3] and (1, 0) in article.patches and (3, 2) in article.patches
+    assert retrieve_range(article, article.base_texts, 0, 11) == texts
+    assert reconstruct_range(article, 0, 12, base_texts=article.base_texts) == texts
+    lazy, lazy_base = loads_lazy(dumps(article, article.base_texts))
+    assert reconstruct_range(lazy, 3, 6, base_texts=lazy_base) == texts[3:9]
+
+
+def test_keep_tip_serves_latest_from_one_frame(monkeypatch):
+    from WikECD.analytics.bench import synthetic_history
+    from WikECD.compression import compressor
+    from WikECD.retrieval.retrieval import retrieve_latest, retrieve_range
+    from WikECD.storage.serializer import dumps, loads_lazy
+    monkeypatch.setattr(compressor, "optimal_partition_indices",
+                        lambda sizes, **kw: (set(), [list(range(0, 12)), list(range(12, len(sizes)))]))
+    revs = synthetic_history(30, n_paragraphs=15)
+    plain = compressor.compress_article("T", revs)
+    assert retrieve_latest(plain, plain.base_texts) == revs[-1].text
+
+    article = compressor.compress_article("T", revs, anchor_placement="middle", keep_tip=True)
+    assert article.anchors[-1] == 29 and article.meta["keep_tip"]
+    assert 0 < article.anchors[0] < 11
+    lazy, base_texts = loads_lazy(dumps(article, article.base_texts))
+    assert retrieve_latest(lazy, base_texts) == revs[-1].text
+    assert lazy.loaded_chains() == [] and not hasattr(lazy, "_line_table")
+    assert lazy._lines is None  # the tip is verbatim text in its own frame
+    assert retrieve_range(lazy, base_texts, 20, 9) == [r.text for r in revs[20:]]
+
+    # a 2-revision tail still keeps its patch (stored in reverse from the tip)
+    monkeypatch.setattr(compressor, "optimal_partition_indices",
+                        lambda sizes, **kw: (set(), [list(range(0, 28)), [28, 29]]))
+    article = compressor.compress_article("T", revs, keep_tip=True)
+    assert article.anchors[-1] == 29 and (29, 28) in article.patches
+    lazy, base_texts = loads_lazy(dumps(article, article.base_texts))
+    assert retrieve_latest(lazy, base_texts) == revs[-1].text and lazy._lines is None
+    assert lazy.loaded_chains() == []
+    assert retrieve_range(lazy, base_texts, 0, 29) == [r.text for r in revs]
+
+    # streamed through the writer, and with the tip in a blob store
+    from WikECD.storage.blob_store import BlobStore
+    from WikECD.storage.serializer import ArtifactWriter
+    import io
+    for blob_store in (None, BlobStore(":memory:")):
+        buf = io.BytesIO()
+        with ArtifactWriter(buf, blob_store=blob_store) as w:
+            compressor.compress_article("T", revs, keep_tip=True, writer=w)
+        lazy, base_texts = loads_lazy(buf.getvalue(), blob_store=blob_store)
+        assert retrieve_latest(lazy, base_texts) == revs[-1].text and lazy.loaded_chains() == []
+        assert retrieve_range(lazy, base_texts, 0, 29) == [r.text for r in revs]
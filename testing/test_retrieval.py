@@ -20,3 +20,144 @@ def test_roundtrip_compress_retrieve():
     assert isinstance(texts, list)
     # last revision text should match original
     assert texts[-1] == revs[2].text
+
+
+def _chained_article(texts, partitions):
+    """lineid article with the given partitions, built without the partitioner."""
+    from WikECD.compression.line_table import LineTable, diff_ids
+    from WikECD.storage.compressed_store import CompressedArticle
+    table = LineTable()
+    ids = [table.intern(t) for t in texts]
+    patches = {(u, v): diff_ids(ids[u], ids[v]) for part in partitions for u, v in zip(part, part[1:])}
+    article = CompressedArticle("chained", [p[0] for p in partitions], patches,
+                                meta={"partitions": partitions, "encoding": "lineid"}, lines=table.lines)
+    return article, {p[0]: texts[p[0]] for p in partitions}
+
+
+def test_retrieve_range_across_partitions():
+    from WikECD.retrieval.retrieval import retrieve_range
+    texts = ["".join(f"line {j}\n" for j in range(i, i + 5)) for i in range(9)]
+    article, base_texts = _chained_article(texts, [[0, 1, 2, 3], [4, 5], [6, 7, 8]])
+    assert article.locate(5) == (1, 1) and article.locate(8) == (2, 2)
+    with pytest.raises(KeyError):
+        article.locate(9)
+    assert retrieve_range(article, base_texts, 0, 8) == texts
+    assert retrieve_range(article, base_texts, 2, 3) == texts[2:6]
+    assert retrieve_range(article, base_texts, 7, 10) == texts[7:]
+
+
+def test_revision_cache_resumes_walks():
+    from WikECD.retrieval.cache import RevisionCache
+    from WikECD.retrieval.query import retrieve_by_indices
+    texts = ["".join(f"line {j}\n" for j in range(i, i + 5)) for i in range(40)]
+    article, base_texts = _chained_article(texts, [list(range(40))])
+    applied = []
+    patches = article.patches
+    article.patches = type("Counting", (dict,), {"get": lambda self, k: applied.append(k) or dict.get(self, k)})(patches)
+
+    cache = RevisionCache(max_bytes=1 << 20, checkpoint_every=8)
+    for idx in (20, 21, 20, 39):
+        assert retrieve_by_indices(article, base_texts, [idx], cache=cache) == [texts[idx]]
+    assert len(applied) == 20 + 1 + 0 + 18
+    assert cache.stats()["hits"] == 1 and cache.bytes > 0
+
+    applied.clear()
+    wanted = [30, 3, 17, 3, 39]
+    assert retrieve_by_indices(article, base_texts, wanted) == [texts[i] for i in wanted]
+    assert len(applied) == 39
+
+    tiny = RevisionCache(max_bytes=64)
+    retrieve_by_indices(article, base_texts, list(range(10)), cache=tiny)
+    assert tiny.bytes <= 64 and tiny.stats()["evictions"] > 0
+
+
+def test_time_queries_bisect_epochs():
+    from WikECD.retrieval.query import index_as_of, indices_by_time, retrieve_as_of, retrieve_by_time
+    texts = [f"rev {i}\n" for i in range(6)]
+    article, base_texts = _chained_article(texts, [[0, 1, 2], [3, 4, 5]])
+    article.meta["timestamps"] = ["2024-01-01T00:00:00Z", "2024-01-02T10:00:00Z", "2024-01-02T12:00:00Z",
+                                  "2024-01-05T00:00:00Z", "2024-02-01T00:00:00Z", "2024-02-01T00:00:00Z"]
+    assert retrieve_by_time(article, base_texts, "2024-01-02", "2024-01-05") == texts[1:4]
+    assert indices_by_time(article, "2024-01-02T12:00:00Z", "2024-02-01T00:00:00Z", inclusive=False) == [3]
+    assert indices_by_time(article, end="2023-12-31") == []
+    assert index_as_of(article, "2024-01-31") == 3 and index_as_of(article, "2023-01-01") is None
+    assert retrieve_as_of(article, base_texts, "2025-01-01") == texts[5]
+    assert isinstance(article._epochs[0][0], int)
+
+
+def test_iterators_yield_lazily(capsys, caplog):
+    import types
+    from WikECD.retrieval.retrieval import iter_range
+    from WikECD.retrieval.query import iter_by_revid, iter_by_time
+    texts = [f"rev {i}\n" for i in range(8)]
+    article, base_texts = _chained_article(texts, [[0, 1, 2, 3], [4, 5, 6, 7]])
+    article.meta["revids"] = [100 + i for i in range(8)]
+    article.meta["timestamps"] = [f"2024-01-0{i + 1}T00:00:00Z" for i in range(8)]
+
+    it = iter_range(article, base_texts, 2, 10)
+    assert isinstance(it, types.GeneratorType) and next(it) == texts[2]
+    assert list(it) == texts[3:]
+    assert list(iter_by_revid(article, base_texts, [106, 101, 102], missing="ignore")) == [texts[6], texts[1], texts[2]]
+    assert list(iter_by_time(article, base_texts, "2024-01-03", "2024-01-05")) == texts[2:5]
+    # unknown ids are reported on the log, never on stdout (which may carry --out - JSONL)
+    assert list(iter_by_revid(article, base_texts, [999, 100])) == [texts[0]]
+    assert capsys.readouterr().out == "" and "revid 999 not found" in caplog.text
+
+
+def test_ndiff_chain_walks_on_line_lists():
+    from WikECD.compression.compressor import _ndiff
+    from WikECD.retrieval.retrieval import retrieve_range
+    from WikECD.storage.compressed_store import CompressedArticle
+    texts = ["a\nb\nc\n", "a\nbb\nc", "a\nbb\nc\nd\n", "x\na\nbb\nd", ""]
+    patches = {(i - 1, i): _ndiff(texts[i - 1], texts[i]) for i in range(1, len(texts))}
+    article = CompressedArticle("nd", [0], patches, meta={"partitions": [[0, 1, 2, 3, 4]], "encoding": "ndiff"})
+    assert any(line.startswith("? ") for p in patches.values() for line in p)
+    assert retrieve_range(article, {0: texts[0]}, 0, 4) == texts
+    assert retrieve_range(article, {0: texts[0]}, 3, 0) == [texts[3]]
+    assert (2, 3) in article._compiled_patches
+
+
+def test_parallel_range_matches_serial():
+    from WikECD.retrieval.retrieval import iter_many, retrieve_range
+    texts = ["".join(f"line {j}\n" for j in range(i, i + 5)) for i in range(30)]
+    article, base_texts = _chained_article(texts, [list(range(i, i + 6)) for i in range(0, 30, 6)])
+    assert retrieve_range(article, base_texts, 2, 25, workers=2) == texts[2:28]
+    assert list(iter_many(article, base_texts, [29, 1, 2, 14], workers=2)) == [texts[i] for i in (29, 1, 2, 14)]
+
+
+def test_diff_revisions_composes_chain_patches():
+    import random
+    from WikECD.compression.line_table import diff_ids
+    from WikECD.retrieval.diff import diff_revisions
+    from WikECD.retrieval.retrieval import _line_table
+    rng = random.Random(7)
+    lines = [f"line {j}\n" for j in range(12)]
+    texts = ["".join(lines)]
+    for i in range(11):
+        lines = list(lines)
+        pos = rng.randrange(len(lines) + 1)
+        lines[pos:pos + rng.randrange(3)] = [f"edit {i}.{k}\n" for k in range(rng.randrange(3))]
+        texts.append("".join(lines))
+    article, base_texts = _chained_article(texts, [list(range(8)), [8, 9, 10, 11]])
+    # anchor the first chain mid-way: offsets below 4 are stored as reverse patches
+    table = _line_table(article)
+    for u in range(4):
+        del article.patches[(u, u + 1)]
+        article.patches[(u + 1, u)] = diff_ids(table.lookup(texts[u + 1]), table.lookup(texts[u]))
+    article.anchors[0] = 4
+    base_texts = {4: texts[4], 8: texts[8]}
+
+    def apply(a, hunks):
+        old = texts[a].splitlines(keepends=True)
+        for h in reversed(hunks):
+            old[h.a_start:h.a_end] = h.added
+        return "".join(old)
+
+    applied = []
+    patches = article.patches
+    article.patches = type("Counting", (dict,), {"get": lambda self, k: applied.append(k) or dict.get(self, k)})(patches)
+    assert apply(5, diff_revisions(article, base_texts, 5, 7)) == texts[7]
+    assert apply(3, diff_revisions(article, base_texts, 3, 0)) == texts[0]
+    assert applied == [(5, 6), (6, 7), (3, 2), (2, 1), (1, 0)]  # composed, no walk from the anchor
+    for a, b in [(0, 3), (2, 6), (7, 9), (11, 1), (6, 6)]:
+        assert apply(a, diff_revisions(article, base_texts, a, b)) == texts[b]
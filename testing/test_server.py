@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+from WikECD.sources.base import Revision
+from WikECD.compression.compressor import compress_article
+from WikECD.retrieval.access import AccessLog
+from WikECD.retrieval.server import LatencyHistogram, RetrievalServer
+from WikECD.storage.store import open_store
+
+
+async def _get(port, path, timeout=30):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    raw = await asyncio.wait_for(reader.read(), timeout)
+    writer.close()
+    head, body = raw.split(b"\r\n\r\n", 1)
+    return int(head.split()[1]), body
+
+
+def test_serve_against_file_store(tmp_path):
+    revs = [Revision(revid=100 + i, timestamp=f"2024-01-0{i + 1}T00:00:00Z", text=f"intro\nrev {i}\n")
+            for i in range(5)]
+    store = open_store(f"file://{tmp_path}")
+    article = compress_article("Page One", revs, keep_tip=True)
+    store.put_article("Page One", article, article.base_texts)
+    store.close()
+
+    async def scenario():
+        server = RetrievalServer(f"file://{tmp_path}", workers=1, access_log=str(tmp_path / "access.json"))
+        await server.start(port=0)
+        try:
+            port = server.port
+            status, body = await _get(port, "/articles/Page%20One/latest")
+            assert status == 200 and json.loads(body)["text"] == revs[-1].text
+            status, body = await _get(port, "/articles/Page%20One/rev/2?format=text")
+            assert status == 200 and body.decode() == revs[2].text
+            status, body = await _get(port, "/articles/Page%20One/revid/101")
+            assert json.loads(body)["index"] == 1
+            status, body = await _get(port, "/articles/Page%20One/at?ts=2024-01-03T12:00:00Z")
+            assert json.loads(body)["revid"] == 102
+            assert (await _get(port, "/articles/Missing/latest"))[0] == 404
+            assert (await _get(port, "/articles/Page%20One/rev/99"))[0] == 400
+            assert (await _get(port, "/articles/Page%20One/at?ts=2023-01-01"))[0] == 404
+            status, body = await _get(port, "/metrics")
+            metrics = json.loads(body)
+            assert metrics["latency"]["rev"]["count"] == 2
+            (stats,) = metrics["workers"].values()
+            assert stats["articles"]["hits"] >= 5
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+    assert AccessLog.load(str(tmp_path / "access.json")).counts("Page One") == {4: 1, 2: 2, 1: 1}
+
+
+def test_latency_histogram_quantiles():
+    hist = LatencyHistogram()
+    for ms in (0.5, 3, 3, 40, 4000):
+        hist.observe(ms / 1000)
+    snap = hist.snapshot()
+    assert snap["count"] == 5 and snap["p50_ms"] == 5 and snap["buckets"]["le_1"] == 1
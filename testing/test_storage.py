@@ -0,0 +1,387 @@
+import pytest
+
+from WikECD.sources.base import Revision
+from WikECD.compression.compressor import compress_article
+from WikECD.compression.line_table import diff_ids
+from WikECD.storage.serializer import dumps, loads, read_header, decode_payload, open_article, save
+from WikECD.storage.zdict import train_dictionary, dictionary_id, benchmark_dictionary
+
+BOILERPLATE = "{{Infobox settlement\n| name = %s\n}}\n'''%s''' is a place.\n[[Category:Places]]\n"
+
+
+def _article(name, n=4, encoding="lineid"):
+    revs = [
+        Revision(revid=i + 1, timestamp=f"2024-01-0{i + 1}T00:00:00Z",
+                 text=BOILERPLATE % (name, name) + "line\n" * i)
+        for i in range(n)
+    ]
+    article = compress_article(name, revs, solver="heuristic", strategy="greedy", encoding=encoding)
+    base_texts = {b: revs[b].text for b in article.anchors}
+    return article, base_texts, revs
+
+
+def test_roundtrip_plain():
+    article, base_texts, _ = _article("Alpha")
+    blob = dumps(article, base_texts)
+    assert read_header(blob)["dict_id"] == 0
+    a2, b2 = loads(blob)
+    assert a2.anchors == article.anchors
+    assert a2.patches == article.patches
+    assert b2 == base_texts
+
+
+def test_legacy_gzip_artifact_still_loads():
+    import gzip, json
+    article, base_texts, _ = _article("Alpha", encoding="ndiff")
+    legacy = gzip.compress(json.dumps({
+        "title": article.title,
+        "anchors": article.anchors,
+        "patches": {f"{u}-{v}": p for (u, v), p in article.patches.items()},
+        "meta": article.meta,
+        "base_texts": base_texts,
+    }).encode("utf-8"))
+    a2, b2 = loads(legacy)
+    assert a2.patches == article.patches
+    assert b2 == base_texts
+
+    from WikECD.storage.serializer import HEADER, MAGIC
+    with pytest.raises(ValueError, match="version 1"):  # never released
+        loads(HEADER.pack(MAGIC, 1, 1, 0, 0) + b"x" * 16)
+
+
+def test_threaded_frame_compression_is_deterministic():
+    revs = [Revision(revid=i, timestamp="2024-01-01T00:00:00Z", text=("y" * 40 * (i % 4 + 1)) + "\n")
+            for i in range(12)]
+    article = compress_article("Threads", revs, time_budget=2000)
+    base_texts = {b: revs[b].text for b in article.anchors}
+    assert dumps(article, base_texts, workers=1) == dumps(article, base_texts, workers=4)
+
+
+def test_open_article_decodes_chains_lazily(tmp_path):
+    from WikECD.retrieval.retrieval import retrieve_range
+    revs = [Revision(revid=i, timestamp="2024-01-01T00:00:00Z", text=("x" * 50 * (i % 3 + 1)) + "\n")
+            for i in range(9)]
+    article = compress_article("Lazy", revs, time_budget=1000)
+    assert len(article.partitions()) > 1
+    path = str(tmp_path / "lazy.comp.gz")
+    save(path, article, {b: revs[b].text for b in article.anchors})
+
+    lazy, base_texts = open_article(path)
+    assert lazy.meta["count"] == 9
+    assert lazy.loaded_chains() == []
+    last = article.partitions()[-1][-1]
+    assert retrieve_range(lazy, base_texts, last, 0) == [revs[last].text]
+    assert lazy.loaded_chains() == [len(article.partitions()) - 1]
+
+
+def test_roundtrip_with_dictionary():
+    payloads = [decode_payload(dumps(*_article(name)[:2])) for name in ("Alpha", "Beta", "Gamma")]
+    zdict = train_dictionary(payloads, size=4096)
+    assert 0 < len(zdict) <= 4096
+
+    article, base_texts, _ = _article("Delta")
+    blob = dumps(article, base_texts, zdict=zdict)
+    assert read_header(blob)["dict_id"] == dictionary_id(zdict)
+    a2, b2 = loads(blob, zdict=zdict)
+    assert a2.patches == article.patches
+    assert b2 == base_texts
+
+    with pytest.raises(ValueError):
+        loads(blob)
+
+    bench = benchmark_dictionary(payloads, zdict)
+    assert bench["zdict_bytes"] < bench["gzip_bytes"]
+
+
+def test_blob_store_dedups_anchors_across_artifacts(tmp_path):
+    from WikECD.storage.blob_store import BlobStore
+    from WikECD.storage.serializer import load, delete_artifact
+    from WikECD.analytics.analyze import analyze_dir
+
+    store = BlobStore(str(tmp_path / "blobs.sqlite"))
+    article, base_texts, _ = _article("Alpha")
+    out = tmp_path / "arts"
+    out.mkdir()
+    # same history saved twice (e.g. a redirect and its target)
+    for name in ("a", "b"):
+        save(str(out / f"{name}.comp.gz"), article, base_texts, blob_store=store)
+
+    stats = store.stats()
+    assert stats["blobs"] == len(set(base_texts.values()))
+    assert stats["refs"] == 2 * len(base_texts)
+    assert stats["dedup_ratio"] == 2.0
+
+    a2, b2 = load(str(out / "a.comp.gz"), blob_store=store)
+    assert b2 == base_texts
+    assert "base_texts" not in a2.meta
+    with pytest.raises(ValueError):
+        load(str(out / "a.comp.gz"))
+
+    res = analyze_dir(str(out), str(tmp_path / "summary.csv"), blob_store=store)
+    assert res["aggregate"]["anchor_dedup_ratio"] == 2.0
+
+    delete_artifact(str(out / "a.comp.gz"), store)
+    delete_artifact(str(out / "b.comp.gz"), store)
+    assert store.stats()["blobs"] == 0
+
+
+def test_artifact_writer_streams_from_compressor(tmp_path):
+    from WikECD.storage.serializer import ArtifactWriter, load
+    revs = [Revision(revid=i, timestamp="2024-01-01T00:00:00Z", text=("z" * 30 * (i % 3 + 1)) + "\n")
+            for i in range(10)]
+    path = str(tmp_path / "stream.comp.gz")
+    with ArtifactWriter(path, workers=2) as w:
+        article = compress_article("Stream", revs, time_budget=1000, writer=w)
+    assert article.patches == {}
+
+    reference = compress_article("Stream", revs, time_budget=1000)
+    a2, b2 = load(path)
+    assert a2.patches == reference.patches
+    assert a2.meta["count"] == 10
+    assert b2 == {b: revs[b].text for b in reference.anchors}
+
+    # a failure inside the block leaves any previous artifact untouched
+    with pytest.raises(RuntimeError):
+        with ArtifactWriter(path) as w:
+            w.add_chain(0, "partial", {})
+            raise RuntimeError("boom")
+    assert load(path)[0].meta["count"] == 10
+
+
+def test_migrate_dir_converts_and_resumes(tmp_path):
+    import gzip, json
+    from WikECD.cli_helpers import migrate
+    from WikECD.cli_helpers.migrate import migrate_dir
+    from WikECD.storage.serializer import load
+
+    src = tmp_path / "legacy"
+    src.mkdir()
+    for name in ("Alpha", "Beta"):
+        article, base_texts, _ = _article(name, encoding="ndiff")
+        (src / f"{name}.comp.gz").write_bytes(gzip.compress(json.dumps({
+            "title": article.title,
+            "anchors": article.anchors,
+            "patches": {f"{u}-{v}": p for (u, v), p in article.patches.items()},
+            "meta": dict(article.meta, base_texts=base_texts),
+            "base_texts": base_texts,
+        }).encode("utf-8")))
+
+    out = tmp_path / "framed"
+    res = migrate_dir(str(src), str(out), verify_sample=2)
+    assert (res["ok"], res["error"], res["skipped"]) == (2, 0, 0)
+    assert res["verified"] == 4
+
+    a2, b2 = load(str(out / "Alpha.comp.gz"))
+    assert read_header(open(out / "Alpha.comp.gz", "rb").read(16))["version"] == 2
+    assert "base_texts" not in a2.meta
+    assert b2 == _article("Alpha")[1]
+
+    assert not migrate._STORES and not migrate._BLOB_STORES  # closed when the run ends
+
+    # the progress log is keyed by real path, so another spelling of in_dir resumes too
+    again = migrate_dir(str(src / ".." / "legacy") + "/", str(out))
+    assert (again["ok"], again["skipped"]) == (0, 2)
+
+
+def test_lineid_encoding_roundtrips_and_is_smaller(tmp_path):
+    from WikECD.retrieval.retrieval import retrieve_range
+    body = "".join(f"Paragraph {k} of a long article with plenty of shared text.\n" for k in range(60))
+    revs = [Revision(revid=i, timestamp="2024-01-01T00:00:00Z",
+                     text=body.replace(f"Paragraph {i}", f"Edited {i}") + "tail\n" * i)
+            for i in range(12)]
+    sizes = {}
+    for encoding in ("ndiff", "lineid"):
+        article = compress_article("Lines", revs, time_budget=5000, encoding=encoding)
+        assert article.meta["encoding"] == encoding
+        path = str(tmp_path / f"{encoding}.comp.gz")
+        save(path, article, {b: revs[b].text for b in article.anchors})
+        sizes[encoding] = len(decode_payload(open(path, "rb").read()))
+
+        lazy, base_texts = open_article(path)
+        assert retrieve_range(lazy, base_texts, 0, 11) == [r.text for r in revs]
+    assert sizes["lineid"] * 3 < sizes["ndiff"]
+
+
+@pytest.mark.parametrize("scheme", ["file", "pack", "sqlite", "mem"])
+def test_store_backends(tmp_path, scheme):
+    from WikECD.storage.store import open_store
+    from WikECD.retrieval.retrieval import retrieve_range
+    target = {"file": tmp_path / "arts", "pack": tmp_path / "arts.pack",
+              "sqlite": tmp_path / "arts.sqlite", "mem": "test_store_backends"}[scheme]
+    store = open_store(f"{scheme}://{target}")
+    article, base_texts, revs = _article("Alpha", n=6)
+    store.put_article("Alpha", article, base_texts)
+    with store.writer("Beta") as w:
+        compress_article("Beta", revs, writer=w)
+    store.put_article("Alpha", article, base_texts)  # overwrite keeps one entry
+
+    assert list(store.iter_articles()) == ["Alpha", "Beta"]
+    assert store.get_meta("Beta")["meta"]["count"] == 6
+    chain = store.get_chain("Alpha", 0)
+    assert chain.anchor == article.anchors[0] and chain.base_text == base_texts[chain.anchor]
+
+    lazy, lazy_base = open_store(f"{scheme}://{target}").open_article("Beta")
+    assert retrieve_range(lazy, lazy_base, 0, 5) == [r.text for r in revs]
+
+    store.delete("Alpha")
+    assert "Alpha" not in store and list(store.iter_articles()) == ["Beta"]
+    with pytest.raises(KeyError):
+        store.open_article("Alpha")
+    store.close()
+
+
+def test_store_base_is_abstract():
+    from WikECD.storage.store import BaseStore
+
+    class Partial(BaseStore):
+        def _reader(self, key):
+            raise KeyError(key)
+
+    with pytest.raises(TypeError):
+        Partial()  # put_blob, _remove and iter_articles missing
+
+
+def test_chunked_anchors_share_paragraphs(tmp_path):
+    from WikECD.storage.blob_store import BlobStore
+    from WikECD.storage.chunking import chunk_text
+    from WikECD.storage.serializer import load, delete_artifact
+    import random
+    rnd = random.Random(7)
+    paras = ["".join(rnd.choice("abcdefgh ") for _ in range(rnd.randrange(200, 900))) + "\n" for _ in range(40)]
+    assert "".join(chunk_text("".join(paras))) == "".join(paras)
+
+    moved = paras[:5] + paras[30:35] + ["A brand new paragraph.\n"] + paras[5:30] + paras[35:]
+    physical = {}
+    for encoding in ("text", "chunks"):
+        store = BlobStore(str(tmp_path / f"{encoding}.sqlite"))
+        for name, body in (("a", paras), ("b", moved)):
+            revs = [Revision(revid=1, timestamp="2024-01-01T00:00:00Z", text="".join(body))]
+            article = compress_article(name, revs)
+            path = str(tmp_path / f"{encoding}-{name}.comp.gz")
+            statements = []
+            store._db.set_trace_callback(statements.append)
+            save(path, article, {0: revs[0].text}, blob_store=store, anchor_encoding=encoding)
+            store._db.set_trace_callback(None)
+            assert statements.count("COMMIT") == 1  # one transaction per artifact, not per chunk
+            assert load(path, blob_store=store)[1] == {0: revs[0].text}
+        physical[encoding] = store.stats()["physical_bytes"]
+        if encoding == "chunks":
+            assert store.cache.stats()["entries"] > 0
+            for name in ("a", "b"):
+                delete_artifact(str(tmp_path / f"chunks-{name}.comp.gz"), store)
+            assert store.stats()["blobs"] == 0
+    assert physical["chunks"] < 0.7 * physical["text"]
+
+
+def test_profiles_and_lzma_codec():
+    from WikECD.analytics.bench import benchmark_profiles, edit_war_history, full_chain_time_cost, synthetic_history
+    from WikECD.storage.serializer import ArtifactWriter
+    import io
+    article, base_texts, _ = _article("Gamma", 5)
+    blob = dumps(article, base_texts, codec="lzma")
+    assert read_header(blob)["codec"] == 2
+    assert loads(blob)[1] == base_texts
+    with pytest.raises(ValueError):
+        ArtifactWriter(io.BytesIO(), zdict=b"x" * 64, codec="lzma")
+
+    revs = synthetic_history(30, n_paragraphs=20)
+    article = compress_article("Delta", revs, profile="fast")
+    assert article.meta["profile"] == "fast" and article.meta["strategy"] == "greedy"
+    assert article.meta["line_diff"] == "trim"
+    # explicit knobs win over the profile
+    article = compress_article("Delta", revs, profile="fast", strategy="auto")
+    assert article.meta["strategy"] == "auto" and article.meta["line_diff"] == "trim"
+    assert compress_article("Delta", revs).meta["line_diff"] == "matcher"
+    assert diff_ids([1, 2, 3, 4, 5], [1, 9, 3, 8, 5], "trim") == [[1, 4, [9, 3, 8]]]
+    assert diff_ids([1, 2, 3, 4, 5], [1, 9, 3, 8, 5]) == [[1, 2, [9]], [3, 4, [8]]]
+    with pytest.raises(ValueError):
+        compress_article("Delta", revs, profile="turbo")
+    war = edit_war_history(30, n_paragraphs=8, disputed_paragraphs=12)
+    rows = benchmark_profiles(war, time_budget=full_chain_time_cost(war) // 2)
+    assert [r["profile"] for r in rows] == ["fast", "balanced", "max"]
+    assert all(0 < r["ratio"] < 1 and r["patches"] > 0 for r in rows)
+    assert all(r["partitions"] + r["patches"] == 30 for r in rows)
+
+
+def test_snapshot_as_of_across_store(tmp_path):
+    from WikECD.retrieval.snapshot import iter_snapshot
+    from WikECD.storage.store import open_store
+    uri = f"sqlite://{tmp_path / 'wiki.sqlite'}"
+    store = open_store(uri)
+    expected = {}
+    for name, n in (("Alpha", 4), ("Beta", 2)):
+        article, base_texts, revs = _article(name, n)
+        store.put_article(name, article, base_texts)
+        expected[name] = revs[min(n, 2) - 1]
+    late = [Revision(revid=50, timestamp="2024-01-05T00:00:00Z", text="new page\n")]
+    store.put_article("Gamma", compress_article("Gamma", late), {0: late[0].text})
+    store.close()
+
+    for jobs in (1, 2):
+        rows = list(iter_snapshot(uri, "2024-01-02T12:00:00Z", jobs=jobs, batch_size=1))
+        assert {r["key"]: (r["revid"], r["text"]) for r in rows} == {
+            k: (rev.revid, rev.text) for k, rev in expected.items()}
+    rows = list(iter_snapshot(uri, "2024-02-01", keys=["Gamma", "Alpha"]))
+    assert [(r["key"], r["index"]) for r in rows] == [("Gamma", 0), ("Alpha", 3)]
+
+
+def test_rebalance_hot_adds_checkpoints(tmp_path, monkeypatch):
+    from WikECD.analytics.bench import synthetic_history
+    from WikECD.cli_helpers.rebalance import _segments, rebalance_store
+    from WikECD.compression import compressor
+    from WikECD.retrieval.access import AccessLog
+    from WikECD.retrieval.retrieval import retrieve_range
+    from WikECD.storage.store import open_store
+    assert _segments(10, 4, [1, 7]) == [(0, 1, 1), (2, 6, 4), (7, 9, 7)]
+    monkeypatch.setattr(compressor, "optimal_partition_indices",
+                        lambda sizes, **kw: (set(), [list(range(len(sizes)))]))
+    revs = synthetic_history(30, n_paragraphs=15)
+    store = open_store(f"file://{tmp_path / 'store'}")
+    article = compressor.compress_article("Hot", revs, anchor_placement="middle")
+    store.put_article("Hot", article, article.base_texts)
+
+    path = str(tmp_path / "access.json")
+    log = AccessLog(path)
+    log.record("Hot", [27] * 50 + [3] * 40 + [16] * 2)
+    log.save()
+    log.record("Missing", [0])
+    log.save()
+    log = AccessLog.load(path)
+    assert log.counts("Hot") == {27: 50, 3: 40, 16: 2} and log.total() == 93
+
+    (row,) = rebalance_store(store, log, budget_bytes=len(revs[27].text) + 10)
+    assert row["checkpoints"] == [27] and row["patches_after"] < row["patches_before"]
+    hot, base_texts = store.open_article("Hot")
+    assert 27 in hot.anchors and hot.meta["checkpoints"] == [27]
+    assert retrieve_range(hot, base_texts, 0, 29) == [r.text for r in revs]
+
+    (row,) = rebalance_store(store, log, budget_bytes=1 << 20, min_count=10)
+    hot, base_texts = store.open_article("Hot")
+    assert row["checkpoints"] == [3] and hot.meta["checkpoints"] == [3, 27]
+    assert retrieve_range(hot, base_texts, 0, 29) == [r.text for r in revs]
+
+
+def test_global_revid_index(tmp_path):
+    from WikECD.retrieval.query import iter_store_revids
+    from WikECD.storage.revid_index import RevidIndex, build_revid_index
+    from WikECD.storage.store import open_store
+    store = open_store(f"pack://{tmp_path / 'wiki.pack'}")
+    revs = {}
+    for name, first in (("Alpha", 500), ("Beta", 10), ("Gamma", 7000)):
+        revs[name] = [Revision(revid=first + 3 * i, timestamp=f"2024-01-0{i + 1}T00:00:00Z",
+                               text=BOILERPLATE % (name, name) + "line\n" * i) for i in range(4)]
+        store.put_article(name, compress_article(name, revs[name]), {i: r.text for i, r in enumerate(revs[name])})
+    path = store.revid_index_path()
+    assert build_revid_index(store, path) == 12
+    with RevidIndex(path) as index:
+        assert index.lookup(506) == ("Alpha", 2) and index.lookup(10) == ("Beta", 0)
+        assert index.lookup(507) is None and index.lookup(1) is None and index.lookup(99999) is None
+        rows = list(iter_store_revids(store, index, [7003, 13, 503, 7000, 404], missing="ignore"))
+    assert [(r["key"], r["revid"]) for r in rows] == [("Gamma", 7003), ("Gamma", 7000), ("Beta", 13), ("Alpha", 503)]
+    assert rows[0]["text"] == revs["Gamma"][1].text
+
+    late = [Revision(revid=1, timestamp="2024-02-01T00:00:00Z", text="beta again\n")]
+    store.put_article("Beta", compress_article("Beta", late), {0: late[0].text})
+    assert build_revid_index(store, path, keys=["Beta"]) == 9
+    with RevidIndex(path) as index:
+        assert index.lookup(1) == ("Beta", 0) and index.lookup(13) is None and index.lookup(7009) == ("Gamma", 3)
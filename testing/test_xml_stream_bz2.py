@@ -35,3 +35,17 @@ def test_xml_bz2_streaming():
         article = compress_article("WikECD Demo", revs)
         assert article.meta["count"] == 2
         assert len(article.anchors) >= 1
+
+
+def test_xml_bz2_parallel_decoder():
+    from WikECD.sources.xml_parser import get_revisions_from_file
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "sample.xml.bz2")
+        with bz2.open(path, "wt", encoding="utf-8") as f:
+            f.write(SAMPLE_XML)
+
+        for parallelization in (1, 2, 0):
+            revs = list(XMLDumpSource(path, parallelization=parallelization).get_revisions(page_id=123))
+            assert [(r.revid, r.text) for r in revs] == [(1, "hello"), (2, "hello world")]
+        revs = list(get_revisions_from_file(path, page_ids={123}, progress=False, parallelization=2))
+        assert [r.revid for r in revs] == [1, 2]